@@ -3,37 +3,69 @@ import sys
 import tkinter as tk
 from tkinter import ttk, messagebox
 import threading
+import multiprocessing
 import logging
 import json
+from collections import deque
 from pynput import keyboard
 
 # 添加src目录到路径中
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from src.core import ClickRecorder, ImageClicker
+from src.core import ClickRecorder
 from src.ui import ConfigUI, Theme
 from src.utils import setup_global_logging
 
 class UITextHandler(logging.Handler):
-    """自定义日志处理器，将日志显示在UI文本框中"""
+    """自定义日志处理器，将日志显示在UI文本框中
+
+    emit 只把格式化后的日志放入固定长度的环形缓冲区，不触碰 Tk；
+    主线程中的定时器每隔 FLUSH_INTERVAL_MS 批量写入文本框，避免每条日志都调度一次回调。
+    """
+    FLUSH_INTERVAL_MS = 100
+    MAX_LINES = 100
+
     def __init__(self, text_widget):
         super().__init__()
         self.text_widget = text_widget
         self.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+        self.buffer = deque(maxlen=self.MAX_LINES)
+        self.line_count = 0
+        self.text_widget.after(self.FLUSH_INTERVAL_MS, self._flush)
     
     def emit(self, record):
-        msg = self.format(record)
-        self.text_widget.after(0, lambda: self._append_text(msg))
+        try:
+            self.buffer.append(self.format(record))
+        except Exception:
+            self.handleError(record)
     
-    def _append_text(self, msg):
-        self.text_widget.insert(tk.END, msg + '\n')
-        self.text_widget.see(tk.END)
-        # 限制日志行数
-        if int(self.text_widget.index('end-1c').split('.')[0]) > 100:
-            self.text_widget.delete('1.0', '2.0')
+    def _flush(self):
+        lines = []
+        while True:
+            try:
+                lines.append(self.buffer.popleft())
+            except IndexError:
+                break
+        try:
+            if lines:
+                text = '\n'.join(lines)
+                self.text_widget.insert(tk.END, text + '\n')
+                self.line_count += text.count('\n') + 1
+                # 限制日志行数
+                excess = self.line_count - self.MAX_LINES
+                if excess > 0:
+                    self.text_widget.delete('1.0', f'{excess + 1}.0')
+                    self.line_count -= excess
+                self.text_widget.see(tk.END)
+            self.text_widget.after(self.FLUSH_INTERVAL_MS, self._flush)
+        except tk.TclError:
+            # 窗口已销毁
+            pass
 
 
 class MainApp:
+    PROGRESS_POLL_MS = 100
+
     def __init__(self, root):
         self.root = root
         self.root.title("按键精灵")
@@ -47,17 +79,17 @@ class MainApp:
         self.base_dir = os.path.dirname(os.path.abspath(__file__))
         self.png_dir = os.path.join(self.base_dir, self.config['png_dir'])
 
-        # 初始化点击记录器和图片点击器
+        # 初始化点击记录器；图片点击器首次使用时再创建，避免启动时加载图像识别依赖
         self.recorder = ClickRecorder(self.config)
-        self.clicker = ImageClicker(self.config)
-        
-        # 设置进度回调
-        self.clicker.set_progress_callback(self.update_progress)
+        self._clicker = None
 
         self.is_clicking = True  # 添加停止标志
         self.loop_times = tk.IntVar(value=self.config['loop_times'])  # 从config获取默认值
         self.status_var = tk.StringVar(value="就绪")
         self.progress_var = tk.DoubleVar(value=0.0)
+        self.progress_detail_var = tk.StringVar(value="")
+        self.metrics_var = tk.StringVar(value="")
+        self._last_progress = None
         
         # 全局停止事件
         self.global_stop_event = threading.Event()
@@ -71,6 +103,14 @@ class MainApp:
         self.keyboard_listener = None
         self.start_keyboard_listener()
 
+    @property
+    def clicker(self):
+        """图片点击器，首次访问时创建"""
+        if self._clicker is None:
+            from src.core import ImageClicker
+            self._clicker = ImageClicker(self.config)
+        return self._clicker
+
     def load_config(self):
         config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src', 'config', 'config.json')
         try:
@@ -171,6 +211,10 @@ class MainApp:
         # 进度百分比标签
         self.progress_label = ttk.Label(progress_container, text="0%", width=5, anchor='e')
         self.progress_label.pack(side=tk.LEFT, padx=5)
+        # 进度详情：循环、模板序号、命中/未命中数、预计剩余时间
+        ttk.Label(status_frame, textvariable=self.progress_detail_var).pack(fill=tk.X, padx=10, pady=(0, 8))
+        # 性能指标：截图、匹配、点击耗时和命中率
+        ttk.Label(status_frame, textvariable=self.metrics_var).pack(fill=tk.X, padx=10, pady=(0, 8))
         
         # 日志显示区域
         log_frame = ttk.LabelFrame(self.root, text="📋 运行日志")
@@ -228,7 +272,8 @@ class MainApp:
             
             # 更新 recorder 和 clicker
             self.recorder.set_loop_times(times)
-            self.clicker.set_loop_times(times)
+            if self._clicker is not None:
+                self._clicker.set_loop_times(times)
             
             self.logger.info(f"更新循环次数为: {times}")
             
@@ -358,6 +403,8 @@ class MainApp:
             self.image_click_thread = threading.Thread(target=self.run_image_click)
             self.image_click_thread.daemon = True
             self.image_click_thread.start()
+            self._last_progress = None
+            self.root.after(self.PROGRESS_POLL_MS, self._poll_progress)
             self.logger.info(f"开始图片识别点击，设定循环次数：{self.loop_times.get()}，图片数量：{len(png_files)}")
         except Exception as e:
             self.thread_running = False
@@ -399,27 +446,39 @@ class MainApp:
             self.status_var.set("就绪")
             self.progress_var.set(100.0)
     
-    def update_progress(self, progress):
-        """更新进度条（线程安全）"""
-        try:
-            # 确保进度值在0-100之间
-            progress = max(0.0, min(100.0, progress))
-            self.root.after(0, lambda p=progress: self._set_progress(p))
-        except Exception as e:
-            self.logger.error(f"更新进度失败: {e}")
-    
-    def _set_progress(self, progress):
-        """设置进度条的值（在主线程中调用）"""
+    def _poll_progress(self):
+        """在主线程中定时读取图片识别的最新进度，进度更新再频繁也只按固定频率刷新界面"""
+        report = self._clicker.progress.latest() if self._clicker is not None else None
+        if report is not None and report is not self._last_progress:
+            self._last_progress = report
+            self._set_progress(report)
+            self._set_metrics(self._clicker.get_metrics_summary())
+        if self.thread_running:
+            self.root.after(self.PROGRESS_POLL_MS, self._poll_progress)
+
+    def _set_progress(self, report):
+        """设置进度条和进度详情（在主线程中调用）"""
         try:
+            progress = max(0.0, min(100.0, report.percent))
             self.progress_var.set(progress)
             self.progress_label.config(text=f"{progress:.0f}%")
-            self.progress_bar.update()
-            # 只在显著变化时记录日志，避免日志过多
-            if progress == 0 or progress == 100 or int(progress) % 10 == 0:
-                self.logger.info(f"进度更新: {progress:.1f}%")
+            eta = f"{report.eta:.0f}秒" if report.eta is not None else "--"
+            self.progress_detail_var.set(
+                f"循环 {report.loop + 1}/{report.total_loops}  "
+                f"模板 {report.template_index + 1}/{report.total_templates}  "
+                f"命中 {report.matched}  未命中 {report.missed}  剩余 {eta}"
+            )
         except Exception as e:
             self.logger.error(f"设置进度失败: {e}")
 
+    def _set_metrics(self, summary):
+        """在状态面板中显示性能指标摘要"""
+        hit_rate = f"{summary['hit_rate'] * 100:.0f}%" if summary['hit_rate'] is not None else "--"
+        self.metrics_var.set(
+            f"截图 p50 {summary['capture_p50_ms']:.1f}ms / p99 {summary['capture_p99_ms']:.1f}ms  "
+            f"匹配 {summary['match_avg_ms']:.1f}ms  点击 {summary['click_p50_ms']:.1f}ms  命中率 {hit_rate}"
+        )
+
     def open_config(self):
         """打开配置界面，带错误处理"""
         try:
@@ -440,10 +499,15 @@ class MainApp:
                     
                     # 应用到 recorder/clicker（已在 ConfigUI.save_config 中完成，这里是确保）
                     self.recorder.set_interval(self.config.get('click_interval', 0.1))
+                    self.recorder.set_replay_speed(self.config.get('replay_speed', 1.0))
                     self.recorder.set_loop_times(self.config.get('loop_times', 1))
                     self.clicker.set_threshold(self.config.get('threshold', 0.8))
                     self.clicker.set_wait_time(self.config.get('wait_time', 5.0))
                     self.clicker.set_immediate_click(self.config.get('immediate_click', False))
+                    self.clicker.set_match_all(self.config.get('match_all', False))
+                    self.clicker.set_frame_max_age(self.config.get('frame_max_age', 0.1))
+                    self.clicker.set_match_workers(self.config.get('match_workers', 1))
+                    self.clicker.set_match_backend(self.config.get('match_backend', 'thread'))
                     self.clicker.set_loop_times(self.config.get('loop_times', 1))
                     
                     # 重新加载模板（如果图片目录改变）
@@ -478,6 +542,9 @@ def get_log_path():
         return os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'logs', 'app.log')
 
 if __name__ == "__main__":
+    # 打包后的 exe 中，多进程匹配后端的工作进程从这里进入，必须最先调用
+    multiprocessing.freeze_support()
+
     # 加载配置
     config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src', 'config', 'config.json')
     with open(config_path, 'r', encoding='utf-8') as f:
@@ -3,13 +3,21 @@
 主要功能：
 - 鼠标点击记录与回放
 - 图像识别与自动点击
+
+子模块在首次访问时才导入，避免启动时就加载 cv2、numpy、pyautogui、pynput 等重量级依赖
 """
+import importlib
+
 __version__ = "1.0.0"
 __author__ = "Your Name"
 
-from .core import ClickerBase, ClickRecorder, ImageClicker
-from .config import ConfigManager
-from .utils import setup_global_logging
+_LAZY_ATTRS = {
+    'ClickerBase': '.core',
+    'ClickRecorder': '.core',
+    'ImageClicker': '.core',
+    'ConfigManager': '.config',
+    'setup_global_logging': '.utils',
+}
 
 __all__ = [
     'ClickerBase',
@@ -18,3 +26,16 @@ __all__ = [
     'ConfigManager',
     'setup_global_logging'
 ]
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
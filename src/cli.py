@@ -0,0 +1,240 @@
+"""
+命令行入口，无需图形界面即可运行任务
+
+用法：
+    python -m src run-images [--config PATH] [--png-dir DIR] [--loops N]
+    python -m src replay-clicks --clicks FILE [--config PATH] [--loops N] [--interval SEC] [--mode recorded|fixed] [--speed X]
+    python -m src run-workflow --workflow FILE [--config PATH]
+    python -m src run-sessions --sessions FILE [--config PATH]
+"""
+import os
+import sys
+import json
+import signal
+import argparse
+import threading
+import logging
+
+from .config import ConfigManager
+from .utils import setup_global_logging
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CONFIG_PATH = os.path.join(PROJECT_ROOT, 'src', 'config', 'config.json')
+# 以项目根目录为基准的路径配置项
+PATH_KEYS = ('png_dir', 'log_file', 'template_cache_dir', 'recording_file', 'screen_source_path')
+
+# 退出码
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_INTERRUPTED = 130
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m src', description='按键精灵命令行运行器')
+    parser.add_argument('--config', default=DEFAULT_CONFIG_PATH, help='配置文件路径')
+    parser.add_argument('--log-level', help='覆盖配置中的日志级别')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    images = subparsers.add_parser('run-images', help='按图片模板识别并点击')
+    images.add_argument('--png-dir', help='图片模板目录')
+    images.add_argument('--loops', type=int, help='循环次数')
+    images.add_argument('--threshold', type=float, help='相似度阈值')
+    images.add_argument('--wait-time', type=float, help='每个模板的等待时间（秒）')
+    images.add_argument('--metrics-out', help='任务结束后导出指标，扩展名为 .prom 时使用 Prometheus 文本格式，否则为 JSON')
+
+    replay = subparsers.add_parser('replay-clicks', help='回放记录的点击')
+    replay.add_argument('--clicks', required=True, help='点击坐标文件，JSON 格式 [[x, y], ...]，或录制保存的 .rec 二进制文件')
+    replay.add_argument('--loops', type=int, help='循环次数')
+    replay.add_argument('--interval', type=float, help='点击间隔（秒）')
+    replay.add_argument('--mode', choices=('recorded', 'fixed'), help='recorded 按录制间隔回放全部事件，fixed 按固定间隔只回放点击')
+    replay.add_argument('--speed', type=float, help='回放速度倍数')
+
+    workflow = subparsers.add_parser('run-workflow', help='运行声明式工作流')
+    workflow.add_argument('--workflow', required=True, help='工作流文件，JSON 格式（安装 PyYAML 后也支持 YAML）')
+
+    sessions = subparsers.add_parser('run-sessions', help='在一个进程中并行运行多个任务')
+    sessions.add_argument('--sessions', required=True, help='任务列表文件，JSON 格式')
+    return parser
+
+
+def load_config(args):
+    """加载配置并应用命令行覆盖项（不写回配置文件）"""
+    config = ConfigManager(args.config)
+    overrides = {
+        'log_level': args.log_level,
+        'png_dir': getattr(args, 'png_dir', None),
+        'loop_times': getattr(args, 'loops', None),
+        'threshold': getattr(args, 'threshold', None),
+        'wait_time': getattr(args, 'wait_time', None),
+        'click_interval': getattr(args, 'interval', None),
+        'replay_mode': getattr(args, 'mode', None),
+        'replay_speed': getattr(args, 'speed', None),
+    }
+    for key, value in overrides.items():
+        if value is not None:
+            config.set(key, value)
+    # 相对路径以项目根目录为基准，与图形界面保持一致，不随当前目录变化
+    for key in PATH_KEYS:
+        value = config.get(key)
+        if value and not os.path.isabs(value):
+            config.set(key, os.path.join(PROJECT_ROOT, value))
+    return config
+
+
+def install_stop_handlers(stop_event, logger):
+    """Ctrl+C / SIGTERM 触发全局停止事件"""
+    def _handler(signum, _frame):
+        logger.info(f"收到信号 {signum}，正在停止...")
+        stop_event.set()
+
+    signal.signal(signal.SIGINT, _handler)
+    if hasattr(signal, 'SIGTERM'):
+        signal.signal(signal.SIGTERM, _handler)
+
+
+def write_metrics(metrics, path, logger):
+    """把指标写入文件，.prom 为 Prometheus 文本格式，其余为 JSON"""
+    text = metrics.to_prometheus() if path.endswith('.prom') else metrics.to_json()
+    try:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        logger.info(f"指标已导出: {path}")
+    except OSError as e:
+        logger.error(f"导出指标失败: {e}")
+
+
+def run_images(config, stop_event, logger, metrics_out=None):
+    from .core import ImageClicker
+
+    clicker = ImageClicker(config)
+    if not clicker.templates:
+        logger.error(f"没有可用的模板图片: {clicker.folder_path}")
+        return EXIT_FAILED
+    try:
+        completed = clicker.start(stop_event)
+    finally:
+        if metrics_out:
+            write_metrics(clicker.metrics, metrics_out, logger)
+    if stop_event.is_set():
+        return EXIT_INTERRUPTED
+    return EXIT_OK if completed else EXIT_FAILED
+
+
+def run_replay(config, clicks_path, stop_event, logger):
+    from .core import ClickRecorder
+
+    recorder = ClickRecorder(config)
+    if not recorder.load_file(clicks_path):
+        return EXIT_FAILED
+    if not recorder.clicks:
+        logger.error(f"点击文件中没有坐标: {clicks_path}")
+        return EXIT_FAILED
+
+    recorder.play_clicks(stop_event)
+    return EXIT_INTERRUPTED if stop_event.is_set() else EXIT_OK
+
+
+def run_workflow(config, workflow_path, stop_event, logger):
+    from .core import ImageClicker
+    from .core.workflow import Workflow, WorkflowRunner, WorkflowError
+
+    try:
+        workflow = Workflow.load(workflow_path)
+    except (OSError, WorkflowError) as e:
+        logger.error(f"加载工作流失败: {e}")
+        return EXIT_FAILED
+    if workflow.png_dir:
+        config.set('png_dir', workflow.png_dir)
+
+    clicker = ImageClicker(config)
+    try:
+        completed = WorkflowRunner(workflow, clicker, config, stop_event).run()
+    except WorkflowError as e:
+        logger.error(f"工作流执行失败: {e}")
+        return EXIT_FAILED
+    finally:
+        clicker.stop()
+    if stop_event.is_set():
+        return EXIT_INTERRUPTED
+    return EXIT_OK if completed else EXIT_FAILED
+
+
+def start_sessions(manager, specs, base_dir):
+    """按任务列表启动任务，specs 为 [{'name', 'type', 'file', 'config'}]"""
+    for i, spec in enumerate(specs):
+        name = spec.get('name') or f"task{i + 1}"
+        kind = spec.get('type', 'images')
+        overrides = dict(spec.get('config') or {})
+        png_dir = overrides.get('png_dir')
+        if png_dir and not os.path.isabs(png_dir):
+            overrides['png_dir'] = os.path.join(base_dir, png_dir)
+        path = spec.get('file')
+        if path and not os.path.isabs(path):
+            path = os.path.join(base_dir, path)
+        if kind == 'images':
+            manager.start_images(name, overrides)
+        elif kind in ('replay', 'workflow') and path:
+            start = manager.start_replay if kind == 'replay' else manager.start_workflow
+            start(name, path, overrides)
+        else:
+            raise ValueError(f"任务 {name}: 未知的类型 {kind} 或缺少 file")
+
+
+def run_sessions(config, sessions_path, stop_event, logger):
+    from .core.session import SessionManager
+    from .core.workflow import WorkflowError
+
+    try:
+        with open(sessions_path, 'r', encoding='utf-8') as f:
+            specs = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.error(f"读取任务列表失败: {e}")
+        return EXIT_FAILED
+
+    manager = SessionManager(config)
+    try:
+        start_sessions(manager, specs, os.path.dirname(os.path.abspath(sessions_path)))
+        while not manager.join(timeout=0.2):
+            if stop_event.is_set():
+                manager.stop_all()
+    except (OSError, ValueError, WorkflowError) as e:
+        logger.error(f"启动任务失败: {e}")
+        return EXIT_FAILED
+    finally:
+        manager.close()
+
+    statuses = {name: snapshot['status'] for name, snapshot in manager.status().items()}
+    logger.info(f"任务结束: {statuses}")
+    if stop_event.is_set():
+        return EXIT_INTERRUPTED
+    return EXIT_OK if all(status == 'done' for status in statuses.values()) else EXIT_FAILED
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    config = load_config(args)
+    if config.load_error:
+        # 命令行任务无人值守，不能在配置损坏时静默改用默认配置
+        print(f"配置文件无效: {args.config} ({config.load_error})", file=sys.stderr)
+        return EXIT_FAILED
+    setup_global_logging(config)
+    logger = logging.getLogger('cli')
+
+    stop_event = threading.Event()
+    install_stop_handlers(stop_event, logger)
+
+    try:
+        if args.command == 'run-images':
+            return run_images(config, stop_event, logger, args.metrics_out)
+        if args.command == 'run-workflow':
+            return run_workflow(config, args.workflow, stop_event, logger)
+        if args.command == 'run-sessions':
+            return run_sessions(config, args.sessions, stop_event, logger)
+        return run_replay(config, args.clicks, stop_event, logger)
+    except Exception as e:
+        logger.exception(f"任务执行出错: {e}")
+        return EXIT_FAILED
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -6,6 +6,8 @@ class ConfigManager:
     def __init__(self, config_path='config.json'):
         self.config_path = config_path
         self.logger = logging.getLogger('config_manager')
+        # 配置文件存在但无法解析时记录错误信息（此时使用默认配置）
+        self.load_error = None
         self._config = self._load_config()
 
     def _load_config(self):
@@ -17,6 +19,7 @@ class ConfigManager:
                 return self._get_default_config()
         except (FileNotFoundError, json.JSONDecodeError) as e:
             self.logger.warning(f"加载配置文件失败，使用默认配置: {e}")
+            self.load_error = str(e)
             return self._get_default_config()
 
     def _get_default_config(self):
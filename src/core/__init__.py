@@ -1,9 +1,67 @@
 """
 核心功能模块
 包含点击记录、图像匹配等核心自动化功能
+
+各子模块按需导入：只使用点击记录时不会加载 cv2、numpy 等图像依赖
 """
-from .base_clicker import ClickerBase
-from .click_recorder import ClickRecorder
-from .image_clicker import ImageClicker
+import importlib
+
+_LAZY_ATTRS = {
+    'ClickerBase': '.base_clicker',
+    'ClickRecorder': '.click_recorder',
+    'EventBuffer': '.recording',
+    'MouseEvent': '.recording',
+    'MoveCoalescer': '.path_simplify',
+    'simplify_moves': '.path_simplify',
+    'ReplayEngine': '.replay',
+    'ReplayStats': '.replay',
+    'ImageClicker': '.image_clicker',
+    'ScreenSource': '.screen_source',
+    'PyAutoGuiScreenSource': '.screen_source',
+    'MssScreenSource': '.screen_source',
+    'FileScreenSource': '.screen_source',
+    'ArrayScreenSource': '.screen_source',
+    'create_screen_source': '.screen_source',
+    'TemplateMatcher': '.matchers',
+    'DirectMatcher': '.matchers',
+    'PyramidMatcher': '.matchers',
+    'FFTMatcher': '.matchers',
+    'create_matcher': '.matchers',
+    'ScaleSelector': '.scales',
+    'TemplateCache': '.template_cache',
+    'TemplateEntry': '.template_cache',
+    'TemplateStore': '.template_store',
+    'TemplateRecord': '.template_store',
+    'FrameChangeDetector': '.change_detector',
+    'MonotonicClock': '.scheduler',
+    'FakeClock': '.scheduler',
+    'PollScheduler': '.scheduler',
+    'create_scheduler': '.scheduler',
+    'FrameWatcher': '.watcher',
+    'Match': '.watcher',
+    'Subscription': '.watcher',
+    'Workflow': '.workflow',
+    'WorkflowRunner': '.workflow',
+    'WorkflowError': '.workflow',
+    'SessionManager': '.session',
+    'Session': '.session',
+    'SharedScreenSource': '.session',
+    'InputDispatcher': '.input_dispatcher',
+    'ProgressReport': '.progress',
+    'ProgressChannel': '.progress',
+}
+
+__all__ = list(_LAZY_ATTRS)
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
 
-__all__ = ['ClickerBase', 'ClickRecorder', 'ImageClicker']
+def __dir__():
+    return sorted(list(globals()) + __all__)
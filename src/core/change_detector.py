@@ -0,0 +1,76 @@
+import threading
+import weakref
+import cv2
+import numpy as np
+
+
+class FrameChangeDetector:
+    """基于分块均值的画面变化检测
+
+    把灰度帧按 tile_size 分块求均值得到缩略签名，任一分块的均值变化超过 threshold 即认为画面有变化。
+    每个模板记住自己上次实际匹配时的签名，画面（或模板的搜索区域）没有变化时可以跳过重复匹配。
+    """
+
+    def __init__(self, tile_size=16, threshold=3.0):
+        self.tile_size = max(1, int(tile_size))
+        self.threshold = threshold
+        self.skipped = 0
+        self.performed = 0
+        self._last = {}
+        self._frame_ref = None
+        self._frame_sig = None
+        self._lock = threading.Lock()
+
+    def signature(self, frame):
+        """计算帧的分块均值签名，同一帧只计算一次"""
+        with self._lock:
+            if self._frame_ref is not None and self._frame_ref() is frame:
+                return self._frame_sig
+        height, width = frame.shape[:2]
+        size = (max(1, width // self.tile_size), max(1, height // self.tile_size))
+        sig = cv2.resize(frame, size, interpolation=cv2.INTER_AREA).astype(np.int16)
+        with self._lock:
+            self._frame_ref = weakref.ref(frame)
+            self._frame_sig = sig
+        return sig
+
+    def _region_signature(self, frame, region):
+        sig = self.signature(frame)
+        if region is None:
+            return sig
+        x, y, w, h = region
+        t = self.tile_size
+        return sig[max(0, y // t):(y + h) // t + 1, max(0, x // t):(x + w) // t + 1]
+
+    def has_changed(self, key, frame, region=None):
+        """与 key 上次匹配时相比画面是否变化；region 为 (x, y, w, h) 时只比较该区域覆盖的分块"""
+        sig = self._region_signature(frame, region)
+        with self._lock:
+            previous = self._last.get(key)
+        if previous is None or previous.shape != sig.shape:
+            return True
+        return int(np.abs(sig - previous).max(initial=0)) > self.threshold
+
+    def mark_matched(self, key, frame, region=None):
+        """记录 key 在这一帧上执行了匹配"""
+        sig = self._region_signature(frame, region)
+        with self._lock:
+            self._last[key] = sig
+            self.performed += 1
+
+    def mark_skipped(self):
+        with self._lock:
+            self.skipped += 1
+
+    def stats(self):
+        """返回跳过和实际执行的匹配次数"""
+        with self._lock:
+            return {'skipped': self.skipped, 'performed': self.performed}
+
+    def reset(self):
+        with self._lock:
+            self._last.clear()
+            self.skipped = 0
+            self.performed = 0
+            self._frame_ref = None
+            self._frame_sig = None
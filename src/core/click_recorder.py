@@ -1,17 +1,57 @@
+import os
+import json
 import threading
 import time
 from pynput import mouse
 import logging
 from .base_clicker import ClickerBase
+from .recording import (EventBuffer, EVENT_MOVE, EVENT_PRESS, EVENT_RELEASE, EVENT_SCROLL,
+                        BUTTON_CODES, BUTTON_NONE)
+from .replay import ReplayEngine, MouseDispatcher, DEFAULT_SPIN
+from .path_simplify import MoveCoalescer, simplify_moves
+from .input_dispatcher import InputDispatcher
+from .progress import ProgressChannel, ProgressReport
 
 class ClickRecorder(ClickerBase):
-    def __init__(self, config):
+    def __init__(self, config, dispatcher=None):
         super().__init__(config)
-        self.clicks = []
+        # 录制的鼠标事件（按下/抬起、按键、滚轮、移动及单调时钟时间戳）
+        self.events = EventBuffer()
         self.recording = False
         self.listener = None
         self.interval = self.get_config_value('click_interval', 0.1)
         self.is_playing = False  # 添加播放状态标志
+        self.record_moves = self.get_config_value('record_moves', True)
+        # 移动路径精简：录制时合并相近的移动点，停止后做 RDP 抽稀，原始路径误差不超过 move_tolerance 像素
+        self.move_tolerance = self.get_config_value('move_tolerance', 1.0)
+        self.coalescer = MoveCoalescer(
+            min_interval=self.get_config_value('move_min_interval', 0.01),
+            min_distance=self.get_config_value('move_min_distance', 2.0),
+            tolerance=self.move_tolerance / 2
+        )
+        # 回放：recorded 按录制时的间隔回放全部事件，fixed 按固定间隔只回放点击
+        self.replay_mode = self.get_config_value('replay_mode', 'fixed')
+        self.replay_speed = self.get_config_value('replay_speed', 1.0)
+        self.last_replay_stats = None
+        # 回放时的鼠标输入，多个任务共用时点击会串行化
+        self.dispatcher = dispatcher or InputDispatcher()
+        self.current_loop = 0
+        self.progress = ProgressChannel(self.get_config_value('progress_max_rate', 10.0))
+        self._replay_started = 0.0
+        # 停止录制时自动保存，启动时自动加载上一次的录制
+        self.recording_file = self.get_config_value('recording_file', 'data/recordings/last.rec')
+        self._record_start = 0.0
+        if self.recording_file and os.path.exists(self.recording_file):
+            self.load(self.recording_file)
+
+    @property
+    def clicks(self):
+        """录制中所有按下事件的位置 [(x, y)]"""
+        return self.events.clicks()
+
+    @clicks.setter
+    def clicks(self, clicks):
+        self.events = EventBuffer.from_clicks(clicks, self.interval)
 
     def start(self):
         """开始记录点击"""
@@ -19,15 +59,21 @@ class ClickRecorder(ClickerBase):
             self.logger.warning("已经在记录中，请先停止")
             return
         
+        self.events = EventBuffer()
+        self.coalescer.reset()
+        self._record_start = time.monotonic()
         self.recording = True
-        self.clicks = []
         
         # 停止旧的监听器（如果存在）
         if self.listener and self.listener.is_alive():
             self.listener.stop()
         
         # 创建新的监听器
-        self.listener = mouse.Listener(on_click=self.on_click)
+        self.listener = mouse.Listener(
+            on_click=self.on_click,
+            on_scroll=self.on_scroll,
+            on_move=self.on_move if self.record_moves else None
+        )
         self.listener.start()
         self.logger.info("开始记录点击")
 
@@ -44,49 +90,123 @@ class ClickRecorder(ClickerBase):
             self.listener.stop()
             self.listener = None
         
-        # 删除最后一个记录的点击（停止按钮的点击）
-        if self.clicks:
-            self.clicks.pop()
+        self._append_moves(self.coalescer.flush())
+        # 删除最后一个记录的点击（停止按钮的点击）及其之后的事件
+        last_press = self.events.last_index(EVENT_PRESS)
+        if last_press >= 0:
+            self.events.truncate(last_press)
+        if self.move_tolerance > 0:
+            self.events = simplify_moves(self.events, self.move_tolerance / 2)
         
-        self.logger.info(f"停止记录点击，共记录 {len(self.clicks)} 个点击")
+        self.logger.info(f"停止记录点击，共记录 {len(self.clicks)} 个点击，{len(self.events)} 个事件")
+        if self.recording_file:
+            self.save(self.recording_file)
+
+    def _timestamp(self):
+        return time.monotonic() - self._record_start
 
     def on_click(self, x, y, button, pressed):
-        # 记录点击位置
-        if self.recording and pressed:
-            self.clicks.append((x, y))
+        # 记录按下和抬起事件
+        if not self.recording:
+            return
+        code = BUTTON_CODES.get(getattr(button, 'name', button), BUTTON_NONE)
+        self._append_moves(self.coalescer.flush())
+        self.events.append(self._timestamp(), EVENT_PRESS if pressed else EVENT_RELEASE, x, y, code)
+        if pressed:
             self.logger.info(f"记录点击位置: ({x}, {y})")
 
+    def on_scroll(self, x, y, dx, dy):
+        if self.recording:
+            self._append_moves(self.coalescer.flush())
+            self.events.append(self._timestamp(), EVENT_SCROLL, x, y, dx=dx, dy=dy)
+
+    def on_move(self, x, y):
+        if self.recording:
+            self._append_moves(self.coalescer.feed(self._timestamp(), x, y))
+
+    def _append_moves(self, points):
+        for t, x, y in points:
+            self.events.append(t, EVENT_MOVE, x, y)
+
+    def save(self, path):
+        """把录制的事件保存为二进制文件"""
+        try:
+            self.events.save(path)
+            self.logger.info(f"录制已保存: {path} ({len(self.events)} 个事件)")
+            return True
+        except OSError as e:
+            self.logger.error(f"保存录制失败: {e}")
+            return False
+
+    def load(self, path):
+        """以内存映射方式加载录制文件"""
+        try:
+            self.events = EventBuffer.load(path)
+            self.logger.info(f"已加载录制: {path} ({len(self.events)} 个事件)")
+            return True
+        except (OSError, ValueError) as e:
+            self.logger.error(f"加载录制失败: {e}")
+            return False
+
+    def load_file(self, path):
+        """加载点击文件：.json 为坐标列表 [[x, y], ...]，其余按录制文件加载"""
+        if not path.lower().endswith('.json'):
+            return self.load(path)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self.clicks = [tuple(point) for point in json.load(f)]
+            return True
+        except (OSError, ValueError, TypeError) as e:
+            self.logger.error(f"读取点击文件失败: {e}")
+            return False
+
     def play_clicks(self, stop_event=None):
-        """播放记录的点击，支持全局停止"""
-        if not self.clicks:
+        """按截止时间回放录制的事件，支持全局停止"""
+        clicks = self.clicks
+        if not clicks and (self.replay_mode != 'recorded' or not len(self.events)):
             self.logger.warning("没有记录的点击可以播放")
             return
         
         self.is_playing = True
-        self.logger.info(f"开始播放点击，循环次数: {self.loop_times}, 点击数: {len(self.clicks)}")
+        self.current_loop = 0
+        self.progress.reset()
+        self._replay_started = time.monotonic()
+        self.logger.info(f"开始播放点击，循环次数: {self.loop_times}, 点击数: {len(clicks)}, "
+                         f"模式: {self.replay_mode}, 速度: {self.replay_speed}x")
         
         try:
-            controller = mouse.Controller()
-            for loop_idx in range(self.loop_times):
-                if self._should_stop_playback(stop_event):
-                    self.logger.info(f"播放点击被停止（循环 {loop_idx + 1}/{self.loop_times}）")
-                    break
-                    
-                for idx, click in enumerate(self.clicks):
-                    if self._should_stop_playback(stop_event):
-                        self.logger.info(f"播放点击被停止（点击 {idx + 1}/{len(self.clicks)}）")
-                        return
-                    
-                    controller.position = click
-                    controller.click(mouse.Button.left, 1)
-                    time.sleep(self.interval)
-                
-                if self.loop_times > 1 and loop_idx < self.loop_times - 1:
-                    self.logger.info(f"完成第 {loop_idx + 1}/{self.loop_times} 次循环")
-                    
-            self.logger.info("播放点击完成")
+            engine = ReplayEngine(
+                MouseDispatcher(self.dispatcher.controller, self.dispatcher.button_type,
+                                lock=self.dispatcher.lock),
+                mode=self.replay_mode,
+                interval=self.interval,
+                speed=self.replay_speed,
+                spin=self.get_config_value('replay_spin', DEFAULT_SPIN),
+                max_lag=self.get_config_value('replay_max_lag', 0.1)
+            )
+            completed = engine.run(self.events, self.loop_times, stop_event,
+                                   should_stop=lambda: not self.is_playing,
+                                   on_loop=self._on_replay_loop)
+            self.last_replay_stats = engine.stats.summary()
+            stats = self.last_replay_stats
+            self.logger.info(
+                f"回放时间偏差: 平均 {stats['mean_ms']:.2f} ms, p50 {stats['p50_ms']:.2f} ms, "
+                f"p99 {stats['p99_ms']:.2f} ms, 最大 {stats['max_ms']:.2f} ms ({stats['events']} 个事件)"
+            )
+            if completed:
+                self.progress.publish(self._replay_report(done=True), force=True)
+                self.logger.info("播放点击完成")
         finally:
             self.is_playing = False
+
+    def _on_replay_loop(self, loop_idx):
+        self.current_loop = loop_idx
+        self.progress.publish(self._replay_report())
+
+    def _replay_report(self, done=False):
+        # 回放的进度按轮次计算，每轮视为一个步骤
+        return ProgressReport(self.current_loop, self.loop_times, 0, 1,
+                              elapsed=time.monotonic() - self._replay_started, done=done)
     
     def _should_stop_playback(self, stop_event):
         """检查是否应该停止播放"""
@@ -102,3 +222,8 @@ class ClickRecorder(ClickerBase):
         """设置点击间隔"""
         self.interval = interval
         self.logger.info(f"设置点击间隔为: {interval} 秒")
+
+    def set_replay_speed(self, speed):
+        """设置回放速度倍数"""
+        self.replay_speed = speed if speed and speed > 0 else 1.0
+        self.logger.info(f"设置回放速度为: {self.replay_speed}x")
@@ -1,135 +1,674 @@
-import cv2
-import numpy as np
-import pyautogui
 import time
-from pynput.mouse import Button, Controller
 import os
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from .base_clicker import ClickerBase
+from .screen_source import create_screen_source
+from .region import RegionManager, clip_region
+from .matchers import create_matcher, order_matches
+from .template_cache import TemplateCache
+from .template_store import TemplateStore
+from .change_detector import FrameChangeDetector
+from .scales import ScaleSelector
+from .scheduler import MonotonicClock, create_scheduler
+from .progress import ProgressChannel, ProgressReport
+from .watcher import FrameWatcher
+from .input_dispatcher import InputDispatcher
+from .process_pool import ProcessMatchPool, MATCH_SETTINGS
+from ..utils.metrics import MetricsRegistry, COUNT_BUCKETS
 
 class ImageClicker(ClickerBase):
-    def __init__(self, config):
+    def __init__(self, config, screen_source=None, clock=None, metrics=None,
+                 template_cache=None, dispatcher=None):
         super().__init__(config)
         self.folder_path = self.get_config_value('png_dir', 'png')
         self.threshold = self.get_config_value('threshold', 0.8)
         self.wait_time = self.get_config_value('wait_time', 5)
         self.immediate_click = self.get_config_value('immediate_click', False)
-        self.mouse = Controller()
+        # 共享截图的最大有效期（秒），同一轮询周期内所有模板复用一帧；为 0 时每次匹配都重新截图
+        self.frame_max_age = self.get_config_value('frame_max_age', 0.1)
+        self._frame = None
+        self._frame_time = 0.0
+        self._frame_lock = threading.Lock()
+        # 并行匹配的工作线程数，1 表示按顺序逐个匹配
+        self.match_workers = max(1, int(self.get_config_value('match_workers', 1)))
+        # 并行匹配后端：thread 为线程池，process 为多进程（模板库很大时使用）
+        self.match_backend = self.get_config_value('match_backend', 'thread')
+        # 截图、匹配、点击耗时及命中率等指标
+        self.metrics = metrics if metrics is not None else MetricsRegistry()
+        # 画面未变化时跳过重复匹配
+        self.change_detector = None
+        if self.get_config_value('change_detection', True):
+            self.change_detector = FrameChangeDetector(
+                tile_size=self.get_config_value('change_tile_size', 16),
+                threshold=self.get_config_value('change_threshold', 3.0)
+            )
+        self._last_results = {}
+        self._frame_changed = {}
+        # 轮询调度：clock 可注入假时钟，便于测试
+        self.clock = clock or MonotonicClock()
+        self.scheduler = create_scheduler(config, self.clock)
+        self.loop_interval = self.get_config_value('loop_interval', 0.5)
+        # 截图后端可注入，便于无显示环境下回放和测试
+        self.screen_source = screen_source or create_screen_source(config)
+        self.matcher = create_matcher(config)
+        # 多尺度匹配：按 match_scales 生成模板缩放变体，适配不同的显示缩放（DPI）
+        self.scales = ScaleSelector(self.get_config_value('match_scales', [1.0]))
+        self._match_sizes = {}
+        self._match_scales = {}
+        # 全部匹配模式：命中后在同一帧上找出模板的全部位置，按 match_order 一次点击完
+        self.match_all = self.get_config_value('match_all', False)
+        self.match_order = self.get_config_value('match_order', 'reading')
+        self.nms_overlap = self.get_config_value('nms_overlap', 0.3)
+        self.match_max_results = self.get_config_value('match_max_results', 50)
+        # 模板缓存和鼠标输入可由多个任务共用（见 SessionManager）
+        self.template_cache = template_cache or TemplateCache(
+            self.get_config_value('template_cache_dir', 'data/cache/templates'),
+            pyramid_levels=self.get_config_value('pyramid_levels', 2)
+        )
+        self.dispatcher = dispatcher or InputDispatcher()
+        self.regions = RegionManager(
+            self.folder_path,
+            manifest_name=self.get_config_value('roi_manifest', 'regions.json'),
+            auto_learn=self.get_config_value('roi_auto_learn', False),
+            margin=self.get_config_value('roi_margin', 50),
+            learned_name=self.get_config_value('roi_learned_file', 'regions.learned.json')
+        )
         self.templates = self.load_templates()
         self.is_running = True
         self.current_loop = 0
-        self.progress_callback = None  # 用于报告进度的回调函数
+        # 进度通道：合并高频进度更新，回调频率不超过 progress_max_rate
+        self.progress = ProgressChannel(self.get_config_value('progress_max_rate', 10.0), self.clock)
+        self._progress_counts = [0, 0]  # [命中数, 未命中数]
+        self._run_started = 0.0
+        # wait_for / watch 共用的截图循环，首次订阅时创建
+        self._watcher = None
+        self._watcher_lock = threading.Lock()
 
     def start(self, stop_event=None):
         self.is_running = True
         self.current_loop = 0
+        self.invalidate_frame()
+        self._last_results = {}
+        self._frame_changed = {}
+        self.scheduler.reset()
+        self.progress.reset()
+        self._progress_counts = [0, 0]
+        self._run_started = self.clock.now()
+        if self.change_detector is not None:
+            self.change_detector.reset()
         interval = self.get_config_value('click_interval', 0.1)
-        self.find_and_click(interval, stop_event)
+        return self.find_and_click(interval, stop_event)
 
     def stop(self):
         self.is_running = False
+        if self._watcher is not None:
+            self._watcher.close()
         self.logger.info("停止图片识别点击")
 
+    @property
+    def watcher(self):
+        """wait_for / watch 共用的截图循环"""
+        with self._watcher_lock:
+            if self._watcher is None:
+                self._watcher = FrameWatcher(self)
+            return self._watcher
+
+    def watch(self, templates, on_match=None, once=False, on_close=None):
+        """订阅一个或多个模板，出现时以 Match 为参数在截图线程中回调 on_match，返回可取消的 Subscription
+
+        templates 可以是模板目录中的文件名、图片路径、(名称, 图像) 元组或它们的列表。
+        所有订阅共用一个截图循环，每一帧上每个模板只匹配一次。
+        on_close 在订阅结束（命中后自动取消、cancel() 或 stop()）时以最后的 Match 或 None 为参数调用。
+        """
+        if isinstance(templates, (str, tuple)):
+            templates = [templates]
+        resolved = [self.resolve_template(template) for template in templates]
+        return self.watcher.subscribe(resolved, on_match, once, on_close)
+
+    def wait_for(self, templates, timeout=None, stop_event=None):
+        """阻塞等待任一模板出现，返回 Match；超时、被停止或调用 stop() 时返回 None"""
+        subscription = self.watch(templates, once=True)
+        try:
+            return subscription.wait(timeout, stop_event)
+        finally:
+            subscription.cancel()
+
+    async def wait_for_async(self, templates, timeout=None):
+        """wait_for 的 asyncio 版本，等待期间不阻塞事件循环；超时或调用 stop() 时返回 None"""
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def _resolve(match):
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(match))
+
+        # stop() 关闭订阅时以 None 结束等待
+        subscription = self.watch(templates, _resolve, once=True, on_close=_resolve)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            subscription.cancel()
+
+    def click_match(self, match):
+        """点击 wait_for / watch 返回的命中位置"""
+        self._click_at_location(match.location, match.size)
+        self.invalidate_frame()
+
+    def resolve_template(self, template):
+        """把文件名、路径或 (名称, 图像) 转换为 (名称, 图像)"""
+        if isinstance(template, tuple):
+            return template
+        for filename, image in self.templates:
+            if filename == template:
+                return filename, image
+        path = template if os.path.isabs(template) else os.path.join(self.folder_path, template)
+        if not os.path.exists(path):
+            path = template
+        entry = self.template_cache.load(path)
+        if entry is None:
+            raise FileNotFoundError(f"找不到模板图片: {template}")
+        if hasattr(self.matcher, 'register_template'):
+            self.matcher.register_template(entry.image, entry.pyramid)
+        self.scales.prepare(template, entry.image)
+        return template, entry.image
+
     def load_templates(self):
-        # 加载模板图片
-        templates = []
+        """加载模板图片到紧凑存储（TemplateStore），存储由共用模板缓存的任务共享，未变化时直接复用"""
+        # 模板目录可能已改变，同步重新加载搜索区域清单
+        self.regions.folder_path = self.folder_path
+        self.regions.load()
+        self.scales.clear()
+        self._match_sizes = {}
+        self._match_scales = {}
+        uses_pyramid = hasattr(self.matcher, 'register_template')
+        if uses_pyramid:
+            # 旧模板的金字塔随旧存储一起释放
+            self.matcher.clear_templates()
+        store = TemplateStore()
         try:
             if not os.path.exists(self.folder_path):
                 self.logger.error(f"图片文件夹不存在: {self.folder_path}")
-                return templates
-                
-            for filename in sorted(os.listdir(self.folder_path)):
-                if filename.endswith(".png"):
-                    template_path = os.path.join(self.folder_path, filename)
-                    template = cv2.imread(template_path, 0)
-                    if template is None:
-                        self.logger.warning(f"无法读取图片: {template_path}")
-                        continue
-                    templates.append((filename, template))
+            else:
+                store, _ = self.template_cache.load_store(
+                    self.folder_path,
+                    pyramid_levels=self.get_config_value('pyramid_levels', 2) if uses_pyramid else 0,
+                    edges=self.get_config_value('template_edges', False)
+                )
         except Exception as e:
             self.logger.error(f"加载模板图片时出错: {e}")
-        return templates
+
+        for filename, image in store:
+            pyramid = store.pyramid(filename)
+            if uses_pyramid:
+                self.matcher.register_template(image, pyramid)
+            self.scales.prepare(filename, image)
+        if store:
+            stats = store.stats()
+            self.metrics.gauge('clicker_template_bytes', '模板存储占用的内存（字节）').set(stats['resident_bytes'])
+            self.logger.info(f"已加载 {stats['templates']} 个模板，占用 {stats['resident_bytes'] / 1024:.1f} KB")
+        return store
 
     def find_and_click(self, interval, stop_event=None):
         """查找并点击图片，带进度报告"""
         total_templates = len(self.templates)
         if total_templates == 0:
             self.logger.warning("没有加载任何模板图片")
-            if self.progress_callback:
-                self.progress_callback(100.0)
+            self._publish_progress(0, done=True)
             return False
-            
-        while self.is_running and self.current_loop < self.loop_times:
-            if stop_event and stop_event.is_set():
-                self.logger.info("图片识别点击被全局停止")
-                break
-                
-            self.logger.info(f"开始第 {self.current_loop + 1}/{self.loop_times} 次循环")
-            
-            for idx, (filename, template) in enumerate(self.templates):
-                if not self.is_running or (stop_event and stop_event.is_set()):
-                    return False
-                
-                progress = self._calculate_progress(idx, total_templates)
-                if self.progress_callback:
-                    self.progress_callback(progress)
-                
-                if self._find_and_click_template(filename, template, interval, stop_event):
-                    self.logger.info(f"成功点击图片 [{idx+1}/{total_templates}]: {filename} (进度: {progress:.1f}%)")
+
+        # match_workers > 1 时在线程池或进程池中并行匹配所有待点击模板
+        pool = None
+        if self.match_workers > 1:
+            pool = self._create_match_pool()
+        try:
+            while self.is_running and self.current_loop < self.loop_times:
+                if stop_event and stop_event.is_set():
+                    self.logger.info("图片识别点击被全局停止")
+                    break
+
+                self.logger.info(f"开始第 {self.current_loop + 1}/{self.loop_times} 次循环")
+
+                if pool is not None:
+                    completed = self._run_parallel_pass(pool, interval, stop_event)
                 else:
-                    self.logger.debug(f"未找到图片 [{idx+1}/{total_templates}]: {filename}")
-                
-            self.current_loop += 1
-            if self.current_loop < self.loop_times:
-                self.logger.info(f"完成第 {self.current_loop}/{self.loop_times} 次循环")
-                time.sleep(0.5)
-        
+                    completed = self._run_sequential_pass(interval, stop_event)
+                if not completed:
+                    return False
+
+                self.current_loop += 1
+                if self.current_loop < self.loop_times:
+                    self.logger.info(f"完成第 {self.current_loop}/{self.loop_times} 次循环")
+                    self.clock.sleep(self.loop_interval, stop_event)
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=True)
+            self._log_match_times()
+            self.regions.save_learned()
+
         # 完成时报告100%
-        if self.progress_callback:
-            self.progress_callback(100.0)
-        
+        self._publish_progress(total_templates - 1, done=True)
+
         self.is_running = False
         self.logger.info("图片识别点击任务完成")
         return True
-    
-    def _calculate_progress(self, current_idx, total_templates):
-        """计算当前的进度百分比"""
-        loop_progress = self.current_loop / self.loop_times
-        template_progress = (current_idx + 1) / total_templates / self.loop_times
-        return (loop_progress + template_progress) * 100
 
-    def _find_and_click_template(self, filename, template, interval, stop_event=None):
-        start_time = time.time()
-        while time.time() - start_time < self.wait_time:
-            if not self.is_running or (stop_event and stop_event.is_set()):
+    def _create_match_pool(self):
+        if self.match_backend == 'process':
+            settings = {key: self.get_config_value(key) for key in MATCH_SETTINGS
+                        if self.get_config_value(key) is not None}
+            return ProcessMatchPool(self.templates, settings, self.match_workers)
+        if self.match_backend != 'thread':
+            self.logger.warning(f"未知的匹配后端: {self.match_backend}，使用 thread")
+        return ThreadPoolExecutor(max_workers=self.match_workers, thread_name_prefix='matcher')
+
+    def _should_stop(self, stop_event):
+        return not self.is_running or (stop_event and stop_event.is_set())
+
+    def _run_sequential_pass(self, interval, stop_event):
+        """按文件夹顺序逐个等待并点击模板，被停止时返回 False"""
+        total_templates = len(self.templates)
+        for idx, (filename, template) in enumerate(self.templates):
+            if self._should_stop(stop_event):
                 return False
-                
-            max_val, max_loc = self._match_template_on_screen(template)
-            
-            if max_val >= self.threshold:
-                self._click_at_location(max_loc, template)
+
+            self._publish_progress(idx)
+            found = self._find_and_click_template(filename, template, interval, stop_event)
+            if found is None:
+                return False
+            self._record_template_result(idx, filename, found)
+        return True
+
+    def _run_parallel_pass(self, pool, interval, stop_event):
+        """每个轮询周期截取一帧，在线程池中并行匹配所有待点击模板
+
+        点击仍按文件夹顺序进行：只有排在最前面的待点击模板命中时才点击，
+        排在最前面的模板超过 wait_time（从它成为最前面的模板时起算，与顺序模式一致）仍未命中时被跳过。
+        被停止时返回 False。
+        """
+        total_templates = len(self.templates)
+        head = 0
+        last_action = self.clock.now()
+        self.scheduler.reset()
+        polls = {}
+        best_scores = {}
+        while head < total_templates:
+            if self._should_stop(stop_event):
+                return False
+
+            frame = self.get_frame()
+            pending = self.templates[head:]
+            if isinstance(pool, ProcessMatchPool):
+                results = self._match_in_processes(pool, pending, frame)
+            else:
+                results = list(pool.map(
+                    lambda item: self._match_template_on_screen(item[1], item[0], frame), pending
+                ))
+            for (filename, _), (max_val, _) in zip(pending, results):
+                polls[filename] = polls.get(filename, 0) + 1
+                best_scores[filename] = max(best_scores.get(filename, -1.0), max_val)
+
+            clicked = False
+            for (filename, template), (max_val, max_loc) in zip(pending, results):
+                if max_val >= self.threshold:
+                    self._click_hit(filename, template, max_loc, frame, interval, stop_event)
+                    self.invalidate_frame()
+                    self._observe_wait(filename, polls.pop(filename, 0), best_scores.pop(filename, None))
+                    self._record_template_result(head, filename, True)
+                    self.scheduler.reset(filename)
+                    head += 1
+                    last_action = self.clock.now()
+                    clicked = True
+                    # 点击后画面已变化，其余模板需要在新的一帧上重新匹配
+                    break
+                if self.clock.now() - last_action < self.wait_time:
+                    break
+                self._observe_wait(filename, polls.pop(filename, 0), best_scores.pop(filename, None))
+                self._record_template_result(head, filename, False)
+                head += 1
+                # 与顺序模式一致：下一个模板从成为当前模板时起重新计算 wait_time
+                last_action = self.clock.now()
+
+            if clicked:
                 if not self.immediate_click:
-                    time.sleep(interval)
-                return True
-            time.sleep(0.1)
-        return False
+                    self.clock.sleep(interval, stop_event)
+            elif head < total_templates:
+                head_name = self.templates[head][0]
+                self.scheduler.record(head_name, False, self._frame_changed.get(head_name, False))
+                self.scheduler.wait(head_name, stop_event, last_action + self.wait_time)
+        return True
+
+    def _record_template_result(self, idx, filename, found):
+        """统计并记录单个模板的结果，同时发布进度"""
+        total_templates = len(self.templates)
+        self._progress_counts[0 if found else 1] += 1
+        name = 'clicker_template_hits_total' if found else 'clicker_template_misses_total'
+        self.metrics.counter(name, '模板命中/未命中次数', template=filename).inc()
+        report = self._publish_progress(idx)
+        if found:
+            self.logger.info(f"成功点击图片 [{idx+1}/{total_templates}]: {filename} (进度: {report.percent:.1f}%)")
+        else:
+            self.logger.debug(f"未找到图片 [{idx+1}/{total_templates}]: {filename}")
+
+    def _publish_progress(self, current_idx, done=False):
+        """发布结构化进度（循环、模板序号、命中/未命中数、预计剩余时间）"""
+        matched, missed = self._progress_counts
+        report = ProgressReport(
+            min(self.current_loop, self.loop_times - 1), self.loop_times, current_idx, len(self.templates),
+            matched=matched, missed=missed,
+            elapsed=self.clock.now() - self._run_started, done=done
+        )
+        self.progress.publish(report, force=done)
+        return report
+
+    def _find_and_click_template(self, filename, template, interval, stop_event=None):
+        """在 wait_time 内轮询并点击单个模板，返回是否点击；被停止时返回 None"""
+        self.scheduler.reset(filename)
+        deadline = self.clock.now() + self.wait_time
+        polls = 0
+        best_score = None
+        try:
+            while self.clock.now() < deadline:
+                if not self.is_running or (stop_event and stop_event.is_set()):
+                    return None
+
+                frame = self.get_frame()
+                max_val, max_loc = self._match_template_on_screen(template, filename, frame)
+                polls += 1
+                best_score = max_val if best_score is None else max(best_score, max_val)
+
+                if max_val >= self.threshold:
+                    self._click_hit(filename, template, max_loc, frame, interval, stop_event)
+                    # 点击后画面会变化，丢弃共享帧
+                    self.invalidate_frame()
+                    if not self.immediate_click:
+                        self.clock.sleep(interval, stop_event)
+                    return True
+                # 按调度策略决定下一次轮询时间：持续未命中时退避，画面变化后快速轮询
+                self.scheduler.record(filename, False, self._frame_changed.get(filename, False))
+                self.scheduler.wait(filename, stop_event, deadline)
+            return False
+        finally:
+            self._observe_wait(filename, polls, best_score)
+
+    def _observe_wait(self, filename, polls, best_score):
+        """记录一次等待中的轮询次数和最高相似度"""
+        if polls:
+            self.metrics.histogram('clicker_polls_per_template', '每个模板等待期间的轮询次数',
+                                   buckets=COUNT_BUCKETS, template=filename).observe(polls)
+        if best_score is not None:
+            self.metrics.gauge('clicker_best_score', '最近一次等待中的最高相似度', template=filename).set(best_score)
     
-    def _match_template_on_screen(self, template):
-        """在屏幕截图上进行模板匹配，返回匹配值和位置"""
-        screenshot = pyautogui.screenshot()
-        screenshot = cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2GRAY)
-        res = cv2.matchTemplate(screenshot, template, cv2.TM_CCOEFF_NORMED)
-        _, max_val, _, max_loc = cv2.minMaxLoc(res)
+    def _match_template_on_screen(self, template, filename=None, screenshot=None):
+        """在屏幕截图上进行模板匹配，返回匹配值和位置（屏幕坐标）
+
+        模板配置了搜索区域时只在区域内匹配；自动学习的区域未命中时回退到全屏搜索。
+        screenshot 为空时使用共享帧。
+        """
+        return self._locate(template, filename, screenshot)
+
+    def _locate(self, template, filename, screenshot):
+        if screenshot is None:
+            screenshot = self.get_frame()
+        region = self.regions.get_region(filename) if filename else None
+        if self.change_detector is None or not filename:
+            return self._timed_search(template, filename, screenshot, region)
+
+        watch_region = self._watch_region(filename)
+        last_result = self._unchanged_result(filename, screenshot, watch_region)
+        if last_result is not None:
+            return last_result
+        result = self._timed_search(template, filename, screenshot, region)
+        self._remember_result(filename, screenshot, watch_region, result)
+        return result
+
+    def _timed_search(self, template, filename, screenshot, region):
+        """执行匹配并记录耗时；画面未变化而跳过的匹配只计入 clicker_match_skipped_total"""
+        start = time.perf_counter()
+        try:
+            return self._search(template, filename, screenshot, region)
+        finally:
+            if filename:
+                self._record_match_time(filename, time.perf_counter() - start)
+
+    def _watch_region(self, filename):
+        """画面变化检测的范围：声明的搜索区域，其余情况为全屏（None）"""
+        region = self.regions.get_region(filename)
+        return None if region is None or self.regions.is_learned(filename) else region
+
+    def _unchanged_result(self, filename, screenshot, watch_region):
+        """画面（或声明的搜索区域）与上次匹配时相同时返回上次的结果，否则返回 None"""
+        last_result = self._last_results.get(filename)
+        if last_result is not None and not self.change_detector.has_changed(filename, screenshot, watch_region):
+            self.change_detector.mark_skipped()
+            self.metrics.counter('clicker_match_skipped_total', '画面未变化而跳过的匹配次数').inc()
+            self._frame_changed[filename] = False
+            return last_result
+        self._frame_changed[filename] = True
+        return None
+
+    def _remember_result(self, filename, screenshot, watch_region, result):
+        self.change_detector.mark_matched(filename, screenshot, watch_region)
+        self._last_results[filename] = result
+
+    def _match_in_processes(self, pool, pending, frame):
+        """在匹配进程中匹配 pending 中的模板，返回与 pending 顺序一致的 [(max_val, max_loc)]
+
+        画面变化检测、搜索区域学习和多尺度比例的记录仍在本进程中完成。
+        """
+        display = self._display_key(frame) if self.scales.enabled else None
+        results = [None] * len(pending)
+        watch_regions = {}
+        jobs = []
+        for i, (filename, _) in enumerate(pending):
+            if self.change_detector is not None:
+                watch_regions[filename] = self._watch_region(filename)
+                results[i] = self._unchanged_result(filename, frame, watch_regions[filename])
+                if results[i] is not None:
+                    continue
+            region = self.regions.get_region(filename)
+            jobs.append((pool.index[filename], region, self.regions.is_learned(filename)))
+
+        matched = pool.match(frame, jobs, self.threshold, display)
+        for i, (filename, template) in enumerate(pending):
+            if results[i] is not None:
+                continue
+            max_val, max_loc, scale, size, elapsed = matched[pool.index[filename]]
+            if size is not None:
+                self._match_sizes[filename] = size
+                self._match_scales[filename] = scale
+                if max_val >= self.threshold:
+                    self.scales.record_hit(display, scale)
+            if max_val >= self.threshold:
+                self.regions.record_hit(filename, max_loc, self._matched_size(filename, template))
+            if filename in watch_regions:
+                self._remember_result(filename, frame, watch_regions[filename], (max_val, max_loc))
+            self._record_match_time(filename, elapsed)
+            results[i] = (max_val, max_loc)
+        return results
+
+    def _search(self, template, filename, screenshot, region):
+        display = self._display_key(screenshot) if self.scales.enabled else None
+        if region is not None:
+            max_val, max_loc = self._match_in_region(screenshot, template, region, filename, display)
+            if max_val is None:
+                self.logger.warning(f"搜索区域小于模板，改为全屏搜索: {filename} {region}")
+            elif max_val >= self.threshold or not self.regions.is_learned(filename):
+                return max_val, max_loc
+        max_val, max_loc = self._match(screenshot, template, filename, display)
+        if filename and max_val >= self.threshold:
+            self.regions.record_hit(filename, max_loc, self._matched_size(filename, template))
         return max_val, max_loc
+
+    def _match_in_region(self, screenshot, template, region, filename=None, display=None):
+        """在区域内匹配，区域放不下模板时返回 (None, None)"""
+        x, y, w, h = clip_region(region, screenshot.shape)
+        th, tw = template.shape[:2]
+        if w < tw or h < th:
+            return None, None
+        max_val, (loc_x, loc_y) = self._match(screenshot[y:y + h, x:x + w], template, filename, display)
+        return max_val, (loc_x + x, loc_y + y)
+
+    def _match(self, screenshot, template, filename=None, display=None):
+        """使用配置的匹配引擎执行模板匹配，返回最大相似度和位置
+
+        启用多尺度匹配时依次尝试各缩放变体，取得分最高者并记录其尺寸供点击使用；
+        某个比例达到阈值即停止尝试，并记住该显示器的缩放比例。
+        """
+        if display is None or not filename:
+            return self.matcher.match(screenshot, template, self.threshold)
+        best_val, best_loc, best_scale, best_size = self.scales.best_match(
+            self.matcher, screenshot, filename, template, display, self.threshold)
+        if best_size is not None:
+            self._match_sizes[filename] = best_size
+            self._match_scales[filename] = best_scale
+        return best_val, best_loc
+
+    def _find_all(self, template, filename, screenshot):
+        """在同一帧上找出模板的全部匹配位置，按 match_order 排序，返回 [(score, (x, y))]
+
+        使用最近一次命中的缩放变体；声明了搜索区域时只在区域内查找。
+        """
+        variant = self.scales.variant(filename, self._match_scales.get(filename), template)
+        x, y = 0, 0
+        region = self.regions.get_region(filename)
+        if region is not None and not self.regions.is_learned(filename):
+            x, y, w, h = clip_region(region, screenshot.shape)
+            screenshot = screenshot[y:y + h, x:x + w]
+        matches = self.matcher.match_all(screenshot, variant, self.threshold,
+                                         self.nms_overlap, self.match_max_results)
+        matches = [(score, (lx + x, ly + y)) for score, (lx, ly) in matches]
+        return order_matches(matches, self.match_order, variant.shape[::-1])
+
+    def _click_hit(self, filename, template, max_loc, screenshot, interval, stop_event=None):
+        """点击命中的模板；match_all 开启时在同一帧上找出全部匹配并依次点击"""
+        size = self._matched_size(filename, template)
+        locations = [max_loc]
+        if self.match_all:
+            locations = [loc for _, loc in self._find_all(template, filename, screenshot)] or [max_loc]
+            self.metrics.histogram('clicker_batch_size', '全部匹配模式下一帧内点击的位置数',
+                                   buckets=COUNT_BUCKETS, template=filename).observe(len(locations))
+        for i, location in enumerate(locations):
+            if i:
+                if self._should_stop(stop_event):
+                    break
+                if not self.immediate_click:
+                    self.clock.sleep(interval, stop_event)
+            self._click_at_location(location, size)
+        if len(locations) > 1:
+            self.logger.info(f"在同一帧上点击了 {len(locations)} 处: {filename}")
+
+    def _display_key(self, screenshot):
+        """用截图后端和帧尺寸标识显示器"""
+        height, width = screenshot.shape[:2]
+        monitor = getattr(self.screen_source, 'monitor', None)
+        suffix = f"#{monitor}" if monitor is not None else ''
+        return f"{self.screen_source.name}{suffix}:{width}x{height}"
+
+    def _matched_size(self, filename, template):
+        """模板最近一次匹配所用变体的 (宽, 高)，未使用多尺度时为模板本身的尺寸"""
+        size = self._match_sizes.get(filename) if filename else None
+        return size or template.shape[::-1]
     
-    def _click_at_location(self, location, template):
-        """在指定位置点击，使用模板的中心"""
+    def _record_match_time(self, filename, elapsed):
+        """记录单个模板的匹配耗时"""
+        self.metrics.histogram('clicker_match_seconds', '单个模板的匹配耗时（秒）', template=filename).observe(elapsed)
+
+    def get_match_time_stats(self):
+        """返回每个模板的匹配耗时统计 {文件名: {'count', 'avg_ms', 'max_ms'}}"""
+        stats = {}
+        for labels, histogram in self.metrics.find('clicker_match_seconds'):
+            count = histogram.count
+            if count:
+                stats[labels['template']] = {
+                    'count': count,
+                    'avg_ms': histogram.sum / count * 1000,
+                    'max_ms': histogram.max * 1000
+                }
+        return stats
+
+    def get_metrics_summary(self):
+        """返回用于界面展示的指标摘要"""
+        capture = self.metrics.histogram('clicker_capture_seconds', backend=self.screen_source.name)
+        click = self.metrics.histogram('clicker_click_seconds')
+        match_count = match_sum = 0
+        for _, histogram in self.metrics.find('clicker_match_seconds'):
+            match_count += histogram.count
+            match_sum += histogram.sum
+        hits = sum(c.value for _, c in self.metrics.find('clicker_template_hits_total'))
+        misses = sum(c.value for _, c in self.metrics.find('clicker_template_misses_total'))
+        return {
+            'capture_p50_ms': capture.quantile(0.5) * 1000,
+            'capture_p99_ms': capture.quantile(0.99) * 1000,
+            'match_avg_ms': match_sum / match_count * 1000 if match_count else 0.0,
+            'click_p50_ms': click.quantile(0.5) * 1000,
+            'hit_rate': hits / (hits + misses) if hits + misses else None,
+        }
+
+    def _log_match_times(self):
+        stats = self.get_match_time_stats()
+        if not stats:
+            return
+        slowest = sorted(stats.items(), key=lambda item: item[1]['avg_ms'], reverse=True)[:5]
+        summary = ', '.join(f"{name}: {s['avg_ms']:.1f}ms×{s['count']}" for name, s in slowest)
+        self.logger.info(f"模板匹配耗时（工作线程 {self.match_workers}，最慢的模板）: {summary}")
+        if self.change_detector is not None:
+            change_stats = self.change_detector.stats()
+            self.logger.info(f"画面未变化跳过匹配 {change_stats['skipped']} 次，实际匹配 {change_stats['performed']} 次")
+
+    def get_change_stats(self):
+        """返回画面变化检测跳过/执行的匹配次数，未启用时返回 None"""
+        if self.change_detector is None:
+            return None
+        return self.change_detector.stats()
+
+    def get_frame(self):
+        """获取灰度屏幕帧，在 frame_max_age 内复用同一帧"""
+        with self._frame_lock:
+            now = self.clock.now()
+            if (self._frame is None or self.frame_max_age <= 0
+                    or now - self._frame_time > self.frame_max_age):
+                self._frame = self._grab_screen()
+                self._frame_time = now
+                # 新的截图尺寸在匹配开始前完成引擎的预处理（例如 FFT 校准），每个尺寸只做一次
+                self.matcher.prepare(self._frame.shape[:2])
+                self.scheduler.note_capture()
+            return self._frame
+
+    def invalidate_frame(self):
+        """丢弃共享帧，下次匹配时重新截图"""
+        with self._frame_lock:
+            self._frame = None
+
+    def _grab_screen(self):
+        """通过截图后端获取灰度屏幕帧"""
+        frame = self.screen_source.grab()
+        backend = self.screen_source.name
+        self.metrics.histogram('clicker_capture_seconds', '截图耗时（秒）',
+                               backend=backend).observe(self.screen_source.last_capture_latency)
+        self.metrics.histogram('clicker_convert_seconds', '灰度转换耗时（秒）',
+                               backend=backend).observe(self.screen_source.last_convert_latency)
+        self.logger.debug(f"截图耗时: {self.screen_source.last_latency * 1000:.1f} ms ({self.screen_source.name})")
+        return frame
+
+    def _click_at_location(self, location, size):
+        """在指定位置点击，size 为匹配所用模板的 (宽, 高)，点击其中心"""
         x, y = location
-        w, h = template.shape[::-1]
+        w, h = size
         center_x = x + w // 2
         center_y = y + h // 2
-        self.mouse.position = (center_x, center_y)
-        self.mouse.click(Button.left, 1)
+        start = time.perf_counter()
+        self.dispatcher.click((center_x, center_y))
+        self.metrics.histogram('clicker_click_seconds', '点击分发耗时（秒）').observe(time.perf_counter() - start)
+
+    @property
+    def mouse(self):
+        """鼠标控制器，首次点击时才创建，无显示环境下也能只做匹配"""
+        return self.dispatcher.controller
 
     def set_threshold(self, threshold):
         # 设置相似度阈值
@@ -146,6 +685,27 @@ class ImageClicker(ClickerBase):
         self.immediate_click = immediate_click
         self.logger.info(f"设置立即点击为: {immediate_click}")
     
+    def set_frame_max_age(self, frame_max_age):
+        # 设置共享帧的最大有效期
+        self.frame_max_age = frame_max_age
+        self.invalidate_frame()
+        self.logger.info(f"设置共享帧有效期为: {frame_max_age} 秒")
+
+    def set_match_all(self, match_all):
+        # 设置是否点击全部匹配位置
+        self.match_all = match_all
+        self.logger.info(f"设置全部匹配模式: {match_all}")
+
+    def set_match_workers(self, match_workers):
+        # 设置并行匹配的工作线程数
+        self.match_workers = max(1, int(match_workers))
+        self.logger.info(f"设置匹配工作线程数为: {self.match_workers}")
+
+    def set_match_backend(self, match_backend):
+        # 设置并行匹配后端（thread 或 process），下次任务开始时生效
+        self.match_backend = match_backend
+        self.logger.info(f"设置匹配后端为: {match_backend}")
+
     def set_progress_callback(self, callback):
-        """设置进度回调函数"""
-        self.progress_callback = callback
+        """设置进度回调函数，回调参数为 ProgressReport，调用频率受 progress_max_rate 限制"""
+        self.progress.set_callback(callback)
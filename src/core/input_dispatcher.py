@@ -0,0 +1,62 @@
+import time
+import threading
+import logging
+
+
+class InputDispatcher:
+    """串行化的鼠标输入
+
+    同一进程中的多个任务共用一个 InputDispatcher，所有点击和移动都在同一把锁内完成，
+    不会出现一个任务移动了鼠标、另一个任务在错误位置按下的情况。
+    需要连续执行多个动作（例如拖动）时用 with dispatcher.exclusive(): 包住整段操作。
+    """
+
+    def __init__(self, controller=None, button_type=None, metrics=None):
+        self.logger = logging.getLogger('input_dispatcher')
+        self._controller = controller
+        self._button_type = button_type
+        self.metrics = metrics
+        self.lock = threading.RLock()
+
+    @property
+    def controller(self):
+        """pynput 鼠标控制器，首次使用时才创建"""
+        with self.lock:
+            if self._controller is None:
+                from pynput.mouse import Controller
+                self._controller = Controller()
+            return self._controller
+
+    @property
+    def button_type(self):
+        """按键枚举（默认为 pynput.mouse.Button）"""
+        if self._button_type is None:
+            from pynput.mouse import Button
+            self._button_type = Button
+        return self._button_type
+
+    def exclusive(self):
+        """独占输入的上下文管理器，期间其他任务的点击会等待"""
+        return self.lock
+
+    def click(self, position, button='left', count=1):
+        """移动到 position 并点击"""
+        button = getattr(self.button_type, button)
+        requested = time.perf_counter()
+        with self.lock:
+            acquired = time.perf_counter()
+            controller = self.controller
+            controller.position = position
+            controller.click(button, count)
+        self._observe(acquired - requested)
+
+    def move(self, position):
+        requested = time.perf_counter()
+        with self.lock:
+            acquired = time.perf_counter()
+            self.controller.position = position
+        self._observe(acquired - requested)
+
+    def _observe(self, waited):
+        if self.metrics is not None:
+            self.metrics.histogram('clicker_input_wait_seconds', '等待输入锁的耗时（秒）').observe(waited)
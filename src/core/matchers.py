@@ -0,0 +1,512 @@
+import os
+import json
+import time
+import threading
+import weakref
+import logging
+from collections import OrderedDict
+import cv2
+import numpy as np
+
+
+class TemplateMatcher:
+    """模板匹配引擎基类，match() 返回 (max_val, max_loc)，语义与 TM_CCOEFF_NORMED 一致"""
+    name = 'direct'
+
+    def __init__(self):
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    def match(self, screen, template, threshold=None):
+        """threshold 为调用方使用的相似度阈值，引擎可据此省去不影响结果的计算"""
+        res = self._result(screen, template)
+        _, max_val, _, max_loc = cv2.minMaxLoc(res)
+        return max_val, max_loc
+
+    def prepare(self, screen_shape):
+        """开始匹配某个尺寸的截图前调用，供需要按截图尺寸预处理的引擎使用"""
+
+    def match_all(self, screen, template, threshold, overlap=0.3, max_results=50):
+        """返回全部达到阈值的匹配 [(score, (x, y))]，按得分从高到低，重叠的匹配经非极大值抑制只保留一个"""
+        th, tw = template.shape[:2]
+        if screen.shape[0] < th or screen.shape[1] < tw:
+            return []
+        res = self._result(screen, template)
+        return find_peaks(res, threshold, (tw, th), overlap, max_results)
+
+    def _result(self, screen, template):
+        """返回完整的匹配结果图（与 cv2.matchTemplate 的 TM_CCOEFF_NORMED 输出一致）"""
+        return cv2.matchTemplate(screen, template, cv2.TM_CCOEFF_NORMED)
+
+
+class DirectMatcher(TemplateMatcher):
+    """全分辨率穷举匹配"""
+    name = 'direct'
+
+
+class _PyramidCache:
+    """按数组对象缓存金字塔，数组被回收后自动失效"""
+
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries
+        self._entries = {}
+        # 弱引用回调可能在持锁期间触发，需要可重入锁
+        self._lock = threading.RLock()
+
+    def get(self, image, levels):
+        key = id(image)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0]() is image and len(entry[1]) > levels:
+                return entry[1]
+        pyramid = [image]
+        for _ in range(levels):
+            pyramid.append(cv2.pyrDown(pyramid[-1]))
+        with self._lock:
+            if self.max_entries is not None and len(self._entries) >= self.max_entries:
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[key] = (weakref.ref(image, lambda _, k=key: self._discard(k)), pyramid)
+        return pyramid
+
+    def put(self, image, pyramid):
+        """登记预先计算好的金字塔（例如来自模板缓存）"""
+        key = id(image)
+        with self._lock:
+            self._entries[key] = (weakref.ref(image, lambda _, k=key: self._discard(k)), list(pyramid))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class PyramidMatcher(TemplateMatcher):
+    """由粗到精的金字塔匹配
+
+    先在缩小 2^levels 倍的图像上做粗匹配，取得分最高的 top_k 个候选，
+    再只在候选附近以全分辨率精匹配。精匹配得分比粗匹配最高分低出 tolerance 以上时，
+    说明候选不可靠，回退到全分辨率穷举匹配；给出 threshold 且粗匹配最高分已低于
+    threshold - tolerance 时（模板不在画面上），穷举也不会命中，不再回退。
+    """
+    name = 'pyramid'
+
+    def __init__(self, levels=2, top_k=5, tolerance=0.05, min_template_size=8):
+        super().__init__()
+        self.levels = max(0, int(levels))
+        self.top_k = max(1, int(top_k))
+        self.tolerance = tolerance
+        self.min_template_size = min_template_size
+        self._frame_pyramids = _PyramidCache(max_entries=8)
+        self._template_pyramids = _PyramidCache()
+
+    def register_template(self, template, pyramid):
+        """登记模板的预计算金字塔"""
+        self._template_pyramids.put(template, pyramid)
+
+    def clear_templates(self):
+        """丢弃已登记的模板金字塔（重新加载模板时调用）"""
+        self._template_pyramids.clear()
+
+    def _effective_levels(self, template):
+        levels = 0
+        th, tw = template.shape[:2]
+        while levels < self.levels and min(th, tw) >> (levels + 1) >= self.min_template_size:
+            levels += 1
+        return levels
+
+    def match(self, screen, template, threshold=None):
+        levels = self._effective_levels(template)
+        th, tw = template.shape[:2]
+        if levels == 0 or screen.shape[0] < th or screen.shape[1] < tw:
+            return super().match(screen, template)
+
+        coarse_screen = self._frame_pyramids.get(screen, levels)[levels]
+        coarse_template = self._template_pyramids.get(template, levels)[levels]
+        if (coarse_screen.shape[0] < coarse_template.shape[0]
+                or coarse_screen.shape[1] < coarse_template.shape[1]):
+            return super().match(screen, template)
+
+        res = cv2.matchTemplate(coarse_screen, coarse_template, cv2.TM_CCOEFF_NORMED)
+        candidates = self._top_candidates(res, coarse_template.shape)
+        coarse_best = candidates[0][0]
+
+        scale = 1 << levels
+        margin = scale * 2
+        height, width = screen.shape[:2]
+        best_val, best_loc = -1.0, (0, 0)
+        for _, (cx, cy) in candidates:
+            x0 = max(0, cx * scale - margin)
+            y0 = max(0, cy * scale - margin)
+            x1 = min(width, cx * scale + tw + margin)
+            y1 = min(height, cy * scale + th + margin)
+            val, (lx, ly) = super().match(screen[y0:y1, x0:x1], template)
+            if val > best_val:
+                best_val, best_loc = val, (lx + x0, ly + y0)
+
+        if threshold is not None and coarse_best < threshold - self.tolerance:
+            return best_val, best_loc
+        if best_val < coarse_best - self.tolerance:
+            self.logger.debug(f"精匹配得分 {best_val:.3f} 低于粗匹配 {coarse_best:.3f}，回退到穷举匹配")
+            return super().match(screen, template)
+        return best_val, best_loc
+
+    def match_all(self, screen, template, threshold, overlap=0.3, max_results=50):
+        """先在粗层上以放宽 2 * tolerance 的阈值找出候选，再逐个在全分辨率附近精匹配"""
+        levels = self._effective_levels(template)
+        th, tw = template.shape[:2]
+        if levels == 0 or screen.shape[0] < th or screen.shape[1] < tw:
+            return super().match_all(screen, template, threshold, overlap, max_results)
+
+        coarse_screen = self._frame_pyramids.get(screen, levels)[levels]
+        coarse_template = self._template_pyramids.get(template, levels)[levels]
+        if (coarse_screen.shape[0] < coarse_template.shape[0]
+                or coarse_screen.shape[1] < coarse_template.shape[1]):
+            return super().match_all(screen, template, threshold, overlap, max_results)
+
+        res = cv2.matchTemplate(coarse_screen, coarse_template, cv2.TM_CCOEFF_NORMED)
+        ch, cw = coarse_template.shape[:2]
+        candidates = find_peaks(res, threshold - 2 * self.tolerance, (cw, ch), overlap, max_results * 2)
+
+        scale = 1 << levels
+        margin = scale * 2
+        height, width = screen.shape[:2]
+        scores, locations = [], []
+        for _, (cx, cy) in candidates:
+            x0 = max(0, cx * scale - margin)
+            y0 = max(0, cy * scale - margin)
+            x1 = min(width, cx * scale + tw + margin)
+            y1 = min(height, cy * scale + th + margin)
+            val, (lx, ly) = TemplateMatcher.match(self, screen[y0:y1, x0:x1], template)
+            if val >= threshold:
+                scores.append(val)
+                locations.append((lx + x0, ly + y0))
+        if not scores:
+            return []
+        return suppress(np.array(scores), np.array(locations), (tw, th), overlap, max_results)
+
+    def _top_candidates(self, res, template_shape):
+        """取粗匹配结果中得分最高的 top_k 个峰值，相邻峰值按模板尺寸抑制"""
+        res = res.copy()
+        th, tw = template_shape[:2]
+        candidates = []
+        for _ in range(self.top_k):
+            _, max_val, _, (x, y) = cv2.minMaxLoc(res)
+            if candidates and max_val <= -1.0:
+                break
+            candidates.append((max_val, (x, y)))
+            res[max(0, y - th // 2):y + th // 2 + 1, max(0, x - tw // 2):x + tw // 2 + 1] = -1.0
+        return candidates
+
+
+class _FrameSpectrum:
+    """一帧的频谱和积分图，同一帧上的所有模板共用"""
+    MAX_NORMS = 8
+
+    def __init__(self, screen):
+        self.ref = weakref.ref(screen)
+        height, width = screen.shape[:2]
+        # 循环相关在有效区域（模板完全落在帧内的位置）上与线性相关相同，无需按模板尺寸补零
+        self.fft_shape = (cv2.getOptimalDFTSize(height), cv2.getOptimalDFTSize(width))
+        padded = np.zeros(self.fft_shape, np.float32)
+        # 模板去均值后与常数的相关为 0，帧先去均值可以减小单精度 FFT 的舍入误差
+        padded[:height, :width] = screen
+        padded[:height, :width] -= padded[:height, :width].mean()
+        self.spectrum = cv2.dft(padded, nonzeroRows=height)
+        self.sums, self.sq_sums = cv2.integral2(screen, sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+        # 每种模板尺寸一张范数图（与截图同大），只保留最近的 MAX_NORMS 种
+        self._norms = OrderedDict()
+        self._lock = threading.Lock()
+
+    def window_norms(self, th, tw):
+        """返回 (th, tw) 窗口的范数图（带缓存）"""
+        key = (th, tw)
+        with self._lock:
+            norms = self._norms.get(key)
+            if norms is not None:
+                self._norms.move_to_end(key)
+                return norms
+        norms = self.compute_norms(th, tw)
+        with self._lock:
+            self._norms[key] = norms
+            while len(self._norms) > self.MAX_NORMS:
+                self._norms.popitem(last=False)
+        return norms
+
+    def compute_norms(self, th, tw):
+        """每个窗口去均值后的 L2 范数，灰度恒定的窗口为无穷大（得分为 0，与 OpenCV 一致）"""
+        s, sq = self.sums, self.sq_sums
+        window = s[th:, tw:] - s[:-th, tw:]
+        window -= s[th:, :-tw]
+        window += s[:-th, :-tw]
+        variance = sq[th:, tw:] - sq[:-th, tw:]
+        variance -= sq[th:, :-tw]
+        variance += sq[:-th, :-tw]
+        window *= window
+        window /= th * tw
+        variance -= window
+        flat = variance < 0.25
+        norms = np.sqrt(np.maximum(variance, 0.0, out=variance), out=variance).astype(np.float32)
+        norms[flat] = np.inf
+        return norms
+
+
+def _template_spectrum(template, fft_shape):
+    """返回去均值模板在 fft_shape 下的频谱和范数，模板为常量时返回 None"""
+    th, tw = template.shape[:2]
+    zero_mean = template.astype(np.float32)
+    zero_mean -= zero_mean.mean()
+    norm = float(np.sqrt(np.square(zero_mean, dtype=np.float64).sum()))
+    if norm < 1e-6:
+        return None
+    padded = np.zeros(fft_shape, np.float32)
+    padded[:th, :tw] = zero_mean
+    return cv2.dft(padded, nonzeroRows=th), norm
+
+
+def _correlate(frame, spectrum, norm, template_shape, screen_shape, norms):
+    """由帧频谱和模板频谱计算 TM_CCOEFF_NORMED 结果图"""
+    th, tw = template_shape
+    height, width = screen_shape
+    correlation = cv2.idft(cv2.mulSpectrums(frame.spectrum, spectrum, 0, conjB=True),
+                           flags=cv2.DFT_REAL_OUTPUT | cv2.DFT_SCALE)
+    scores = correlation[:height - th + 1, :width - tw + 1] / norms
+    scores *= 1.0 / norm
+    # 舍入误差造成的越界截断到 [-1, 1]
+    return np.clip(scores, -1.0, 1.0, out=scores)
+
+
+class FFTMatcher(TemplateMatcher):
+    """在频域计算归一化互相关（TM_CCOEFF_NORMED）的匹配引擎
+
+    每帧的频谱和积分图只计算一次，同一帧上的所有模板共用；模板频谱按帧尺寸缓存
+    （总大小不超过 cache_bytes），此后每个模板每帧只需一次频谱相乘和一次逆变换。
+    窗口范数由积分图得到，得分与 cv2.matchTemplate 相差约 1e-4 以内，沿用相同的阈值。
+
+    小模板直接匹配更快。prepare() 对每个截图尺寸只校准一次（ImageClicker 在截到该尺寸的
+    第一帧时调用）：比较两种方式的耗时，面积不小于交叉点的模板使用 FFT，始终更慢时全部直接匹配。
+    校准结果写入 calibration_file，之后的运行和匹配进程直接读取。未校准的尺寸
+    （例如搜索区域）和面积小于 min_screen_area 的截图总是直接匹配；
+    min_template_area 不为 None 时不校准，所有足够大的截图都用该面积作为交叉点。
+    """
+    name = 'fft'
+    CALIBRATION_SIZES = (16, 32, 64, 128, 256)
+
+    def __init__(self, min_template_area=None, min_screen_area=256 * 256, cache_bytes=64 << 20,
+                 calibration_repeat=2, calibration_file=None):
+        super().__init__()
+        self.min_template_area = min_template_area
+        self.min_screen_area = min_screen_area
+        self.cache_bytes = cache_bytes
+        self.calibration_repeat = max(1, int(calibration_repeat))
+        self.calibration_file = calibration_file
+        self._crossovers = {}
+        self._frame = None
+        self._frame_lock = threading.Lock()
+        self._spectra = OrderedDict()
+        self._spectra_bytes = 0
+        self._lock = threading.Lock()
+        self._calibration_lock = threading.Lock()
+
+    def _result(self, screen, template):
+        th, tw = template.shape[:2]
+        result = None
+        if self.uses_fft(screen.shape[:2], th * tw):
+            result = self._fft_result(screen, template)
+        return super()._result(screen, template) if result is None else result
+
+    def uses_fft(self, screen_shape, template_area):
+        """判断给定截图尺寸和模板面积是否使用 FFT，不会触发校准"""
+        height, width = screen_shape
+        if height * width < self.min_screen_area:
+            return False
+        if self.min_template_area is not None:
+            return template_area >= self.min_template_area
+        crossover = self._crossovers.get((height, width))
+        return crossover is not None and template_area >= crossover
+
+    def prepare(self, screen_shape):
+        """确保该截图尺寸已校准：依次查内存、校准文件，都没有时校准并保存，每个尺寸只做一次"""
+        shape = tuple(screen_shape[:2])
+        if (self.min_template_area is not None or shape[0] * shape[1] < self.min_screen_area
+                or shape in self._crossovers):
+            return
+        with self._calibration_lock:
+            if shape in self._crossovers:
+                return
+            saved = self._read_calibration()
+            key = f"{shape[1]}x{shape[0]}"
+            if key in saved:
+                crossover = float('inf') if saved[key] is None else saved[key]
+            else:
+                crossover = self.calibrate(shape)
+                saved[key] = None if crossover == float('inf') else crossover
+                self._write_calibration(saved)
+            self._crossovers[shape] = crossover
+
+    def calibrate(self, screen_shape):
+        """比较直接匹配和 FFT 匹配的耗时，返回 FFT 开始更快的模板面积（始终更慢时为无穷大）
+
+        FFT 的耗时只计每个模板每帧都要做的部分（频谱相乘、逆变换、窗口范数），与模板大小基本无关，
+        测一次即可；帧频谱和模板频谱在实际匹配中可复用，不计入。
+        校准只使用局部数据，不影响匹配缓存。
+        """
+        start = time.perf_counter()
+        rng = np.random.default_rng(0)
+        screen = rng.integers(0, 256, screen_shape, dtype=np.uint8)
+        sizes = [size for size in self.CALIBRATION_SIZES if size * 2 <= min(screen_shape)]
+        crossover = float('inf')
+        if sizes:
+            frame = _FrameSpectrum(screen)
+            size = sizes[0]
+            spectrum, norm = _template_spectrum(rng.integers(0, 256, (size, size), dtype=np.uint8), frame.fft_shape)
+            fft = self._best_time(lambda: _correlate(frame, spectrum, norm, (size, size), screen_shape,
+                                                     frame.compute_norms(size, size)))
+            for size in sizes:
+                template = rng.integers(0, 256, (size, size), dtype=np.uint8)
+                if self._best_time(lambda: cv2.matchTemplate(screen, template, cv2.TM_CCOEFF_NORMED)) > fft:
+                    crossover = size * size
+                    break
+        self.logger.info(f"FFT 匹配校准: 截图 {screen_shape[1]}x{screen_shape[0]}，模板面积 >= {crossover} 时使用 FFT"
+                         f"（耗时 {time.perf_counter() - start:.2f} 秒）")
+        return crossover
+
+    def _best_time(self, func):
+        best = float('inf')
+        for _ in range(self.calibration_repeat):
+            start = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    def _read_calibration(self):
+        if not self.calibration_file or not os.path.exists(self.calibration_file):
+            return {}
+        try:
+            with open(self.calibration_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"读取 FFT 校准文件失败，重新校准: {e}")
+            return {}
+
+    def _write_calibration(self, saved):
+        if not self.calibration_file:
+            return
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.calibration_file)), exist_ok=True)
+            tmp = f"{self.calibration_file}.{os.getpid()}.tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(saved, f, indent=2)
+            os.replace(tmp, self.calibration_file)
+        except OSError as e:
+            self.logger.warning(f"保存 FFT 校准文件失败: {e}")
+
+    def _frame_spectrum(self, screen):
+        """返回帧的频谱和积分图，只保留最近一帧；并发匹配同一新帧时只计算一次"""
+        with self._frame_lock:
+            frame = self._frame
+            if frame is None or frame.ref() is not screen:
+                frame = _FrameSpectrum(screen)
+                self._frame = frame
+            return frame
+
+    def _cached_spectrum(self, template, fft_shape):
+        """带缓存的 _template_spectrum"""
+        key = (id(template), fft_shape)
+        with self._lock:
+            entry = self._spectra.get(key)
+            if entry is not None and entry[0]() is template:
+                self._spectra.move_to_end(key)
+                return entry[1], entry[2]
+        result = _template_spectrum(template, fft_shape)
+        if result is None:
+            return None
+        spectrum, norm = result
+        with self._lock:
+            self._spectra[key] = (weakref.ref(template), spectrum, norm)
+            self._spectra_bytes += spectrum.nbytes
+            while self._spectra_bytes > self.cache_bytes and len(self._spectra) > 1:
+                _, (_, evicted, _) = self._spectra.popitem(last=False)
+                self._spectra_bytes -= evicted.nbytes
+        return result
+
+    def _fft_result(self, screen, template):
+        """在频域计算 TM_CCOEFF_NORMED 结果图，模板为常量时返回 None（交给直接匹配）"""
+        th, tw = template.shape[:2]
+        frame = self._frame_spectrum(screen)
+        template_spectrum = self._cached_spectrum(template, frame.fft_shape)
+        if template_spectrum is None:
+            return None
+        spectrum, norm = template_spectrum
+        return _correlate(frame, spectrum, norm, (th, tw), screen.shape[:2], frame.window_norms(th, tw))
+
+
+def find_peaks(res, threshold, size, overlap=0.3, max_results=50):
+    """从匹配结果图中取出达到阈值的局部极大值，经非极大值抑制后返回 [(score, (x, y))]"""
+    # 先用膨胀保留 3x3 邻域内的局部极大值，避免同一处匹配的平台区产生大量候选
+    local_max = res >= cv2.dilate(res, np.ones((3, 3), np.uint8))
+    ys, xs = np.nonzero(local_max & (res >= threshold))
+    if len(xs) == 0:
+        return []
+    return suppress(res[ys, xs], np.stack([xs, ys], axis=1), size, overlap, max_results)
+
+
+def suppress(scores, locations, size, overlap=0.3, max_results=50):
+    """对同尺寸的匹配框做非极大值抑制
+
+    scores 为得分数组，locations 为 (N, 2) 的左上角坐标，size 为 (宽, 高)；
+    与已保留的框交并比超过 overlap 的框被丢弃。返回按得分从高到低的 [(score, (x, y))]。
+    """
+    w, h = size
+    area = float(w * h)
+    order = np.argsort(scores)[::-1]
+    xs = locations[:, 0].astype(np.int64)
+    ys = locations[:, 1].astype(np.int64)
+    kept = []
+    while order.size and len(kept) < max_results:
+        i = order[0]
+        kept.append(i)
+        rest = order[1:]
+        inter_w = np.clip(w - np.abs(xs[rest] - xs[i]), 0, None)
+        inter_h = np.clip(h - np.abs(ys[rest] - ys[i]), 0, None)
+        inter = inter_w * inter_h
+        iou = inter / (2 * area - inter)
+        order = rest[iou <= overlap]
+    return [(float(scores[i]), (int(xs[i]), int(ys[i]))) for i in kept]
+
+
+def order_matches(matches, policy='reading', size=None):
+    """按策略排序匹配结果：reading 为从上到下、从左到右（同一行以模板半高为容差），score 为得分从高到低"""
+    if policy == 'score' or not matches:
+        return sorted(matches, key=lambda m: -m[0])
+    row_height = max(1, size[1] // 2) if size else 1
+    by_y = sorted(matches, key=lambda m: m[1][1])
+    rows = []
+    for match in by_y:
+        if rows and match[1][1] - rows[-1][0][1][1] <= row_height:
+            rows[-1].append(match)
+        else:
+            rows.append([match])
+    return [match for row in rows for match in sorted(row, key=lambda m: m[1][0])]
+
+
+def create_matcher(config):
+    """根据配置中的 match_engine 创建匹配引擎"""
+    name = config.get('match_engine', 'direct')
+    if name == 'pyramid':
+        return PyramidMatcher(
+            levels=config.get('pyramid_levels', 2),
+            top_k=config.get('pyramid_top_k', 5),
+            tolerance=config.get('pyramid_tolerance', 0.05)
+        )
+    if name == 'fft':
+        cache_dir = config.get('template_cache_dir', 'data/cache/templates')
+        return FFTMatcher(
+            calibration_file=os.path.join(cache_dir, 'fft_calibration.json') if cache_dir else None,
+            min_template_area=config.get('fft_min_template_area'),
+            cache_bytes=int(config.get('fft_cache_mb', 64) * (1 << 20))
+        )
+    if name != 'direct':
+        logging.getLogger('matchers').warning(f"未知的匹配引擎: {name}，使用 direct")
+    return DirectMatcher()
@@ -0,0 +1,120 @@
+"""
+鼠标移动路径的精简：录制时流式合并相近的移动点，停止录制后再用 Ramer–Douglas–Peucker 算法抽稀
+
+两步各使用一半的容差，原始路径上每个点到精简后折线的距离不超过 tolerance。
+"""
+import math
+
+from .recording import EventBuffer, EVENT_MOVE
+
+
+def point_segment_distance(px, py, ax, ay, bx, by):
+    """点 (px, py) 到线段 (ax, ay)-(bx, by) 的距离"""
+    dx, dy = bx - ax, by - ay
+    length_sq = dx * dx + dy * dy
+    if length_sq == 0:
+        return math.hypot(px - ax, py - ay)
+    t = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / length_sq))
+    return math.hypot(px - (ax + t * dx), py - (ay + t * dy))
+
+
+class MoveCoalescer:
+    """流式合并移动事件
+
+    与上一个输出点的时间间隔小于 min_interval 或距离小于 min_distance 的移动点先暂存；
+    只要暂存的点都在“上一个输出点 → 新点”线段的 tolerance 范围内，就只保留最新的一个，
+    否则先输出最后一个暂存点作为新的折点。
+    """
+
+    def __init__(self, min_interval=0.01, min_distance=2.0, tolerance=0.5):
+        self.min_interval = min_interval
+        self.min_distance = min_distance
+        self.tolerance = tolerance
+        self._anchor = None
+        self._pending = []
+
+    def feed(self, t, x, y):
+        """输入一个移动点 (t, x, y)，返回需要立即写入的点列表"""
+        point = (t, x, y)
+        anchor = self._anchor
+        if anchor is None:
+            self._anchor = point
+            return [point]
+        close = t - anchor[0] < self.min_interval or math.hypot(x - anchor[1], y - anchor[2]) < self.min_distance
+        if close and self._fits(point):
+            self._pending.append(point)
+            return []
+        output = []
+        if self._pending and not self._fits(point):
+            output.append(self._pending[-1])
+        output.append(point)
+        self._anchor = point
+        self._pending = []
+        return output
+
+    def flush(self):
+        """输出暂存的最后一个点（在按下、滚轮等事件之前调用，保证位置准确）"""
+        if not self._pending:
+            return []
+        point = self._pending[-1]
+        self._anchor = point
+        self._pending = []
+        return [point]
+
+    def reset(self):
+        self._anchor = None
+        self._pending = []
+
+    def _fits(self, point):
+        _, ax, ay = self._anchor
+        _, bx, by = point
+        return all(point_segment_distance(qx, qy, ax, ay, bx, by) <= self.tolerance
+                   for _, qx, qy in self._pending)
+
+
+def rdp_indices(xs, ys, tolerance):
+    """Ramer–Douglas–Peucker 抽稀，返回保留点的下标（升序）"""
+    count = len(xs)
+    if count <= 2:
+        return list(range(count))
+    keep = [False] * count
+    keep[0] = keep[-1] = True
+    stack = [(0, count - 1)]
+    while stack:
+        start, end = stack.pop()
+        ax, ay, bx, by = xs[start], ys[start], xs[end], ys[end]
+        max_dist, index = -1.0, start
+        for i in range(start + 1, end):
+            dist = point_segment_distance(xs[i], ys[i], ax, ay, bx, by)
+            if dist > max_dist:
+                max_dist, index = dist, i
+        if max_dist > tolerance:
+            keep[index] = True
+            stack.append((start, index))
+            stack.append((index, end))
+    return [i for i in range(count) if keep[i]]
+
+
+def simplify_moves(events, tolerance):
+    """对每一段连续的移动事件做 RDP 抽稀，其余事件原样保留，返回新的 EventBuffer"""
+    result = EventBuffer()
+    run = []
+
+    def flush_run():
+        if not run:
+            return
+        xs = [event.x for event in run]
+        ys = [event.y for event in run]
+        for i in rdp_indices(xs, ys, tolerance):
+            event = run[i]
+            result.append(event.time, event.kind, event.x, event.y, event.button, event.dx, event.dy)
+        run.clear()
+
+    for event in events:
+        if event.kind == EVENT_MOVE:
+            run.append(event)
+            continue
+        flush_run()
+        result.append(event.time, event.kind, event.x, event.y, event.button, event.dx, event.dy)
+    flush_run()
+    return result
@@ -0,0 +1,186 @@
+"""
+多进程匹配后端：模板库很大时把匹配分散到多个进程，绕开单个解释器的 GIL 和调度开销
+
+启动时模板按序号轮流分给各工作进程，每个进程只持有自己的一份模板分片；
+每帧只写入一次共享内存，工作进程直接在共享内存上匹配（截图不经过 pickle），
+父进程按模板顺序合并结果。
+"""
+import os
+import time
+import logging
+import traceback
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .matchers import create_matcher
+from .region import clip_region
+from .scales import ScaleSelector
+
+# 传给工作进程的匹配配置项
+MATCH_SETTINGS = ('match_engine', 'pyramid_levels', 'pyramid_top_k', 'pyramid_tolerance', 'match_scales',
+                  'fft_min_template_area', 'fft_cache_mb', 'template_cache_dir')
+
+
+class ProcessMatchPool:
+    """多进程模板匹配池
+
+    match() 的任务为 [(模板序号, 搜索区域, 区域是否为自动学习)]，语义与 ImageClicker._search 一致：
+    在区域内匹配，自动学习的区域未命中时回退到全屏。
+    """
+
+    def __init__(self, templates, settings, workers):
+        self.logger = logging.getLogger('process_match_pool')
+        self.index = {filename: i for i, (filename, _) in enumerate(templates)}
+        self.workers = max(1, min(int(workers), len(templates)))
+        if os.name == 'posix':
+            # 工作进程共用父进程的资源跟踪器，共享内存只由父进程释放
+            from multiprocessing import resource_tracker
+            resource_tracker.ensure_running()
+        context = multiprocessing.get_context('spawn')
+        self._workers = []
+        for worker in range(self.workers):
+            shard = [(i, filename, image) for i, (filename, image) in enumerate(templates)
+                     if i % self.workers == worker]
+            conn, child_conn = context.Pipe()
+            process = context.Process(target=_worker_main, args=(child_conn, shard, settings),
+                                      name=f"matcher-{worker}", daemon=True)
+            process.start()
+            child_conn.close()
+            self._workers.append((process, conn))
+        self._shm = None
+        self.logger.info(f"已启动 {self.workers} 个匹配进程，共 {len(templates)} 个模板")
+
+    def match(self, frame, jobs, threshold, display=None):
+        """返回 {模板序号: (最高相似度, 位置, 缩放比例, (宽, 高), 耗时)}，未使用多尺度时比例和尺寸为 None"""
+        if not jobs:
+            return {}
+        name, shape, dtype = self._publish(frame)
+        shards = [[] for _ in self._workers]
+        for job in jobs:
+            shards[job[0] % self.workers].append(job)
+        busy = []
+        for (_, conn), shard in zip(self._workers, shards):
+            if shard:
+                conn.send((name, shape, dtype, shard, threshold, display))
+                busy.append(conn)
+        results = {}
+        errors = []
+        for conn in busy:
+            try:
+                status, payload = conn.recv()
+            except (EOFError, OSError):
+                errors.append("匹配进程已退出")
+                continue
+            if status == 'ok':
+                results.update(payload)
+            else:
+                errors.append(payload)
+        if errors:
+            raise RuntimeError(f"多进程匹配失败: {errors[0]}")
+        return results
+
+    def _publish(self, frame):
+        """把帧复制到共享内存，帧变大时重新分配"""
+        frame = np.ascontiguousarray(frame)
+        if self._shm is None or self._shm.size < frame.nbytes:
+            self._release()
+            self._shm = shared_memory.SharedMemory(create=True, size=max(1, frame.nbytes))
+        np.ndarray(frame.shape, frame.dtype, buffer=self._shm.buf)[...] = frame
+        return self._shm.name, frame.shape, frame.dtype.str
+
+    def _release(self):
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def shutdown(self, wait=True):
+        """停止工作进程并释放共享内存（与 ThreadPoolExecutor.shutdown 接口一致）"""
+        for _, conn in self._workers:
+            try:
+                conn.send(None)
+            except OSError:
+                pass
+        for process, conn in self._workers:
+            process.join(timeout=2.0 if wait else 0)
+            if process.is_alive():
+                process.terminate()
+            conn.close()
+        self._workers = []
+        self._release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+
+def _worker_main(conn, shard, settings):
+    """工作进程主循环：持有模板分片，在父进程写入共享内存的帧上执行匹配任务"""
+    matcher = create_matcher(settings)
+    scales = ScaleSelector(settings.get('match_scales', [1.0]))
+    templates = {}
+    for index, filename, image in shard:
+        scales.prepare(filename, image)
+        templates[index] = (filename, image)
+
+    shm = None
+    try:
+        while True:
+            message = conn.recv()
+            if message is None:
+                break
+            name, shape, dtype, jobs, threshold, display = message
+            if shm is None or shm.name != name:
+                shm = _attach(shm, name)
+            frame = np.ndarray(shape, dtype, buffer=shm.buf)
+            # 父进程已在截图时校准并写入校准文件，这里通常只是读取
+            matcher.prepare(shape[:2])
+            try:
+                results = {}
+                for index, region, learned in jobs:
+                    filename, template = templates[index]
+                    start = time.perf_counter()
+                    result = _search(matcher, scales, frame, filename, template, region, learned, threshold, display)
+                    results[index] = result + (time.perf_counter() - start,)
+                conn.send(('ok', results))
+            except Exception:
+                conn.send(('error', traceback.format_exc()))
+            finally:
+                del frame
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        _attach(shm, None)
+
+
+def _attach(shm, name):
+    """关闭旧的共享内存映射并打开新的；金字塔缓存可能仍引用旧帧，此时交给垃圾回收释放"""
+    if shm is not None:
+        try:
+            shm.close()
+        except BufferError:
+            pass
+    return shared_memory.SharedMemory(name=name) if name else None
+
+
+def _search(matcher, scales, frame, filename, template, region, learned, threshold, display):
+    if region is not None:
+        x, y, w, h = clip_region(region, frame.shape)
+        th, tw = template.shape[:2]
+        if w >= tw and h >= th:
+            max_val, (lx, ly), scale, size = _match(matcher, scales, frame[y:y + h, x:x + w],
+                                                    filename, template, threshold, display)
+            if max_val >= threshold or not learned:
+                return max_val, (lx + x, ly + y), scale, size
+    return _match(matcher, scales, frame, filename, template, threshold, display)
+
+
+def _match(matcher, scales, screen, filename, template, threshold, display):
+    if display is None:
+        max_val, max_loc = matcher.match(screen, template, threshold)
+        return max_val, max_loc, None, None
+    return scales.best_match(matcher, screen, filename, template, display, threshold)
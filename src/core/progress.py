@@ -0,0 +1,79 @@
+import time
+import threading
+
+
+class ProgressReport:
+    """一次进度快照"""
+    __slots__ = ('loop', 'total_loops', 'template_index', 'total_templates',
+                 'matched', 'missed', 'percent', 'elapsed', 'eta', 'done')
+
+    def __init__(self, loop, total_loops, template_index, total_templates,
+                 matched=0, missed=0, elapsed=0.0, done=False):
+        self.loop = loop
+        self.total_loops = total_loops
+        self.template_index = template_index
+        self.total_templates = total_templates
+        self.matched = matched
+        self.missed = missed
+        self.elapsed = elapsed
+        self.done = done
+        if done or total_loops <= 0 or total_templates <= 0:
+            self.percent = 100.0
+        else:
+            completed = loop * total_templates + template_index + 1
+            self.percent = min(100.0, completed / (total_loops * total_templates) * 100)
+        # 按已用时间和完成比例线性估计剩余时间
+        if done:
+            self.eta = 0.0
+        elif self.percent > 0 and elapsed > 0:
+            self.eta = elapsed * (100.0 - self.percent) / self.percent
+        else:
+            self.eta = None
+
+    def __repr__(self):
+        return (f"ProgressReport(loop={self.loop + 1}/{self.total_loops}, "
+                f"template={self.template_index + 1}/{self.total_templates}, "
+                f"matched={self.matched}, missed={self.missed}, percent={self.percent:.1f})")
+
+
+class ProgressChannel:
+    """合并进度更新的通道
+
+    publish() 只保留最新的一份进度，两次回调之间至少间隔 1 / max_rate 秒，
+    期间的中间进度被丢弃；force=True（例如任务结束）时立即回调。
+    """
+
+    def __init__(self, max_rate=10.0, clock=None):
+        self.min_interval = 1.0 / max_rate if max_rate and max_rate > 0 else 0.0
+        self._now = clock.now if clock is not None else time.monotonic
+        self._callback = None
+        self._latest = None
+        self._last_emit = None
+        self._lock = threading.Lock()
+
+    def set_callback(self, callback):
+        with self._lock:
+            self._callback = callback
+
+    def latest(self):
+        """返回最新的进度，尚未发布过时返回 None"""
+        with self._lock:
+            return self._latest
+
+    def publish(self, report, force=False):
+        """发布进度，按最大频率合并后回调"""
+        with self._lock:
+            self._latest = report
+            now = self._now()
+            if not force and self._last_emit is not None and now - self._last_emit < self.min_interval:
+                return False
+            self._last_emit = now
+            callback = self._callback
+        if callback:
+            callback(report)
+        return True
+
+    def reset(self):
+        with self._lock:
+            self._latest = None
+            self._last_emit = None
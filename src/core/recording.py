@@ -0,0 +1,209 @@
+"""
+鼠标事件录制格式：按列存储在 array 数组中，可保存为二进制文件并以内存映射方式加载
+
+文件布局（小端）：
+    8 字节魔数 b'CLKREC01'，随后是事件数 (uint64)，
+    再依次是各列的原始数据，每列起始位置按 8 字节对齐。
+"""
+import os
+import sys
+import mmap
+import struct
+import threading
+from array import array
+from collections import namedtuple
+
+# 事件类型
+EVENT_MOVE = 0
+EVENT_PRESS = 1
+EVENT_RELEASE = 2
+EVENT_SCROLL = 3
+
+# 鼠标按键
+BUTTON_NONE = 0
+BUTTON_LEFT = 1
+BUTTON_RIGHT = 2
+BUTTON_MIDDLE = 3
+
+BUTTON_NAMES = {BUTTON_LEFT: 'left', BUTTON_RIGHT: 'right', BUTTON_MIDDLE: 'middle'}
+BUTTON_CODES = {name: code for code, name in BUTTON_NAMES.items()}
+
+MouseEvent = namedtuple('MouseEvent', 'time kind button x y dx dy')
+
+
+class EventBuffer:
+    """列式鼠标事件缓冲区
+
+    每种字段一列（时间为相对录制开始的单调时钟秒数），追加事件只在各列末尾写入定长数值。
+    从文件加载时各列是只读的内存映射视图，首次追加或修改时才复制到内存。
+    """
+    MAGIC = b'CLKREC01'
+    HEADER = struct.Struct('<8sQ')
+    COLUMNS = (('time', 'd'), ('kind', 'B'), ('button', 'B'),
+               ('x', 'i'), ('y', 'i'), ('dx', 'h'), ('dy', 'h'))
+
+    def __init__(self):
+        self._columns = {name: array(code) for name, code in self.COLUMNS}
+        self._mmap = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._columns['time'])
+
+    def __getitem__(self, index):
+        c = self._columns
+        return MouseEvent(c['time'][index], c['kind'][index], c['button'][index],
+                          c['x'][index], c['y'][index], c['dx'][index], c['dy'][index])
+
+    def __iter__(self):
+        c = self._columns
+        return map(MouseEvent, c['time'], c['kind'], c['button'], c['x'], c['y'], c['dx'], c['dy'])
+
+    def column(self, name):
+        """返回某一列（array 或只读 memoryview）"""
+        return self._columns[name]
+
+    @property
+    def duration(self):
+        """第一个到最后一个事件的时长（秒）"""
+        times = self._columns['time']
+        return times[-1] - times[0] if len(times) > 1 else 0.0
+
+    @property
+    def nbytes(self):
+        return sum(len(col) * col.itemsize for col in self._columns.values())
+
+    def append(self, time, kind, x, y, button=BUTTON_NONE, dx=0, dy=0):
+        with self._lock:
+            self._ensure_writable()
+            c = self._columns
+            c['time'].append(time)
+            c['kind'].append(kind)
+            c['button'].append(button)
+            c['x'].append(int(x))
+            c['y'].append(int(y))
+            c['dx'].append(int(dx))
+            c['dy'].append(int(dy))
+
+    def truncate(self, length):
+        """只保留前 length 个事件"""
+        with self._lock:
+            self._ensure_writable()
+            for col in self._columns.values():
+                del col[length:]
+
+    def clear(self):
+        self.truncate(0)
+
+    def last_index(self, kind):
+        """最后一个 kind 类型事件的下标，没有时返回 -1"""
+        kinds = self._columns['kind']
+        for i in range(len(kinds) - 1, -1, -1):
+            if kinds[i] == kind:
+                return i
+        return -1
+
+    def clicks(self):
+        """所有按下事件的位置 [(x, y)]"""
+        c = self._columns
+        return [(x, y) for kind, x, y in zip(c['kind'], c['x'], c['y']) if kind == EVENT_PRESS]
+
+    @classmethod
+    def from_clicks(cls, clicks, interval=0.1, button=BUTTON_LEFT):
+        """由点击坐标列表生成按下/抬起事件，时间按 interval 递增"""
+        buffer = cls()
+        for i, (x, y) in enumerate(clicks):
+            buffer.append(i * interval, EVENT_PRESS, x, y, button)
+            buffer.append(i * interval, EVENT_RELEASE, x, y, button)
+        return buffer
+
+    def _ensure_writable(self):
+        # 内存映射的只读视图在首次修改时复制为 array，并释放映射（Windows 下映射中的文件不能被替换）
+        if self._mmap is None:
+            return
+        columns = {}
+        for name, code in self.COLUMNS:
+            columns[name] = array(code)
+            columns[name].frombytes(self._columns[name].cast('B'))
+        self._columns = columns
+        data, self._mmap = self._mmap, None
+        try:
+            data.close()
+        except BufferError:
+            # 外部仍持有列视图，映射随这些视图一起释放
+            pass
+
+    def save(self, path):
+        """保存为二进制文件，先写临时文件再替换，避免写到一半的文件"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with self._lock:
+            self._ensure_writable()
+            with open(tmp_path, 'wb') as f:
+                f.write(self.HEADER.pack(self.MAGIC, len(self)))
+                for name, code in self.COLUMNS:
+                    f.write(b'\0' * (-f.tell() % 8))
+                    col = self._columns[name]
+                    if sys.byteorder != 'little':
+                        col = array(code, col)
+                        col.byteswap()
+                    f.write(col)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, use_mmap=True):
+        """加载录制文件；use_mmap 为 True 时各列直接引用内存映射，不复制数据
+
+        文件为空、截断或长度与事件数不符时抛出 ValueError。
+        """
+        with open(path, 'rb') as f:
+            if use_mmap and sys.byteorder == 'little' and os.path.getsize(path) > cls.HEADER.size:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                data = f.read()
+        try:
+            return cls._from_data(data, path)
+        except ValueError:
+            if isinstance(data, mmap.mmap):
+                data.close()
+            raise
+
+    @classmethod
+    def _from_data(cls, data, path):
+        if len(data) < cls.HEADER.size:
+            raise ValueError(f"录制文件已截断: {path}")
+        magic, count = cls.HEADER.unpack_from(data, 0)
+        if magic != cls.MAGIC:
+            raise ValueError(f"不是有效的录制文件: {path}")
+        # 先核对总长度，出错时还没有引用映射的视图，映射可以立即关闭
+        expected = cls.HEADER.size
+        for _, code in cls.COLUMNS:
+            expected += -expected % 8 + array(code).itemsize * count
+        if expected > len(data):
+            raise ValueError(f"录制文件已截断: {path}")
+        if expected != len(data):
+            raise ValueError(f"录制文件长度与事件数不符: {path}")
+
+        buffer = cls()
+        view = memoryview(data)
+        offset = cls.HEADER.size
+        columns = {}
+        for name, code in cls.COLUMNS:
+            offset += -offset % 8
+            size = array(code).itemsize * count
+            chunk = view[offset:offset + size]
+            if isinstance(data, mmap.mmap):
+                columns[name] = chunk.cast(code)
+            else:
+                col = array(code)
+                col.frombytes(chunk)
+                if sys.byteorder != 'little':
+                    col.byteswap()
+                columns[name] = col
+            offset += size
+        buffer._columns = columns
+        if isinstance(data, mmap.mmap):
+            buffer._mmap = data
+        return buffer
@@ -0,0 +1,133 @@
+import os
+import json
+import threading
+import logging
+
+
+class RegionManager:
+    """管理每个模板的搜索区域（ROI）
+
+    区域来源有两种：
+    - 模板目录中的清单文件（默认 regions.json），格式为 {"文件名.png": [x, y, w, h]}
+    - 自动学习：根据历史命中位置收缩出的区域，未命中时由调用方回退到全屏搜索；
+      learned_name 不为空时学习到的区域由 save_learned() 保存在模板目录中，下次加载时恢复
+    """
+
+    def __init__(self, folder_path, manifest_name='regions.json', auto_learn=False, margin=50,
+                 learned_name='regions.learned.json'):
+        self.logger = logging.getLogger('region_manager')
+        self.folder_path = folder_path
+        self.manifest_name = manifest_name
+        self.learned_name = learned_name
+        self.auto_learn = auto_learn
+        self.margin = margin
+        self.declared = {}
+        self.learned = {}
+        self._learned_dirty = False
+        self._lock = threading.Lock()
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.folder_path, self.manifest_name)
+
+    @property
+    def learned_path(self):
+        return os.path.join(self.folder_path, self.learned_name) if self.learned_name else None
+
+    def load(self):
+        """从清单文件加载声明的搜索区域；启用自动学习时恢复上次保存的学习区域"""
+        declared = self._read_regions(self.manifest_path, "搜索区域清单")
+        if declared:
+            self.logger.info(f"已加载 {len(declared)} 个模板搜索区域: {self.manifest_path}")
+        learned = {}
+        if self.auto_learn and self.learned_path:
+            learned = self._read_regions(self.learned_path, "学习的搜索区域")
+        with self._lock:
+            self.declared = declared
+            self.learned = learned
+            self._learned_dirty = False
+
+    def _read_regions(self, path, kind):
+        regions = {}
+        if not os.path.exists(path):
+            return regions
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            for filename, region in manifest.items():
+                if isinstance(region, (list, tuple)) and len(region) == 4:
+                    regions[filename] = tuple(int(v) for v in region)
+                else:
+                    self.logger.warning(f"忽略无效的搜索区域: {filename} -> {region}")
+        except (OSError, ValueError, AttributeError) as e:
+            self.logger.error(f"加载{kind}失败: {e}")
+        return regions
+
+    def save_learned(self):
+        """保存学习到的区域（有变化时才写文件）"""
+        path = self.learned_path
+        if not self.auto_learn or not path:
+            return
+        with self._lock:
+            if not self._learned_dirty:
+                return
+            learned = {filename: list(region) for filename, region in self.learned.items()}
+            self._learned_dirty = False
+        try:
+            tmp = f"{path}.tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(learned, f, indent=2, ensure_ascii=False)
+            os.replace(tmp, path)
+        except OSError as e:
+            self.logger.error(f"保存学习的搜索区域失败: {e}")
+
+    def get_region(self, filename):
+        """返回模板的搜索区域 (x, y, w, h)，没有时返回 None；声明的区域优先"""
+        with self._lock:
+            region = self.declared.get(filename)
+            if region is None:
+                region = self.learned.get(filename)
+            return region
+
+    def is_learned(self, filename):
+        """区域是否来自自动学习（可回退到全屏）"""
+        with self._lock:
+            return filename not in self.declared and filename in self.learned
+
+    def record_hit(self, filename, location, size):
+        """记录一次命中，扩展该模板的学习区域"""
+        if not self.auto_learn:
+            return
+        x, y = location
+        w, h = size
+        hit = (x - self.margin, y - self.margin, x + w + self.margin, y + h + self.margin)
+        with self._lock:
+            if filename in self.declared:
+                return
+            region = self.learned.get(filename)
+            if region is not None:
+                rx, ry, rw, rh = region
+                hit = (min(hit[0], rx), min(hit[1], ry), max(hit[2], rx + rw), max(hit[3], ry + rh))
+            x0, y0 = max(0, hit[0]), max(0, hit[1])
+            learned = (x0, y0, hit[2] - x0, hit[3] - y0)
+            if learned != region:
+                self.learned[filename] = learned
+                self._learned_dirty = True
+
+    def forget(self, filename=None):
+        """清除学习到的区域，filename 为 None 时清除全部"""
+        with self._lock:
+            if filename is None:
+                self.learned.clear()
+            else:
+                self.learned.pop(filename, None)
+            self._learned_dirty = True
+
+
+def clip_region(region, frame_shape):
+    """把区域裁剪到帧范围内，返回 (x, y, w, h)"""
+    x, y, w, h = region
+    height, width = frame_shape[:2]
+    x0, y0 = max(0, x), max(0, y)
+    x1, y1 = min(width, x + w), min(height, y + h)
+    return x0, y0, max(0, x1 - x0), max(0, y1 - y0)
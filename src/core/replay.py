@@ -0,0 +1,194 @@
+"""
+高精度事件回放：按单调时钟上的绝对截止时间调度事件，统计实际与计划时间的偏差
+"""
+import sys
+import time
+import logging
+from contextlib import ExitStack, nullcontext
+from array import array
+
+from .recording import MouseEvent, EVENT_MOVE, EVENT_PRESS, EVENT_RELEASE, EVENT_SCROLL, BUTTON_NAMES
+from .scheduler import MonotonicClock
+
+# Windows 的 sleep 粒度较粗，需要更长的忙等窗口
+DEFAULT_SPIN = 0.02 if sys.platform == 'win32' else 0.002
+
+
+class ReplayStats:
+    """回放时间偏差统计，lag 为实际执行时间减去计划时间（秒）"""
+
+    def __init__(self):
+        self.lags = array('d')
+        self.rebases = 0
+
+    def add(self, lag):
+        self.lags.append(lag)
+
+    def summary(self):
+        """返回 {'events', 'mean_ms', 'p50_ms', 'p99_ms', 'max_ms', 'rebases'}"""
+        count = len(self.lags)
+        if count == 0:
+            return {'events': 0, 'mean_ms': 0.0, 'p50_ms': 0.0, 'p99_ms': 0.0, 'max_ms': 0.0,
+                    'rebases': self.rebases}
+        ordered = sorted(abs(lag) for lag in self.lags)
+        return {
+            'events': count,
+            'mean_ms': sum(ordered) / count * 1000,
+            'p50_ms': ordered[int(0.5 * (count - 1))] * 1000,
+            'p99_ms': ordered[int(0.99 * (count - 1))] * 1000,
+            'max_ms': ordered[-1] * 1000,
+            'rebases': self.rebases,
+        }
+
+
+class MouseDispatcher:
+    """把录制的事件发送给 pynput 鼠标控制器，lock 用于与其他任务的输入串行化
+
+    按键按下后一直持有 lock，直到所有按键都释放（例如整段拖动），
+    其间其他任务不能移动鼠标或点击。lock 需可重入（InputDispatcher.lock）。
+    """
+
+    def __init__(self, controller, button_type, lock=None):
+        self.controller = controller
+        self.lock = lock if lock is not None else nullcontext()
+        self.buttons = {code: getattr(button_type, name) for code, name in BUTTON_NAMES.items()}
+        self.default_button = self.buttons[min(self.buttons)]
+        self._held = set()
+        self._hold = None
+
+    def click(self, event):
+        with self.lock:
+            self.controller.position = (event.x, event.y)
+            self.controller.click(self.buttons.get(event.button, self.default_button), 1)
+
+    def dispatch(self, event):
+        if event.kind == EVENT_PRESS and self._hold is None:
+            self._hold = ExitStack()
+            self._hold.enter_context(self.lock)
+        try:
+            with self.lock:
+                self._dispatch(event)
+        finally:
+            if event.kind == EVENT_PRESS:
+                self._held.add(event.button)
+            elif event.kind == EVENT_RELEASE:
+                self._held.discard(event.button)
+            if not self._held and self._hold is not None:
+                self._hold.close()
+                self._hold = None
+
+    def _dispatch(self, event):
+        if event.kind == EVENT_MOVE:
+            self.controller.position = (event.x, event.y)
+        elif event.kind == EVENT_PRESS:
+            self.controller.position = (event.x, event.y)
+            self.controller.press(self.buttons.get(event.button, self.default_button))
+        elif event.kind == EVENT_RELEASE:
+            self.controller.position = (event.x, event.y)
+            self.controller.release(self.buttons.get(event.button, self.default_button))
+        elif event.kind == EVENT_SCROLL:
+            self.controller.position = (event.x, event.y)
+            self.controller.scroll(event.dx, event.dy)
+
+
+class ReplayEngine:
+    """按截止时间回放事件
+
+    - mode='recorded' 按录制时的事件间隔回放全部事件；mode='fixed' 只回放点击，间隔固定为 interval
+    - speed 为速度倍数，2.0 表示两倍速
+    - 每个事件的截止时间都从本轮开始时间算起，误差不会累积；先粗略睡眠，最后 spin 秒忙等
+    - 落后计划超过 max_lag 时（例如系统卡顿）把后续计划整体顺延，避免连续补发
+    - 结束时（包括被停止或出错）仍按下的按键会在最后的位置释放，不会留在按下状态
+    """
+
+    # 睡眠期间检查停止标志的最长间隔（秒）
+    CHECK_INTERVAL = 0.05
+
+    def __init__(self, dispatcher, clock=None, mode='fixed', interval=0.1, speed=1.0,
+                 spin=DEFAULT_SPIN, max_lag=0.1):
+        self.logger = logging.getLogger('replay')
+        self.dispatcher = dispatcher
+        self.clock = clock or MonotonicClock()
+        if mode not in ('recorded', 'fixed'):
+            self.logger.warning(f"未知的回放模式: {mode}，使用 fixed")
+            mode = 'fixed'
+        self.mode = mode
+        self.interval = interval
+        self.speed = speed if speed and speed > 0 else 1.0
+        self.spin = max(0.0, spin)
+        self.max_lag = max_lag
+        self.stats = ReplayStats()
+
+    def schedule(self, events):
+        """生成 [(相对本轮开始的计划时间, 事件, 是否按点击发送)]"""
+        step = self.interval / self.speed
+        if self.mode == 'fixed':
+            presses = [event for event in events if event.kind == EVENT_PRESS]
+            return [(i * step, event, True) for i, event in enumerate(presses)]
+        events = list(events)
+        if not events:
+            return []
+        start = events[0].time
+        return [((event.time - start) / self.speed, event, False) for event in events]
+
+    def run(self, events, loops=1, stop_event=None, should_stop=None, on_loop=None):
+        """回放 loops 轮，被停止时返回 False；on_loop(轮次) 在每轮开始时调用"""
+        plan = self.schedule(events)
+        self.stats = ReplayStats()
+        if not plan:
+            return True
+        # 相邻两轮之间间隔一个 interval，与两次点击之间的间隔一致
+        loop_length = plan[-1][0] + self.interval / self.speed
+        base = self.clock.now()
+        # 已按下未释放的按键 {按键: 按下事件}，以及最后发送的事件（释放时使用其位置）
+        pressed = {}
+        last = None
+        try:
+            for loop_idx in range(loops):
+                if on_loop is not None:
+                    on_loop(loop_idx)
+                for offset, event, as_click in plan:
+                    if not self._wait_until(base + offset, stop_event, should_stop):
+                        self.logger.info(f"回放被停止（循环 {loop_idx + 1}/{loops}）")
+                        return False
+                    lag = self.clock.now() - (base + offset)
+                    if as_click:
+                        self.dispatcher.click(event)
+                    else:
+                        self.dispatcher.dispatch(event)
+                        if event.kind == EVENT_PRESS:
+                            pressed[event.button] = event
+                        elif event.kind == EVENT_RELEASE:
+                            pressed.pop(event.button, None)
+                        last = event
+                    self.stats.add(lag)
+                    if self.max_lag is not None and lag > self.max_lag:
+                        base += lag
+                        self.stats.rebases += 1
+                base += loop_length
+            return True
+        finally:
+            self._release_pressed(pressed, last)
+
+    def _release_pressed(self, pressed, last):
+        for button in pressed:
+            self.logger.info(f"回放结束时释放仍按下的按键: {BUTTON_NAMES.get(button, button)}")
+            self.dispatcher.dispatch(MouseEvent(last.time, EVENT_RELEASE, button, last.x, last.y, 0, 0))
+
+    def _stopped(self, stop_event, should_stop):
+        return (stop_event is not None and stop_event.is_set()) or (should_stop is not None and should_stop())
+
+    def _wait_until(self, deadline, stop_event, should_stop):
+        """等待到截止时间，期间响应停止；被停止时返回 False"""
+        while True:
+            if self._stopped(stop_event, should_stop):
+                return False
+            remaining = deadline - self.clock.now()
+            if remaining <= 0:
+                return True
+            if remaining > self.spin:
+                self.clock.sleep(min(remaining - self.spin, self.CHECK_INTERVAL), stop_event)
+            else:
+                # 最后一小段忙等，避开系统 sleep 的粒度误差
+                time.sleep(0)
+
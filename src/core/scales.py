@@ -0,0 +1,116 @@
+import threading
+import logging
+import cv2
+
+
+class ScaleSelector:
+    """多尺度匹配的模板变体和每个显示器的缩放比例
+
+    按 scales 预先生成每个模板的缩放变体（加载模板时生成一次），
+    某个缩放比例在一个显示器上命中后即被记住，此后在该显示器上只匹配这一个比例。
+    """
+
+    def __init__(self, scales=(1.0,), min_size=4):
+        self.logger = logging.getLogger('scale_selector')
+        self.scales = self._normalize(scales)
+        self.min_size = min_size
+        self._variants = {}
+        self._winners = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(scales):
+        result = []
+        for scale in scales or (1.0,):
+            scale = round(float(scale), 4)
+            if scale > 0 and scale not in result:
+                result.append(scale)
+        return result or [1.0]
+
+    @property
+    def enabled(self):
+        """配置了多个缩放比例时才启用多尺度匹配"""
+        return len(self.scales) > 1
+
+    def prepare(self, filename, template):
+        """生成模板在各缩放比例下的变体，过小的变体被忽略"""
+        if not self.enabled:
+            return
+        height, width = template.shape[:2]
+        variants = {}
+        for scale in self.scales:
+            if scale == 1.0:
+                variants[scale] = template
+                continue
+            size = (int(round(width * scale)), int(round(height * scale)))
+            if min(size) < self.min_size:
+                continue
+            interpolation = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR
+            variants[scale] = cv2.resize(template, size, interpolation=interpolation)
+        with self._lock:
+            self._variants[filename] = variants
+
+    def clear(self):
+        """丢弃全部模板变体（模板重新加载时调用），已记住的缩放比例保留"""
+        with self._lock:
+            self._variants.clear()
+
+    def candidates(self, filename, template, display):
+        """返回需要尝试的 [(缩放比例, 模板变体)]，显示器已记住缩放比例时只返回该比例"""
+        with self._lock:
+            variants = self._variants.get(filename)
+            winner = self._winners.get(display)
+        if not variants:
+            return [(1.0, template)]
+        if winner is not None and winner in variants:
+            return [(winner, variants[winner])]
+        return list(variants.items())
+
+    def best_match(self, matcher, screenshot, filename, template, display, threshold):
+        """依次尝试各缩放变体，返回 (最高相似度, 位置, 缩放比例, (宽, 高))
+
+        某个比例达到阈值即停止尝试，并记住该显示器的缩放比例；
+        所有变体都比截图大时缩放比例和尺寸为 None。
+        """
+        height, width = screenshot.shape[:2]
+        best_val, best_loc, best_scale, best_size = -1.0, (0, 0), None, None
+        for scale, variant in self.candidates(filename, template, display):
+            vh, vw = variant.shape[:2]
+            if vh > height or vw > width:
+                continue
+            max_val, max_loc = matcher.match(screenshot, variant, threshold)
+            if max_val > best_val:
+                best_val, best_loc, best_scale, best_size = max_val, max_loc, scale, (vw, vh)
+            if max_val >= threshold:
+                break
+        if best_size is not None and best_val >= threshold:
+            self.record_hit(display, best_scale)
+        return best_val, best_loc, best_scale, best_size
+
+    def variant(self, filename, scale, template):
+        """返回模板在指定缩放比例下的变体，没有时返回模板本身"""
+        with self._lock:
+            variants = self._variants.get(filename)
+        if not variants or scale not in variants:
+            return template
+        return variants[scale]
+
+    def record_hit(self, display, scale):
+        """记住显示器上命中的缩放比例"""
+        with self._lock:
+            if display in self._winners:
+                return
+            self._winners[display] = scale
+        self.logger.info(f"显示器 {display} 使用缩放比例 {scale}")
+
+    def winner(self, display):
+        with self._lock:
+            return self._winners.get(display)
+
+    def forget(self, display=None):
+        """清除记住的缩放比例，display 为 None 时清除全部"""
+        with self._lock:
+            if display is None:
+                self._winners.clear()
+            else:
+                self._winners.pop(display, None)
@@ -0,0 +1,113 @@
+import time
+import threading
+
+
+class MonotonicClock:
+    """基于 time.monotonic() 的时钟，sleep 可被停止事件打断"""
+
+    def now(self):
+        return time.monotonic()
+
+    def sleep(self, seconds, stop_event=None):
+        if seconds <= 0:
+            return
+        if stop_event is not None:
+            stop_event.wait(seconds)
+        else:
+            time.sleep(seconds)
+
+
+class FakeClock:
+    """测试用的假时钟，sleep 只推进时间不真正等待"""
+
+    def __init__(self, start=0.0):
+        self._now = start
+        self.sleeps = []
+
+    def now(self):
+        return self._now
+
+    def sleep(self, seconds, stop_event=None):
+        if seconds <= 0:
+            return
+        self.sleeps.append(seconds)
+        self._now += seconds
+
+    def advance(self, seconds):
+        self._now += seconds
+
+
+class PollScheduler:
+    """自适应轮询调度
+
+    - 模板持续未命中且画面未变化时，轮询间隔按 backoff 倍数增长，最长 max_interval
+    - 画面变化或命中后立即恢复到 min_interval 快速轮询
+    - max_fps 为所有模板共享的截图帧率预算，两次截图至少间隔 1 / max_fps 秒（0 表示不限制）
+    """
+
+    def __init__(self, clock=None, min_interval=0.02, max_interval=0.5, backoff=1.5, max_fps=0):
+        self.clock = clock or MonotonicClock()
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.backoff = max(1.0, backoff)
+        self.max_fps = max_fps
+        self._intervals = {}
+        self._last_capture = None
+        self._lock = threading.Lock()
+
+    def reset(self, key=None):
+        """恢复 key（为 None 时为全部）的轮询间隔"""
+        with self._lock:
+            if key is None:
+                self._intervals.clear()
+                self._last_capture = None
+            else:
+                self._intervals.pop(key, None)
+
+    def record(self, key, found, changed):
+        """根据一次匹配结果调整 key 的轮询间隔"""
+        with self._lock:
+            if found or changed:
+                self._intervals[key] = self.min_interval
+            else:
+                current = self._intervals.get(key, self.min_interval)
+                self._intervals[key] = min(self.max_interval, current * self.backoff)
+
+    def note_capture(self):
+        """记录一次截图，用于全局帧率预算"""
+        with self._lock:
+            self._last_capture = self.clock.now()
+
+    def interval(self, key):
+        with self._lock:
+            return self._intervals.get(key, self.min_interval)
+
+    def next_delay(self, key):
+        """距离 key 下一次轮询还需等待的秒数"""
+        delay = self.interval(key)
+        if self.max_fps and self.max_fps > 0:
+            with self._lock:
+                last_capture = self._last_capture
+            if last_capture is not None:
+                budget_wait = last_capture + 1.0 / self.max_fps - self.clock.now()
+                delay = max(delay, budget_wait)
+        return max(0.0, delay)
+
+    def wait(self, key, stop_event=None, deadline=None):
+        """等待到 key 的下一次轮询时间，不超过 deadline"""
+        delay = self.next_delay(key)
+        if deadline is not None:
+            delay = min(delay, max(0.0, deadline - self.clock.now()))
+        self.clock.sleep(delay, stop_event)
+        return delay
+
+
+def create_scheduler(config, clock=None):
+    """根据配置创建轮询调度器"""
+    return PollScheduler(
+        clock=clock,
+        min_interval=config.get('poll_min_interval', 0.02),
+        max_interval=config.get('poll_max_interval', 0.5),
+        backoff=config.get('poll_backoff', 1.5),
+        max_fps=config.get('max_fps', 30)
+    )
@@ -0,0 +1,203 @@
+import os
+import time
+import threading
+import logging
+from abc import ABC, abstractmethod
+import cv2
+import numpy as np
+
+
+class ScreenSource(ABC):
+    """屏幕帧来源基类，grab() 返回灰度 NumPy 数组并分别记录截图和灰度转换耗时"""
+    name = 'base'
+
+    def __init__(self):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.last_latency = 0.0
+        self.last_capture_latency = 0.0
+        self.last_convert_latency = 0.0
+        self.total_latency = 0.0
+        self.capture_count = 0
+        self._stats_lock = threading.Lock()
+
+    def grab(self):
+        """截取一帧灰度图像"""
+        start = time.perf_counter()
+        raw = self._capture()
+        captured = time.perf_counter()
+        frame = self._to_gray(raw)
+        self._record_latency(captured - start, time.perf_counter() - captured)
+        return frame
+
+    @abstractmethod
+    def _capture(self):
+        """截取原始图像"""
+        pass
+
+    def _to_gray(self, raw):
+        """把原始图像转换为灰度图，默认原样返回"""
+        return raw
+
+    def _record_latency(self, capture_latency, convert_latency):
+        with self._stats_lock:
+            self.last_capture_latency = capture_latency
+            self.last_convert_latency = convert_latency
+            self.last_latency = capture_latency + convert_latency
+            self.total_latency += self.last_latency
+            self.capture_count += 1
+
+    @property
+    def average_latency(self):
+        """平均截图耗时（秒）"""
+        with self._stats_lock:
+            if self.capture_count == 0:
+                return 0.0
+            return self.total_latency / self.capture_count
+
+    def close(self):
+        """释放截图后端占用的资源"""
+        pass
+
+
+class PyAutoGuiScreenSource(ScreenSource):
+    """基于 pyautogui.screenshot() 的截图后端"""
+    name = 'pyautogui'
+
+    def __init__(self):
+        super().__init__()
+        # 延迟导入，避免无显示环境下导入失败
+        import pyautogui
+        self._pyautogui = pyautogui
+
+    def _capture(self):
+        return self._pyautogui.screenshot()
+
+    def _to_gray(self, raw):
+        return cv2.cvtColor(np.asarray(raw), cv2.COLOR_RGB2GRAY)
+
+
+class MssScreenSource(ScreenSource):
+    """基于 mss 的截图后端（Linux 下使用 XShm），像素缓冲区以零拷贝方式映射为 NumPy 视图"""
+    name = 'mss'
+
+    def __init__(self, monitor=1):
+        super().__init__()
+        import mss
+        self._mss = mss
+        self.monitor = monitor
+        # mss 实例不能跨线程使用，每个线程各自持有一个
+        self._local = threading.local()
+
+    def _get_sct(self):
+        sct = getattr(self._local, 'sct', None)
+        if sct is None:
+            sct = self._mss.mss()
+            self._local.sct = sct
+        return sct
+
+    def _capture(self):
+        sct = self._get_sct()
+        monitors = sct.monitors
+        monitor = monitors[self.monitor] if self.monitor < len(monitors) else monitors[0]
+        shot = sct.grab(monitor)
+        return np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+
+    def _to_gray(self, raw):
+        return cv2.cvtColor(raw, cv2.COLOR_BGRA2GRAY)
+
+    def close(self):
+        sct = getattr(self._local, 'sct', None)
+        if sct is not None:
+            sct.close()
+            self._local.sct = None
+
+
+class FileScreenSource(ScreenSource):
+    """从图片文件或目录读取帧，用于无显示环境下的回放和测试；目录中的图片按文件名顺序循环"""
+    name = 'file'
+    IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+
+    def __init__(self, path, loop=True):
+        super().__init__()
+        self.path = path
+        self.loop = loop
+        self._index = 0
+        self._lock = threading.Lock()
+        self._cached = None
+        if os.path.isdir(path):
+            self.files = [os.path.join(path, f) for f in sorted(os.listdir(path))
+                          if f.lower().endswith(self.IMAGE_EXTENSIONS)]
+        elif os.path.isfile(path):
+            self.files = [path]
+        else:
+            raise FileNotFoundError(f"截图来源不存在: {path}")
+        if not self.files:
+            raise FileNotFoundError(f"截图目录中没有图片: {path}")
+
+    def _capture(self):
+        if len(self.files) == 1:
+            # 单张图片只解码一次
+            if self._cached is None:
+                self._cached = self._read(self.files[0])
+            return self._cached
+        with self._lock:
+            index = self._index
+            if self._index < len(self.files) - 1:
+                self._index += 1
+            elif self.loop:
+                self._index = 0
+        return self._read(self.files[index])
+
+    def _read(self, path):
+        frame = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if frame is None:
+            raise IOError(f"无法读取截图文件: {path}")
+        return frame
+
+
+class ArrayScreenSource(ScreenSource):
+    """从内存中的 NumPy 数组返回帧，用于基准测试和单元测试；多帧时按顺序循环"""
+    name = 'array'
+
+    def __init__(self, frames, loop=True):
+        super().__init__()
+        if isinstance(frames, np.ndarray):
+            frames = [frames]
+        self.frames = [self._ensure_gray(frame) for frame in frames]
+        if not self.frames:
+            raise ValueError("至少需要一帧图像")
+        self.loop = loop
+        self._index = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _ensure_gray(frame):
+        if frame.ndim == 3:
+            return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        return frame
+
+    def _capture(self):
+        with self._lock:
+            index = self._index
+            if self._index < len(self.frames) - 1:
+                self._index += 1
+            elif self.loop:
+                self._index = 0
+        return self.frames[index]
+
+
+def create_screen_source(config):
+    """根据配置中的 screen_source 创建截图后端"""
+    logger = logging.getLogger('screen_source')
+    name = config.get('screen_source', 'pyautogui')
+    if name == 'file':
+        return FileScreenSource(config.get('screen_source_path', 'data/screens'))
+    if name == 'mss':
+        try:
+            return MssScreenSource(config.get('screen_monitor', 1))
+        except ImportError:
+            logger.warning("未安装 mss，回退到 pyautogui 截图后端")
+            return PyAutoGuiScreenSource()
+    if name != 'pyautogui':
+        logger.warning(f"未知的截图后端: {name}，使用 pyautogui")
+    return PyAutoGuiScreenSource()
@@ -0,0 +1,274 @@
+"""
+多任务会话：在一个进程中并行运行多个命名任务（图片识别点击、回放、工作流）
+
+每个任务有独立的停止标志、循环计数和进度通道；所有任务共用截图后端（同一显示器上
+frame_max_age 内的截图请求合并为一次）、模板缓存和串行化的鼠标输入。
+"""
+import time
+import threading
+import logging
+
+from .screen_source import ScreenSource, create_screen_source
+from .template_cache import TemplateCache
+from .input_dispatcher import InputDispatcher
+from .scheduler import MonotonicClock
+
+
+class ConfigOverlay:
+    """在共享配置上叠加任务自己的配置项，修改只影响本任务"""
+
+    def __init__(self, base, overrides=None):
+        self.base = base
+        self.overrides = dict(overrides or {})
+
+    def get(self, key, default=None):
+        if key in self.overrides:
+            return self.overrides[key]
+        return self.base.get(key, default)
+
+    def set(self, key, value):
+        self.overrides[key] = value
+
+
+class SharedScreenSource(ScreenSource):
+    """多个任务共用的截图后端，max_age 秒内的截图请求返回同一帧"""
+
+    def __init__(self, source, max_age=0.1, clock=None):
+        super().__init__()
+        self.source = source
+        self.name = source.name
+        self.monitor = getattr(source, 'monitor', None)
+        self.max_age = max_age
+        self._now = clock.now if clock is not None else time.monotonic
+        self._frame = None
+        self._frame_time = 0.0
+        self._lock = threading.Lock()
+        self.shared_hits = 0
+
+    def grab(self):
+        with self._lock:
+            now = self._now()
+            if self._frame is not None and now - self._frame_time < self.max_age:
+                # 复用其他任务刚截取的帧，本次没有截图开销
+                self.shared_hits += 1
+                self._record_latency(0.0, 0.0)
+                return self._frame
+            frame = self.source.grab()
+            self._frame, self._frame_time = frame, now
+            self._record_latency(self.source.last_capture_latency, self.source.last_convert_latency)
+            return frame
+
+    def _capture(self):
+        return self.source.grab()
+
+    def close(self):
+        self.source.close()
+
+
+class Session:
+    """一个命名任务及其运行状态
+
+    status 为 pending、running、done、failed、stopped 之一。
+    """
+
+    def __init__(self, name, kind, task, run, cleanup=None, stop_event=None):
+        self.name = name
+        self.kind = kind
+        self.task = task
+        self.stop_event = stop_event or threading.Event()
+        self.status = 'pending'
+        self.error = None
+        self.started = None
+        self.finished = None
+        self._run = run
+        self._cleanup = cleanup
+        self._thread = None
+
+    @property
+    def progress(self):
+        """任务自己的进度通道（ProgressChannel）"""
+        return self.task.progress
+
+    @property
+    def current_loop(self):
+        return self.task.current_loop
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        self.status = 'running'
+        self.started = time.time()
+        self._thread = threading.Thread(target=self._target, name=f"session-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """只停止本任务"""
+        self.stop_event.set()
+
+    def join(self, timeout=None):
+        """等待任务结束，返回是否已结束"""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return not self.running
+
+    def snapshot(self):
+        """返回用于展示的状态 {'name', 'kind', 'status', 'loop', 'progress', 'error'}"""
+        return {
+            'name': self.name,
+            'kind': self.kind,
+            'status': self.status,
+            'loop': self.current_loop,
+            'progress': self.progress.latest(),
+            'error': self.error,
+        }
+
+    def _target(self):
+        logger = logging.getLogger('session')
+        try:
+            completed = self._run(self.stop_event)
+            if self.stop_event.is_set():
+                self.status = 'stopped'
+            else:
+                self.status = 'done' if completed is not False else 'failed'
+        except Exception as e:
+            logger.exception(f"任务 {self.name} 出错: {e}")
+            self.error = str(e)
+            self.status = 'failed'
+        finally:
+            if self._cleanup is not None:
+                self._cleanup()
+            self.finished = time.time()
+            logger.info(f"任务 {self.name} 结束: {self.status}")
+
+
+class SessionManager:
+    """在一个进程中并行运行多个命名任务
+
+    任务通过 overrides 覆盖各自的配置（例如 png_dir、screen_monitor），
+    截图后端按 screen_source / screen_monitor / screen_source_path 共用，
+    模板缓存和鼠标输入（InputDispatcher）由全部任务共用。
+    """
+
+    def __init__(self, config, screen_source=None, clock=None, dispatcher=None):
+        self.logger = logging.getLogger('session_manager')
+        self.config = config
+        self.clock = clock or MonotonicClock()
+        self.template_cache = TemplateCache(
+            config.get('template_cache_dir', 'data/cache/templates'),
+            pyramid_levels=config.get('pyramid_levels', 2)
+        )
+        self.dispatcher = dispatcher or InputDispatcher()
+        # 注入的截图后端供全部任务共用，便于测试
+        self._screen_source = screen_source
+        self._screens = {}
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def screen_source(self, config):
+        """返回与 config 的截图配置对应的共享截图后端"""
+        if self._screen_source is not None:
+            key = None
+        else:
+            key = (config.get('screen_source', 'pyautogui'), config.get('screen_monitor', 1),
+                   config.get('screen_source_path'))
+        with self._lock:
+            shared = self._screens.get(key)
+            if shared is None:
+                source = self._screen_source or create_screen_source(config)
+                shared = SharedScreenSource(source, config.get('frame_max_age', 0.1), self.clock)
+                self._screens[key] = shared
+            return shared
+
+    def start_images(self, name, overrides=None):
+        """启动图片识别点击任务"""
+        config = ConfigOverlay(self.config, overrides)
+        clicker = self._create_clicker(config)
+        return self._launch(Session(name, 'images', clicker, clicker.start, clicker.stop))
+
+    def start_replay(self, name, path, overrides=None):
+        """启动回放任务，path 为 .rec 录制文件或 JSON 坐标文件"""
+        from .click_recorder import ClickRecorder
+
+        # 不自动加载上一次的录制
+        config = ConfigOverlay(self.config, dict(overrides or {}, recording_file=None))
+        recorder = ClickRecorder(config, dispatcher=self.dispatcher)
+        if not recorder.load_file(path):
+            raise ValueError(f"无法加载点击文件: {path}")
+
+        def run(stop_event):
+            recorder.play_clicks(stop_event)
+            return not stop_event.is_set()
+
+        return self._launch(Session(name, 'replay', recorder, run, recorder.stop_playing))
+
+    def start_workflow(self, name, workflow, overrides=None):
+        """启动工作流任务，workflow 为 Workflow 或工作流文件路径"""
+        from .workflow import Workflow, WorkflowRunner
+
+        if not isinstance(workflow, Workflow):
+            workflow = Workflow.load(workflow)
+        overrides = dict(overrides or {})
+        if workflow.png_dir:
+            overrides.setdefault('png_dir', workflow.png_dir)
+        config = ConfigOverlay(self.config, overrides)
+        clicker = self._create_clicker(config)
+        stop_event = threading.Event()
+        runner = WorkflowRunner(workflow, clicker, config, stop_event)
+        return self._launch(Session(name, 'workflow', runner, lambda _: runner.run(), clicker.stop, stop_event))
+
+    def _create_clicker(self, config):
+        from .image_clicker import ImageClicker
+
+        return ImageClicker(config, screen_source=self.screen_source(config), clock=self.clock,
+                            template_cache=self.template_cache, dispatcher=self.dispatcher)
+
+    def _launch(self, session):
+        with self._lock:
+            existing = self._sessions.get(session.name)
+            if existing is not None and existing.running:
+                raise ValueError(f"任务 {session.name} 正在运行")
+            self._sessions[session.name] = session
+        session.start()
+        self.logger.info(f"启动任务 {session.name} ({session.kind})")
+        return session
+
+    def get(self, name):
+        with self._lock:
+            return self._sessions.get(name)
+
+    def sessions(self):
+        with self._lock:
+            return list(self._sessions.values())
+
+    def status(self):
+        """返回 {任务名: 状态快照}"""
+        return {session.name: session.snapshot() for session in self.sessions()}
+
+    def stop(self, name):
+        session = self.get(name)
+        if session is not None:
+            session.stop()
+
+    def stop_all(self):
+        for session in self.sessions():
+            session.stop()
+
+    def join(self, timeout=None):
+        """等待全部任务结束，返回是否都已结束"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for session in self.sessions():
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            session.join(remaining)
+        return not any(session.running for session in self.sessions())
+
+    def close(self):
+        """停止全部任务并释放截图后端"""
+        self.stop_all()
+        self.join(timeout=5.0)
+        with self._lock:
+            screens, self._screens = list(self._screens.values()), {}
+        for screen in screens:
+            screen.close()
+        self.template_cache.flush()
@@ -0,0 +1,243 @@
+import os
+import json
+import hashlib
+import threading
+import logging
+import cv2
+import numpy as np
+
+from .template_store import TemplateStore
+
+
+class TemplateEntry:
+    """解码后的模板及其派生数据"""
+
+    def __init__(self, path, image, pyramid, mean, std, mtime_ns, size):
+        self.path = path
+        self.image = image
+        self.pyramid = pyramid
+        self.mean = mean
+        self.std = std
+        self.mtime_ns = mtime_ns
+        self.size = size
+
+    @property
+    def signature(self):
+        return self.mtime_ns, self.size
+
+
+class TemplateCache:
+    """模板缓存，按路径、修改时间和文件大小判断是否需要重新解码
+
+    灰度图保存为 .npy 并以内存映射方式加载，金字塔层保存为 .npz，
+    模板统计量（均值、标准差）记录在索引文件 index.json 中。
+    cache_dir 为 None 时只在内存中缓存。
+    load_store() 返回的紧凑存储按目录和存储配置在共用本缓存的所有任务间共享。
+    磁盘缓存省去的是 PNG 解码：load_store() 把映射的数据复制进连续存储一次，之后条目改为引用
+    存储中的视图，内存映射随之关闭，同一模板只驻留一份。
+    """
+    INDEX_NAME = 'index.json'
+
+    def __init__(self, cache_dir=None, pyramid_levels=2):
+        self.logger = logging.getLogger('template_cache')
+        self.cache_dir = cache_dir
+        self.pyramid_levels = pyramid_levels
+        self._memory = {}
+        self._index = {}
+        self._index_dirty = False
+        self._lock = threading.Lock()
+        # {(目录, 金字塔层数, 是否含边缘图): (TemplateStore, 构建时的 [(文件名, 条目, 签名)])}
+        self._stores = {}
+        self._store_lock = threading.Lock()
+        if cache_dir:
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                self._index = self._read_index()
+            except OSError as e:
+                self.logger.warning(f"无法使用模板缓存目录 {cache_dir}，仅使用内存缓存: {e}")
+                self.cache_dir = None
+
+    @property
+    def index_path(self):
+        return os.path.join(self.cache_dir, self.INDEX_NAME)
+
+    def _read_index(self):
+        if not os.path.exists(self.index_path):
+            return {}
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"模板缓存索引损坏，将重建: {e}")
+            return {}
+
+    def load_folder(self, folder_path, extension='.png'):
+        """加载目录中的全部模板，返回按文件名排序的 [(文件名, TemplateEntry)]
+
+        未变化的模板直接复用内存或磁盘缓存，只有新增或修改过的模板会重新解码。
+        """
+        entries = []
+        seen = set()
+        for filename in sorted(os.listdir(folder_path)):
+            if not filename.endswith(extension):
+                continue
+            path = os.path.abspath(os.path.join(folder_path, filename))
+            seen.add(path)
+            entry = self.load(path)
+            if entry is not None:
+                entries.append((filename, entry))
+        self._prune(os.path.abspath(folder_path), seen)
+        self.flush()
+        return entries
+
+    def load_store(self, folder_path, pyramid_levels=0, edges=False, extension='.png'):
+        """加载目录中的全部模板到紧凑存储，返回 (TemplateStore, [(文件名, TemplateEntry)])
+
+        模板都没有变化时直接返回已有的存储，不再复制；有变化时只重新解码变化的模板，再整块重建存储。
+        缓存条目改为引用存储中的视图，同一模板在内存中只保留一份。
+        """
+        key = (os.path.abspath(folder_path), pyramid_levels, bool(edges))
+        with self._store_lock:
+            entries = self.load_folder(folder_path, extension)
+            built_from = [(filename, entry, entry.signature) for filename, entry in entries]
+            cached = self._stores.get(key)
+            if cached is not None and cached[1] == built_from:
+                return cached[0], entries
+            store = TemplateStore([(filename, entry.image, entry.pyramid) for filename, entry in entries],
+                                  pyramid_levels=pyramid_levels, edges=edges)
+            for filename, entry in entries:
+                levels = store.pyramid(filename)
+                entry.image, entry.pyramid = store.get(filename), levels + entry.pyramid[len(levels):]
+            self._stores[key] = (store, built_from)
+            return store, entries
+
+    def load(self, path):
+        """加载单个模板，文件无法读取时返回 None"""
+        path = os.path.abspath(path)
+        try:
+            stat = os.stat(path)
+        except OSError as e:
+            self.logger.warning(f"无法读取图片: {path} ({e})")
+            return None
+        signature = (stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            entry = self._memory.get(path)
+        if entry is not None and entry.signature == signature:
+            return entry
+
+        entry = self._load_from_disk(path, signature)
+        if entry is None:
+            entry = self._decode(path, signature)
+            if entry is None:
+                return None
+            self.logger.debug(f"已解码模板: {path}")
+        with self._lock:
+            self._memory[path] = entry
+        return entry
+
+    def _cache_key(self, path, signature):
+        raw = f"{path}|{signature[0]}|{signature[1]}".encode('utf-8')
+        return hashlib.sha1(raw).hexdigest()[:16]
+
+    def _load_from_disk(self, path, signature):
+        if not self.cache_dir:
+            return None
+        with self._lock:
+            record = self._index.get(path)
+        if not record or (record.get('mtime_ns'), record.get('size')) != signature:
+            return None
+        key = record['key']
+        try:
+            image = np.load(os.path.join(self.cache_dir, f"{key}.npy"), mmap_mode='r')
+            with np.load(os.path.join(self.cache_dir, f"{key}.npz")) as data:
+                pyramid = [image] + [data[f"level{i}"] for i in range(1, len(data.files) + 1)]
+        except (OSError, ValueError, KeyError) as e:
+            self.logger.warning(f"模板缓存文件损坏，将重新解码: {path} ({e})")
+            return None
+        return TemplateEntry(path, image, pyramid, record['mean'], record['std'], *signature)
+
+    def _decode(self, path, signature):
+        image = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            self.logger.warning(f"无法读取图片: {path}")
+            return None
+        pyramid = [image]
+        for _ in range(self.pyramid_levels):
+            if min(pyramid[-1].shape[:2]) < 2:
+                break
+            pyramid.append(cv2.pyrDown(pyramid[-1]))
+        mean, std = cv2.meanStdDev(image)
+        entry = TemplateEntry(path, image, pyramid, float(mean[0][0]), float(std[0][0]), *signature)
+        self._store(entry)
+        return entry
+
+    def _store(self, entry):
+        if not self.cache_dir:
+            return
+        key = self._cache_key(entry.path, entry.signature)
+        try:
+            self._atomic_save(f"{key}.npy", lambda f: np.save(f, entry.image))
+            levels = {f"level{i}": level for i, level in enumerate(entry.pyramid[1:], start=1)}
+            self._atomic_save(f"{key}.npz", lambda f: np.savez(f, **levels))
+        except OSError as e:
+            self.logger.warning(f"写入模板缓存失败: {entry.path} ({e})")
+            return
+        with self._lock:
+            old = self._index.get(entry.path)
+            self._index[entry.path] = {
+                'key': key,
+                'mtime_ns': entry.mtime_ns,
+                'size': entry.size,
+                'shape': list(entry.image.shape),
+                'mean': entry.mean,
+                'std': entry.std,
+            }
+            self._index_dirty = True
+        if old and old.get('key') != key:
+            self._remove_files(old['key'])
+
+    def _atomic_save(self, name, writer):
+        target = os.path.join(self.cache_dir, name)
+        tmp = target + '.tmp'
+        with open(tmp, 'wb') as f:
+            writer(f)
+        os.replace(tmp, target)
+
+    def _remove_files(self, key):
+        for ext in ('.npy', '.npz'):
+            try:
+                os.remove(os.path.join(self.cache_dir, key + ext))
+            except OSError:
+                # Windows 下仍被内存映射的文件无法删除，下次清理时再处理
+                pass
+
+    def _prune(self, folder_path, keep):
+        """清除目录中已删除模板的缓存"""
+        prefix = folder_path + os.sep
+        with self._lock:
+            stale = [p for p in self._memory if p.startswith(prefix) and p not in keep]
+            for path in stale:
+                del self._memory[path]
+            removed = [(p, r) for p, r in self._index.items() if p.startswith(prefix) and p not in keep]
+            for path, _ in removed:
+                del self._index[path]
+            if removed:
+                self._index_dirty = True
+        for _, record in removed:
+            self._remove_files(record['key'])
+
+    def flush(self):
+        """把索引写回磁盘"""
+        if not self.cache_dir:
+            return
+        with self._lock:
+            if not self._index_dirty:
+                return
+            index = dict(self._index)
+            self._index_dirty = False
+        try:
+            self._atomic_save(self.INDEX_NAME, lambda f: f.write(
+                json.dumps(index, indent=2, ensure_ascii=False).encode('utf-8')))
+        except OSError as e:
+            self.logger.warning(f"写入模板缓存索引失败: {e}")
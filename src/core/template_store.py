@@ -0,0 +1,152 @@
+"""
+紧凑的模板存储：全部模板及其变体（金字塔缩小层、边缘图）连续存放在一块内存中
+
+每个模板只有一条 __slots__ 记录和若干指向这块内存的视图，没有逐个分配的像素数组，
+重新加载时整块替换，不会留下零散的旧副本。
+"""
+import sys
+
+import cv2
+import numpy as np
+
+# 每个图像块按缓存行对齐
+ALIGNMENT = 64
+
+
+class TemplateRecord:
+    """一个模板在存储中的位置和视图"""
+    __slots__ = ('name', 'offset', 'height', 'width', 'image', 'variants')
+
+    def __init__(self, name, offset, height, width, image):
+        self.name = name
+        self.offset = offset
+        self.height = height
+        self.width = width
+        self.image = image
+        self.variants = {}
+
+    def __repr__(self):
+        return f"TemplateRecord({self.name!r}, {self.width}x{self.height}, variants={list(self.variants)})"
+
+
+class TemplateStore:
+    """按顺序保存模板的紧凑存储
+
+    迭代和下标访问与原来的 [(文件名, 图像)] 列表一致，切片返回列表。
+    pyramid_levels 为保存的金字塔缩小层数（0 表示不保存），edges 为 True 时额外保存 Canny 边缘图。
+    """
+
+    def __init__(self, templates=(), pyramid_levels=0, edges=False, edge_thresholds=(50, 150)):
+        """templates 为 [(文件名, 图像)] 或 [(文件名, 图像, 金字塔)]，已有的金字塔层直接复用"""
+        self.pyramid_levels = max(0, int(pyramid_levels))
+        self.edges = edges
+        blocks = []
+        for item in templates:
+            name, image = item[0], item[1]
+            pyramid = item[2] if len(item) > 2 and item[2] is not None else [image]
+            blocks.append((name, self._variants(image, pyramid, edge_thresholds)))
+
+        total = sum(_aligned(image.size) for _, variants in blocks for _, image in variants)
+        raw = np.empty(total + ALIGNMENT, dtype=np.uint8)
+        start = -raw.ctypes.data % ALIGNMENT
+        self._arena = raw[start:start + total]
+        self._records = []
+        self._index = {}
+        offset = 0
+        for name, variants in blocks:
+            record = None
+            for kind, image in variants:
+                view = self._arena[offset:offset + image.size].reshape(image.shape)
+                view[...] = image
+                view.flags.writeable = False
+                if record is None:
+                    record = TemplateRecord(name, offset, image.shape[0], image.shape[1], view)
+                else:
+                    record.variants[kind] = view
+                offset += _aligned(image.size)
+            self._index[name] = len(self._records)
+            self._records.append(record)
+
+    def _variants(self, image, pyramid, edge_thresholds):
+        """返回需要保存的 [(类型, 图像)]，第一个为模板本身"""
+        image = np.asarray(image, dtype=np.uint8)
+        variants = [('image', image)]
+        levels = list(pyramid[1:self.pyramid_levels + 1])
+        while len(levels) < self.pyramid_levels and min((levels[-1] if levels else image).shape[:2]) >= 2:
+            levels.append(cv2.pyrDown(levels[-1] if levels else image))
+        variants.extend((f"pyramid{i}", np.asarray(level, dtype=np.uint8)) for i, level in enumerate(levels, start=1))
+        if self.edges:
+            variants.append(('edges', cv2.Canny(image, *edge_thresholds)))
+        return variants
+
+    def __len__(self):
+        return len(self._records)
+
+    def __bool__(self):
+        return bool(self._records)
+
+    def __iter__(self):
+        return ((record.name, record.image) for record in self._records)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [(record.name, record.image) for record in self._records[index]]
+        record = self._records[index]
+        return record.name, record.image
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def names(self):
+        return [record.name for record in self._records]
+
+    def record(self, name):
+        """返回模板记录，不存在时返回 None"""
+        index = self._index.get(name)
+        return None if index is None else self._records[index]
+
+    def get(self, name):
+        """返回模板图像，不存在时返回 None"""
+        record = self.record(name)
+        return None if record is None else record.image
+
+    def pyramid(self, name):
+        """返回 [模板, 第 1 层, ...]，只包含保存了的层"""
+        record = self.record(name)
+        if record is None:
+            return None
+        levels = [record.image]
+        while f"pyramid{len(levels)}" in record.variants:
+            levels.append(record.variants[f"pyramid{len(levels)}"])
+        return levels
+
+    def variant(self, name, kind):
+        """返回模板的变体（'edges' 或 'pyramidN'），没有时返回 None"""
+        record = self.record(name)
+        return None if record is None else record.variants.get(kind)
+
+    @property
+    def nbytes(self):
+        """连续内存块的字节数（含对齐填充）"""
+        return self._arena.nbytes
+
+    def bytes_resident(self):
+        """存储实际占用的字节数：连续内存块加上记录、视图和索引的对象开销"""
+        overhead = sys.getsizeof(self._records) + sys.getsizeof(self._index) + sys.getsizeof(self._arena)
+        for record in self._records:
+            overhead += sys.getsizeof(record) + sys.getsizeof(record.image) + sys.getsizeof(record.variants)
+            overhead += sum(sys.getsizeof(view) for view in record.variants.values())
+        return self._arena.nbytes + overhead
+
+    def stats(self):
+        """返回 {'templates', 'variants', 'arena_bytes', 'resident_bytes'}"""
+        return {
+            'templates': len(self._records),
+            'variants': sum(len(record.variants) for record in self._records),
+            'arena_bytes': self._arena.nbytes,
+            'resident_bytes': self.bytes_resident(),
+        }
+
+
+def _aligned(size):
+    return (size + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
@@ -0,0 +1,169 @@
+import threading
+import logging
+
+
+class Match:
+    """一次模板命中"""
+    __slots__ = ('name', 'score', 'location', 'size', 'timestamp')
+
+    def __init__(self, name, score, location, size, timestamp):
+        self.name = name
+        self.score = score
+        self.location = location
+        self.size = size
+        self.timestamp = timestamp
+
+    @property
+    def center(self):
+        x, y = self.location
+        w, h = self.size
+        return x + w // 2, y + h // 2
+
+    def __repr__(self):
+        return f"Match(name={self.name!r}, score={self.score:.3f}, location={self.location}, size={self.size})"
+
+
+class Subscription:
+    """一组模板的订阅
+
+    任一模板出现时回调（模板持续可见时不重复回调，消失后再次出现才会再回调）；
+    once=True 时第一次命中后自动取消。on_close 在订阅取消或截图循环关闭时以 result 为参数调用一次。
+    """
+
+    def __init__(self, watcher, templates, callback=None, once=False, on_close=None):
+        self._watcher = watcher
+        self.templates = templates
+        self.callback = callback
+        self.once = once
+        self.on_close = on_close
+        self.result = None
+        self.active = True
+        self._visible = set()
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._watcher.unsubscribe(self)
+
+    def wait(self, timeout=None, stop_event=None, poll=0.05):
+        """阻塞到命中、取消、超时或 stop_event 被设置，返回 Match 或 None"""
+        if stop_event is None:
+            self._event.wait(timeout)
+        else:
+            remaining = timeout
+            while not self._event.is_set() and not stop_event.is_set():
+                step = poll if remaining is None else min(poll, remaining)
+                if step <= 0:
+                    break
+                self._event.wait(step)
+                if remaining is not None:
+                    remaining -= step
+        return self.result
+
+    def _deliver(self, match):
+        self.result = match
+        self._event.set()
+
+    def _close(self):
+        was_active, self.active = self.active, False
+        self._event.set()
+        if was_active and self.on_close is not None:
+            self.on_close(self.result)
+
+
+class FrameWatcher:
+    """共享截图循环
+
+    一个后台线程按 ImageClicker 的轮询调度截图，在每一帧上把所有订阅中的模板各匹配一次，
+    命中后通知对应的订阅。没有订阅时线程退出，下次订阅时重新启动。
+    """
+
+    SCHEDULER_KEY = '__watch__'
+
+    def __init__(self, clicker):
+        self.logger = logging.getLogger('frame_watcher')
+        self.clicker = clicker
+        self._subscriptions = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def subscribe(self, templates, callback=None, once=False, on_close=None):
+        """templates 为 [(名称, 模板图像)]"""
+        subscription = Subscription(self, templates, callback, once, on_close)
+        with self._lock:
+            self._subscriptions.append(subscription)
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self.clicker.scheduler.reset(self.SCHEDULER_KEY)
+                self._thread = threading.Thread(target=self._run, name='frame-watcher', daemon=True)
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+        subscription._close()
+
+    def close(self):
+        """取消全部订阅并停止截图线程"""
+        with self._lock:
+            subscriptions, self._subscriptions = self._subscriptions, []
+            thread = self._thread
+            self._stop.set()
+        for subscription in subscriptions:
+            subscription._close()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=1.0)
+
+    def _run(self):
+        clicker = self.clicker
+        while not self._stop.is_set():
+            with self._lock:
+                subscriptions = list(self._subscriptions)
+                if not subscriptions:
+                    self._thread = None
+                    return
+            try:
+                found, changed = self._poll(subscriptions)
+            except Exception as e:
+                self.logger.exception(f"共享截图循环出错: {e}")
+                found, changed = False, True
+            clicker.scheduler.record(self.SCHEDULER_KEY, found, changed)
+            clicker.scheduler.wait(self.SCHEDULER_KEY, self._stop)
+
+    def _poll(self, subscriptions):
+        """截取一帧，每个模板只匹配一次，返回 (是否有命中, 画面是否变化)"""
+        clicker = self.clicker
+        frame = clicker.get_frame()
+        timestamp = clicker.clock.now()
+        templates = {}
+        for subscription in subscriptions:
+            for name, template in subscription.templates:
+                templates.setdefault(name, template)
+
+        matches = {}
+        changed = False
+        for name, template in templates.items():
+            score, location = clicker._match_template_on_screen(template, name, frame)
+            changed = changed or clicker._frame_changed.get(name, True)
+            if score >= clicker.threshold:
+                matches[name] = Match(name, score, location, clicker._matched_size(name, template), timestamp)
+
+        for subscription in subscriptions:
+            hits = [matches[name] for name, _ in subscription.templates if name in matches]
+            visible = {match.name for match in hits}
+            appeared = visible - subscription._visible
+            subscription._visible = visible
+            if not appeared or not subscription.active:
+                continue
+            match = max(hits, key=lambda m: m.score)
+            subscription._deliver(match)
+            if subscription.once:
+                self.unsubscribe(subscription)
+            if subscription.callback is not None:
+                try:
+                    subscription.callback(match)
+                except Exception as e:
+                    self.logger.exception(f"模板命中回调出错: {e}")
+        return bool(matches), changed
@@ -0,0 +1,383 @@
+"""
+声明式工作流：用 JSON（安装了 PyYAML 时也可用 YAML）描述由等待、点击、回放、分支和循环组成的任务
+
+示例：
+    {
+        "name": "每日签到",
+        "png_dir": "templates/png",
+        "timeout": 10,
+        "steps": [
+            {"click": "open.png"},
+            {"branch": [{"if": "signed.png", "steps": []},
+                        {"if": "sign.png", "steps": [{"click": "sign.png"}]}],
+             "timeout": 5},
+            {"loop_until": "done.png", "steps": [{"click": "next.png"}], "max_loops": 20},
+            {"replay": "macros/close.rec", "speed": 2.0}
+        ]
+    }
+
+工作流先编译为执行计划：校验全部步骤并预先加载用到的模板，
+运行时所有等待共用 ImageClicker 的截图循环（wait_for）。
+"""
+import os
+import json
+import logging
+from abc import ABC, abstractmethod
+
+from .progress import ProgressChannel, ProgressReport
+
+
+class WorkflowError(ValueError):
+    """工作流格式错误或执行失败"""
+
+
+class Step(ABC):
+    """执行计划中的一个步骤"""
+    action = ''
+
+    def __init__(self, spec, path):
+        self.path = path
+        self.optional = bool(spec.get('optional', False))
+
+    def templates(self):
+        """步骤（含子步骤）用到的模板"""
+        return []
+
+    def describe(self):
+        return self.action
+
+    @abstractmethod
+    def run(self, runner):
+        """执行步骤，失败时返回 False"""
+        pass
+
+
+class WaitStep(Step):
+    """等待任一模板出现"""
+    action = 'wait'
+
+    def __init__(self, spec, path, default_timeout):
+        super().__init__(spec, path)
+        self.targets = _as_list(spec[self.action], path)
+        self.timeout = _number(spec.get('timeout', default_timeout), path, 'timeout')
+
+    def templates(self):
+        return list(self.targets)
+
+    def describe(self):
+        return f"{self.action} {', '.join(self.targets)}"
+
+    def run(self, runner):
+        return runner.wait(self.targets, self.timeout) is not None
+
+
+class ClickStep(WaitStep):
+    """等待模板出现后点击，或直接点击坐标 [x, y]"""
+    action = 'click'
+
+    def __init__(self, spec, path, default_timeout):
+        target = spec[self.action]
+        if isinstance(target, list) and len(target) == 2 and all(isinstance(v, (int, float)) for v in target):
+            Step.__init__(self, spec, path)
+            self.point = (int(target[0]), int(target[1]))
+            self.targets = []
+            self.timeout = 0
+        else:
+            super().__init__(spec, path, default_timeout)
+            self.point = None
+
+    def describe(self):
+        return f"click {self.point}" if self.point else super().describe()
+
+    def run(self, runner):
+        if self.point is not None:
+            runner.click_point(self.point)
+            return True
+        match = runner.wait(self.targets, self.timeout)
+        if match is None:
+            return False
+        runner.click(match)
+        return True
+
+
+class SleepStep(Step):
+    action = 'sleep'
+
+    def __init__(self, spec, path):
+        super().__init__(spec, path)
+        self.seconds = _number(spec[self.action], path, 'sleep')
+
+    def describe(self):
+        return f"sleep {self.seconds}s"
+
+    def run(self, runner):
+        runner.sleep(self.seconds)
+        return True
+
+
+class ReplayStep(Step):
+    """回放录制文件（.rec 或 JSON 坐标列表）"""
+    action = 'replay'
+
+    def __init__(self, spec, path, base_dir):
+        super().__init__(spec, path)
+        file_path = spec[self.action]
+        if not isinstance(file_path, str):
+            raise WorkflowError(f"{path}: replay 需要录制文件路径")
+        self.file = file_path if os.path.isabs(file_path) else os.path.join(base_dir, file_path)
+        self.loops = int(spec.get('loops', 1))
+        self.mode = spec.get('mode')
+        self.speed = spec.get('speed')
+
+    def describe(self):
+        return f"replay {os.path.basename(self.file)}"
+
+    def run(self, runner):
+        return runner.replay(self.file, self.loops, self.mode, self.speed)
+
+
+class BranchStep(Step):
+    """等待多个模板中任一出现，执行对应分支；都没有出现时执行 else"""
+    action = 'branch'
+
+    def __init__(self, spec, path, compiler):
+        super().__init__(spec, path)
+        cases = spec[self.action]
+        if not isinstance(cases, list) or not cases:
+            raise WorkflowError(f"{path}: branch 需要非空的分支列表")
+        self.cases = []
+        for i, case in enumerate(cases):
+            case_path = f"{path}.branch[{i}]"
+            if not isinstance(case, dict) or not isinstance(case.get('if'), str):
+                raise WorkflowError(f"{case_path}: 分支需要 if 字段（模板文件名）")
+            self.cases.append((case['if'], compiler.compile_steps(case.get('steps', []), case_path)))
+        self.otherwise = compiler.compile_steps(spec.get('else', []), f"{path}.else")
+        self.timeout = _number(spec.get('timeout', compiler.default_timeout), path, 'timeout')
+
+    def templates(self):
+        names = [name for name, _ in self.cases]
+        for _, steps in self.cases:
+            names.extend(_collect(steps))
+        return names + _collect(self.otherwise)
+
+    def describe(self):
+        return f"branch {', '.join(name for name, _ in self.cases)}"
+
+    def run(self, runner):
+        match = runner.wait([name for name, _ in self.cases], self.timeout)
+        if match is None:
+            return runner.run_steps(self.otherwise)
+        for name, steps in self.cases:
+            if name == match.name:
+                return runner.run_steps(steps)
+        return True
+
+
+class LoopUntilStep(Step):
+    """重复执行子步骤，直到模板出现；超过 max_loops 仍未出现时失败"""
+    action = 'loop_until'
+
+    def __init__(self, spec, path, compiler):
+        super().__init__(spec, path)
+        self.targets = _as_list(spec[self.action], path)
+        self.steps = compiler.compile_steps(spec.get('steps', []), f"{path}.steps")
+        self.max_loops = int(spec.get('max_loops', 100))
+        self.check_timeout = _number(spec.get('check_timeout', 1.0), path, 'check_timeout')
+
+    def templates(self):
+        return list(self.targets) + _collect(self.steps)
+
+    def describe(self):
+        return f"loop_until {', '.join(self.targets)}"
+
+    def run(self, runner):
+        for _ in range(self.max_loops):
+            if not runner.run_steps(self.steps):
+                return False
+            if runner.wait(self.targets, self.check_timeout) is not None:
+                return True
+        runner.logger.warning(f"{self.path}: 循环 {self.max_loops} 次后仍未出现 {', '.join(self.targets)}")
+        return False
+
+
+ACTIONS = ('wait', 'click', 'sleep', 'replay', 'branch', 'loop_until')
+
+
+class Workflow:
+    """编译后的工作流"""
+
+    def __init__(self, spec, base_dir='.'):
+        if not isinstance(spec, dict) or not isinstance(spec.get('steps'), list):
+            raise WorkflowError("工作流需要 steps 列表")
+        self.name = spec.get('name', 'workflow')
+        self.base_dir = base_dir
+        png_dir = spec.get('png_dir')
+        self.png_dir = None if png_dir is None else (
+            png_dir if os.path.isabs(png_dir) else os.path.join(base_dir, png_dir))
+        self.loops = int(spec.get('loops', 1))
+        self.default_timeout = _number(spec.get('timeout', 10), 'workflow', 'timeout')
+        self.steps = self.compile_steps(spec['steps'], 'steps')
+
+    @classmethod
+    def load(cls, path):
+        """从 JSON 或 YAML 文件加载并编译工作流"""
+        with open(path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        if path.lower().endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError:
+                raise WorkflowError("读取 YAML 工作流需要安装 PyYAML（pip install pyyaml）")
+            spec = yaml.safe_load(text)
+        else:
+            try:
+                spec = json.loads(text)
+            except ValueError as e:
+                raise WorkflowError(f"工作流文件格式错误: {e}")
+        return cls(spec, os.path.dirname(os.path.abspath(path)))
+
+    def compile_steps(self, specs, path):
+        if not isinstance(specs, list):
+            raise WorkflowError(f"{path}: 步骤必须是列表")
+        return [self._compile_step(spec, f"{path}[{i}]") for i, spec in enumerate(specs)]
+
+    def _compile_step(self, spec, path):
+        if not isinstance(spec, dict):
+            raise WorkflowError(f"{path}: 步骤必须是对象")
+        actions = [action for action in ACTIONS if action in spec]
+        if len(actions) != 1:
+            raise WorkflowError(f"{path}: 步骤必须且只能包含 {', '.join(ACTIONS)} 之一")
+        action = actions[0]
+        if action == 'wait':
+            return WaitStep(spec, path, self.default_timeout)
+        if action == 'click':
+            return ClickStep(spec, path, self.default_timeout)
+        if action == 'sleep':
+            return SleepStep(spec, path)
+        if action == 'replay':
+            return ReplayStep(spec, path, self.base_dir)
+        if action == 'branch':
+            return BranchStep(spec, path, self)
+        return LoopUntilStep(spec, path, self)
+
+    def templates(self):
+        """工作流用到的全部模板（去重，保持首次出现的顺序）"""
+        return list(dict.fromkeys(_collect(self.steps)))
+
+
+class WorkflowRunner:
+    """执行工作流：预先加载模板，所有等待共用 ImageClicker 的截图循环"""
+
+    def __init__(self, workflow, clicker, config, stop_event=None):
+        self.logger = logging.getLogger('workflow')
+        self.workflow = workflow
+        self.clicker = clicker
+        self.config = config
+        self.stop_event = stop_event
+        self._templates = {}
+        # 进度按顶层步骤发布
+        self.current_loop = 0
+        self.progress = ProgressChannel(config.get('progress_max_rate', 10.0), clicker.clock)
+        self._started = 0.0
+
+    def prefetch(self):
+        """加载工作流用到的全部模板，找不到时抛出 WorkflowError"""
+        for name in self.workflow.templates():
+            try:
+                self._templates[name] = self.clicker.resolve_template(name)
+            except FileNotFoundError as e:
+                raise WorkflowError(str(e))
+        self.logger.info(f"已预加载 {len(self._templates)} 个模板")
+
+    def run(self):
+        """执行全部循环，成功返回 True，失败或被停止返回 False"""
+        self.prefetch()
+        self.progress.reset()
+        self._started = self.clicker.clock.now()
+        for loop_idx in range(self.workflow.loops):
+            self.current_loop = loop_idx
+            self.logger.info(f"工作流 {self.workflow.name}: 第 {loop_idx + 1}/{self.workflow.loops} 次循环")
+            if not self.run_steps(self.workflow.steps, top_level=True):
+                return False
+        self._publish_progress(len(self.workflow.steps) - 1, done=True)
+        self.logger.info(f"工作流 {self.workflow.name} 完成")
+        return True
+
+    def run_steps(self, steps, top_level=False):
+        for idx, step in enumerate(steps):
+            if self.stopped:
+                return False
+            if top_level:
+                self._publish_progress(idx)
+            self.logger.info(f"{step.path}: {step.describe()}")
+            if step.run(self):
+                continue
+            if self.stopped:
+                return False
+            if step.optional:
+                self.logger.info(f"{step.path}: 可选步骤未完成，继续")
+                continue
+            self.logger.error(f"{step.path}: 步骤失败 ({step.describe()})")
+            return False
+        return True
+
+    def _publish_progress(self, step_idx, done=False):
+        report = ProgressReport(self.current_loop, self.workflow.loops, step_idx, len(self.workflow.steps),
+                                elapsed=self.clicker.clock.now() - self._started, done=done)
+        self.progress.publish(report, force=done)
+
+    @property
+    def stopped(self):
+        return self.stop_event is not None and self.stop_event.is_set()
+
+    def wait(self, names, timeout):
+        templates = [self._templates[name] for name in names]
+        return self.clicker.wait_for(templates, timeout, self.stop_event)
+
+    def click(self, match):
+        self.clicker.click_match(match)
+
+    def click_point(self, point):
+        self.clicker.dispatcher.click(point)
+        self.clicker.invalidate_frame()
+
+    def sleep(self, seconds):
+        self.clicker.clock.sleep(seconds, self.stop_event)
+
+    def replay(self, path, loops, mode=None, speed=None):
+        from .click_recorder import ClickRecorder
+        from .session import ConfigOverlay
+
+        # 不自动加载上一次的录制，文件由 load_file 加载
+        config = ConfigOverlay(self.config, {'recording_file': None})
+        recorder = ClickRecorder(config, dispatcher=self.clicker.dispatcher)
+        if not recorder.load_file(path):
+            return False
+        recorder.set_loop_times(loops)
+        if mode:
+            recorder.replay_mode = mode
+        if speed:
+            recorder.set_replay_speed(speed)
+        recorder.play_clicks(self.stop_event)
+        self.clicker.invalidate_frame()
+        return not self.stopped
+
+
+def _as_list(value, path):
+    values = [value] if isinstance(value, str) else value
+    if not isinstance(values, list) or not values or not all(isinstance(v, str) for v in values):
+        raise WorkflowError(f"{path}: 需要模板文件名或文件名列表")
+    return values
+
+
+def _number(value, path, field):
+    if not isinstance(value, (int, float)) or value < 0:
+        raise WorkflowError(f"{path}: {field} 必须是非负数")
+    return value
+
+
+def _collect(steps):
+    names = []
+    for step in steps:
+        names.extend(step.templates())
+    return names
@@ -26,6 +26,7 @@ class ConfigUI:
         self.similarity = tk.DoubleVar(value=self.config.get('threshold', 0.8))
         self.wait_time = tk.DoubleVar(value=self.config.get('wait_time', 5))
         self.immediate_click = tk.BooleanVar(value=self.config.get('immediate_click', False))
+        self.match_all = tk.BooleanVar(value=self.config.get('match_all', False))
         self.loop_times = tk.IntVar(value=self.config.get('loop_times', 1))
         self.png_dir = tk.StringVar(value=self.config.get('png_dir', 'png'))
         self.log_level = tk.StringVar(value=self.config.get('log_level', 'INFO'))
@@ -151,6 +152,12 @@ class ConfigUI:
         immediate_frame.pack(fill=tk.X, padx=10, pady=8)
         ttk.Label(immediate_frame, text="⚡ 立即点击:", style='Config.TLabel', width=20).pack(side=tk.LEFT)
         ttk.Checkbutton(immediate_frame, variable=self.immediate_click).pack(side=tk.RIGHT, padx=5)
+
+        # 点击全部匹配位置
+        match_all_frame = ttk.Frame(config_frame)
+        match_all_frame.pack(fill=tk.X, padx=10, pady=8)
+        ttk.Label(match_all_frame, text="🎯 点击全部匹配:", style='Config.TLabel', width=20).pack(side=tk.LEFT)
+        ttk.Checkbutton(match_all_frame, variable=self.match_all).pack(side=tk.RIGHT, padx=5)
         
         # 分隔线
         ttk.Separator(scrollable_frame, orient='horizontal').pack(fill=tk.X, padx=5, pady=15)
@@ -249,6 +256,7 @@ class ConfigUI:
             self.config['threshold'] = threshold
             self.config['wait_time'] = wait_time
             self.config['immediate_click'] = self.immediate_click.get()
+            self.config['match_all'] = self.match_all.get()
             self.config['loop_times'] = loop_times
             self.config['png_dir'] = self.png_dir.get().strip()
             self.config['log_level'] = self.log_level.get()
@@ -284,6 +292,7 @@ class ConfigUI:
             self.clicker.set_threshold(threshold)
             self.clicker.set_wait_time(wait_time)
             self.clicker.set_immediate_click(self.immediate_click.get())
+            self.clicker.set_match_all(self.match_all.get())
             self.clicker.set_loop_times(loop_times)
             
             self.logger.info(f"配置已保存: {self.config}")
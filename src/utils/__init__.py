@@ -1,6 +1,10 @@
 """
 工具函数模块
 """
-from .logger import setup_global_logging
+from .logger import setup_global_logging, get_log_listener, shutdown_logging
+from .metrics import MetricsRegistry, Counter, Gauge, Histogram
 
-__all__ = ['setup_global_logging']
+__all__ = [
+    'setup_global_logging', 'get_log_listener', 'shutdown_logging',
+    'MetricsRegistry', 'Counter', 'Gauge', 'Histogram'
+]
@@ -1,10 +1,55 @@
+import atexit
 import logging
+import queue
 import sys
 import os
-from logging.handlers import RotatingFileHandler
+import threading
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+# 日志队列默认最多缓存的记录数
+DEFAULT_QUEUE_SIZE = 10000
+
+# 当前生效的队列监听器和根日志器上的队列处理器
+_listener = None
+_queue_handler = None
+
+
+class DroppingQueueHandler(QueueHandler):
+    """有界队列的 QueueHandler：队列满时丢弃新日志并计数，不阻塞写日志的线程
+
+    队列再次有空位时先补记一条警告，说明丢弃了多少条日志。
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+
+    def enqueue(self, record):
+        with self._dropped_lock:
+            dropped, self.dropped = self.dropped, 0
+        try:
+            if dropped:
+                self.queue.put_nowait(logging.makeLogRecord({
+                    'name': 'logging', 'levelno': logging.WARNING, 'levelname': 'WARNING',
+                    'msg': f"日志队列已满，丢弃了 {dropped} 条日志",
+                }))
+                dropped = 0
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += dropped + 1
+
 
 def setup_global_logging(config):
-    """设置全局日志配置"""
+    """设置全局日志配置
+
+    根日志器只挂一个 QueueHandler，文件和控制台输出由后台 QueueListener 线程完成，
+    匹配线程写日志时不会阻塞在磁盘或控制台 I/O 上。可重复调用以应用新的配置。
+    队列最多缓存 log_queue_size 条记录，写入速度持续超过磁盘时丢弃新日志，内存占用有上限。
+    """
+    global _listener, _queue_handler
     log_file = config.get('log_file', 'app.log')
     log_level = getattr(logging, config.get('log_level', 'INFO').upper())
     # 日志大小限制：默认 1MB，单位字节
@@ -17,6 +62,9 @@ def setup_global_logging(config):
     if log_dir and not os.path.exists(log_dir):
         os.makedirs(log_dir, exist_ok=True)
     
+    # 重新配置时先停止旧的监听器，确保旧队列中的日志已写出并关闭文件
+    shutdown_logging()
+
     # 使用 RotatingFileHandler 实现日志轮转
     rotating_handler = RotatingFileHandler(
         log_file,
@@ -24,18 +72,40 @@ def setup_global_logging(config):
         backupCount=backup_count,
         encoding='utf-8'
     )
-    rotating_handler.setFormatter(
-        logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    )
-    
-    logging.basicConfig(
-        level=log_level,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            rotating_handler,
-            logging.StreamHandler()
-        ]
-    )
+    formatter = logging.Formatter(LOG_FORMAT)
+    rotating_handler.setFormatter(formatter)
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(formatter)
+
+    root = logging.getLogger()
+    root.setLevel(log_level)
+    log_queue = queue.Queue(max(1, int(config.get('log_queue_size', DEFAULT_QUEUE_SIZE))))
+    _queue_handler = DroppingQueueHandler(log_queue)
+    root.addHandler(_queue_handler)
+    _listener = QueueListener(log_queue, rotating_handler, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+
+def get_log_listener():
+    """返回当前的队列监听器，未初始化时返回 None"""
+    return _listener
+
+
+def shutdown_logging():
+    """停止后台日志线程，写出队列中剩余的日志"""
+    global _listener, _queue_handler
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
+
 
 def get_log_path():
     """获取日志文件路径，支持 PyInstaller 打包后的情况"""
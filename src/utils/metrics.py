@@ -0,0 +1,211 @@
+"""
+进程内指标：计数器、仪表和直方图，可导出为 JSON 或 Prometheus 文本格式
+"""
+import json
+import math
+import threading
+
+# 耗时直方图的默认分桶上界（秒）
+DEFAULT_TIME_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# 次数类直方图的分桶上界
+COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+
+
+class Counter:
+    """只增不减的计数器"""
+    kind = 'counter'
+
+    def __init__(self):
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self):
+        with self._lock:
+            return self._value
+
+    def snapshot(self):
+        return {'value': self.value}
+
+
+class Gauge:
+    """可任意设置的当前值"""
+    kind = 'gauge'
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def set(self, value):
+        with self._lock:
+            self._value = value
+
+    @property
+    def value(self):
+        with self._lock:
+            return self._value
+
+    def snapshot(self):
+        return {'value': self.value}
+
+
+class Histogram:
+    """固定分桶直方图，分位数按桶内线性插值估计"""
+    kind = 'histogram'
+
+    def __init__(self, buckets=DEFAULT_TIME_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._count = 0
+        self._sum = 0.0
+        self._min = math.inf
+        self._max = -math.inf
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            self._counts[index] += 1
+            self._count += 1
+            self._sum += value
+            self._min = min(self._min, value)
+            self._max = max(self._max, value)
+
+    @property
+    def count(self):
+        with self._lock:
+            return self._count
+
+    @property
+    def sum(self):
+        with self._lock:
+            return self._sum
+
+    @property
+    def max(self):
+        with self._lock:
+            return self._max if self._count else 0.0
+
+    def quantile(self, q):
+        """估计分位数，没有样本时返回 0"""
+        with self._lock:
+            if self._count == 0:
+                return 0.0
+            target = q * self._count
+            cumulative = 0
+            for i, count in enumerate(self._counts):
+                if count and cumulative + count >= target:
+                    lower = max(self.buckets[i - 1], self._min) if i > 0 else self._min
+                    upper = min(self.buckets[i], self._max) if i < len(self.buckets) else self._max
+                    return lower + (upper - lower) * (target - cumulative) / count
+                cumulative += count
+            return self._max
+
+    def snapshot(self):
+        with self._lock:
+            counts = list(self._counts)
+            count, total = self._count, self._sum
+            low, high = self._min, self._max
+        return {
+            'count': count,
+            'sum': total,
+            'min': low if count else 0.0,
+            'max': high if count else 0.0,
+            'p50': self.quantile(0.5),
+            'p99': self.quantile(0.99),
+            'buckets': dict(zip([str(b) for b in self.buckets] + ['+Inf'], counts)),
+        }
+
+
+class MetricsRegistry:
+    """按名称和标签管理指标"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def _get(self, factory, name, help_text, labels, **kwargs):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            metric = self._metrics.get(key)
+            if metric is None:
+                metric = factory(**kwargs)
+                self._metrics[key] = metric
+            elif not isinstance(metric, factory):
+                raise TypeError(f"指标 {name} 已注册为 {metric.kind}")
+            if help_text:
+                self._help.setdefault(name, help_text)
+            return metric
+
+    def counter(self, name, help_text='', **labels):
+        return self._get(Counter, name, help_text, labels)
+
+    def gauge(self, name, help_text='', **labels):
+        return self._get(Gauge, name, help_text, labels)
+
+    def histogram(self, name, help_text='', buckets=DEFAULT_TIME_BUCKETS, **labels):
+        return self._get(Histogram, name, help_text, labels, buckets=buckets)
+
+    def find(self, name):
+        """返回同名的全部指标 [(标签字典, 指标)]"""
+        with self._lock:
+            return [(dict(labels), metric) for (n, labels), metric in self._metrics.items() if n == name]
+
+    def reset(self):
+        with self._lock:
+            self._metrics.clear()
+
+    def snapshot(self):
+        """返回全部指标的快照 {名称: [{'labels', 'type', ...}]}"""
+        with self._lock:
+            items = sorted(self._metrics.items(), key=lambda item: item[0])
+        result = {}
+        for (name, labels), metric in items:
+            entry = {'type': metric.kind, 'labels': dict(labels)}
+            entry.update(metric.snapshot())
+            result.setdefault(name, []).append(entry)
+        return result
+
+    def to_json(self, indent=2):
+        return json.dumps(self.snapshot(), indent=indent, ensure_ascii=False)
+
+    def to_prometheus(self):
+        """导出为 Prometheus 文本格式"""
+        lines = []
+        for name, entries in self.snapshot().items():
+            if name in self._help:
+                lines.append(f"# HELP {name} {self._help[name]}")
+            lines.append(f"# TYPE {name} {entries[0]['type']}")
+            for entry in entries:
+                labels = entry['labels']
+                if entry['type'] == 'histogram':
+                    cumulative = 0
+                    for bound, count in entry['buckets'].items():
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_format_labels(labels, le=bound)} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {entry['sum']}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {entry['count']}")
+                else:
+                    lines.append(f"{name}{_format_labels(labels)} {entry['value']}")
+        return '\n'.join(lines) + '\n'
+
+
+def _format_labels(labels, **extra):
+    merged = dict(labels)
+    merged.update(extra)
+    if not merged:
+        return ''
+    parts = []
+    for key, value in merged.items():
+        escaped = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{key}="{escaped}"')
+    return '{' + ','.join(parts) + '}'
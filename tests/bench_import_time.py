@@ -0,0 +1,60 @@
+"""
+导入耗时基准：比较懒加载的 `import src` 与加载全部核心模块（改造前 `import src` 的行为）的冷启动耗时
+
+用法：python tests/bench_import_time.py [重复次数]
+每种场景都在新的解释器进程中测量，输出中位数和最小值（毫秒）。
+"""
+import os
+import sys
+import json
+import statistics
+import subprocess
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+SCENARIOS = [
+    ('import src（懒加载）', 'import src'),
+    ('仅点击记录', 'import src; src.ClickRecorder'),
+    ('加载全部核心模块', 'import src.core.image_clicker, src.core.click_recorder'),
+]
+
+# 在子进程中执行的测量代码，输出导入耗时（秒）和是否加载了重量级依赖
+PROBE = '''
+import sys, time, json
+start = time.perf_counter()
+exec({code!r})
+elapsed = time.perf_counter() - start
+heavy = sorted(m for m in ('cv2', 'numpy', 'pyautogui', 'pynput', 'tkinter') if m in sys.modules)
+print(json.dumps({{'elapsed': elapsed, 'heavy': heavy}}))
+'''
+
+
+def measure(code, repeat):
+    timings = []
+    heavy = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, '-c', PROBE.format(code=code)],
+            cwd=PROJECT_ROOT, capture_output=True, text=True
+        )
+        if output.returncode != 0:
+            return None, output.stderr.strip().splitlines()[-1]
+        result = json.loads(output.stdout.strip().splitlines()[-1])
+        timings.append(result['elapsed'] * 1000)
+        heavy = result['heavy']
+    return timings, heavy
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f"{'场景':<24}{'中位数(ms)':>12}{'最小值(ms)':>12}  已加载的重量级依赖")
+    for name, code in SCENARIOS:
+        timings, heavy = measure(code, repeat)
+        if timings is None:
+            print(f"{name:<24}{'失败':>12}{'':>12}  {heavy}")
+            continue
+        print(f"{name:<24}{statistics.median(timings):>12.1f}{min(timings):>12.1f}  {', '.join(heavy) or '无'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+"""
+模板匹配基准：在合成截图上放置已知位置的模板，比较各匹配引擎和配置的吞吐、延迟和准确率
+
+用法：python tests/bench_matching.py [--resolutions 1080p,1440p,4k] [--configs direct,pyramid] [--repeat 10] [--screen-scale 1.25]
+截图来自内存中的 ArrayScreenSource，不需要显示器，可在无图形界面的 Linux 上运行。
+任一组合的准确率低于 --min-accuracy 时以退出码 1 结束，便于在发布前发现热路径的退化。
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import tempfile
+
+import cv2
+import numpy as np
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+from src.core.image_clicker import ImageClicker
+from src.core.screen_source import ArrayScreenSource
+
+RESOLUTIONS = {
+    '720p': (1280, 720),
+    '1080p': (1920, 1080),
+    '1440p': (2560, 1440),
+    '4k': (3840, 2160),
+}
+
+# 参与比较的配置，值为覆盖到基础配置上的配置项
+CONFIGS = {
+    'direct': {'match_engine': 'direct'},
+    'pyramid': {'match_engine': 'pyramid'},
+    'pyramid-l3': {'match_engine': 'pyramid', 'pyramid_levels': 3},
+    'fft': {'match_engine': 'fft'},
+    'multiscale': {'match_engine': 'pyramid', 'match_scales': [1.0, 1.25, 1.5]},
+}
+
+BASE_CONFIG = {
+    'threshold': 0.8,
+    'change_detection': False,
+    'roi_auto_learn': False,
+    'template_cache_dir': '',
+}
+
+# 放置在截图中的模板尺寸 (宽, 高)，另有一个不放置的模板用于检查误报
+TEMPLATE_SIZES = [(48, 48), (96, 40), (120, 64), (64, 80)]
+# 匹配位置与放置位置的最大允许偏差（像素）
+POSITION_TOLERANCE = 2
+
+
+def make_screen(width, height, rng):
+    """生成带纹理和色块的灰度合成截图"""
+    noise = (rng.random((height // 4, width // 4)) * 255).astype(np.uint8)
+    screen = cv2.resize(noise, (width, height), interpolation=cv2.INTER_CUBIC)
+    for _ in range(max(20, width * height // 40000)):
+        x, y = int(rng.integers(0, width)), int(rng.integers(0, height))
+        w, h = int(rng.integers(20, 200)), int(rng.integers(10, 80))
+        cv2.rectangle(screen, (x, y), (x + w, y + h), int(rng.integers(0, 256)), -1)
+    return screen
+
+
+def make_template(size, label, rng):
+    """生成带文字和图形的模板图片"""
+    width, height = size
+    patch = cv2.GaussianBlur((rng.random((height, width)) * 255).astype(np.uint8), (5, 5), 0)
+    cv2.circle(patch, (width // 4, height // 2), min(width, height) // 4, int(rng.integers(0, 256)), 2)
+    cv2.putText(patch, label, (width // 3, height * 2 // 3), cv2.FONT_HERSHEY_SIMPLEX,
+                min(width, height) / 60, 255, 2)
+    return patch
+
+
+def build_scene(resolution, seed=0, screen_scale=1.0):
+    """生成截图和模板，返回 (截图, {文件名: 模板}, {文件名: 放置位置或 None})
+
+    screen_scale 模拟显示缩放：放进截图的是按该比例放大后的模板，返回的仍是原始模板。
+    """
+    width, height = RESOLUTIONS[resolution]
+    rng = np.random.default_rng(seed)
+    screen = make_screen(width, height, rng)
+    templates = {}
+    positions = {}
+    # 按网格划分截图，每个模板放在不同格子里避免重叠
+    cols = len(TEMPLATE_SIZES)
+    cell_w = width // cols
+    for i, size in enumerate(TEMPLATE_SIZES):
+        name = f"{i}.png"
+        template = make_template(size, str(i), rng)
+        planted = template
+        if screen_scale != 1.0:
+            scaled_size = (int(round(size[0] * screen_scale)), int(round(size[1] * screen_scale)))
+            planted = cv2.resize(template, scaled_size, interpolation=cv2.INTER_LINEAR)
+        ph, pw = planted.shape
+        x = i * cell_w + int(rng.integers(0, cell_w - pw))
+        y = int(rng.integers(0, height - ph))
+        screen[y:y + ph, x:x + pw] = planted
+        templates[name] = template
+        positions[name] = (x, y)
+    templates['absent.png'] = make_template((72, 56), 'X', rng)
+    positions['absent.png'] = None
+    return screen, templates, positions
+
+
+def is_correct(max_val, max_loc, expected, threshold):
+    if expected is None:
+        return max_val < threshold
+    return (max_val >= threshold
+            and abs(max_loc[0] - expected[0]) <= POSITION_TOLERANCE
+            and abs(max_loc[1] - expected[1]) <= POSITION_TOLERANCE)
+
+
+def run_case(resolution, overrides, repeat, seed=0, screen_scale=1.0):
+    """在一个分辨率和配置下反复匹配全部模板，返回吞吐、延迟和准确率"""
+    screen, templates, positions = build_scene(resolution, seed, screen_scale)
+    with tempfile.TemporaryDirectory() as png_dir:
+        for name, template in templates.items():
+            cv2.imwrite(os.path.join(png_dir, name), template)
+        config = dict(BASE_CONFIG, png_dir=png_dir, **overrides)
+        clicker = ImageClicker(config, screen_source=ArrayScreenSource(screen))
+
+    # 预热一轮，构建帧金字塔等缓存
+    for filename, template in clicker.templates:
+        clicker._match_template_on_screen(template, filename)
+
+    timings = []
+    correct = 0
+    started = time.perf_counter()
+    for _ in range(repeat):
+        clicker.invalidate_frame()
+        for filename, template in clicker.templates:
+            start = time.perf_counter()
+            max_val, max_loc = clicker._match_template_on_screen(template, filename)
+            timings.append(time.perf_counter() - start)
+            if is_correct(max_val, max_loc, positions[filename], clicker.threshold):
+                correct += 1
+    total = time.perf_counter() - started
+    timings_ms = np.array(timings) * 1000
+    return {
+        'matches': len(timings),
+        'throughput': len(timings) / total if total > 0 else 0.0,
+        'p50_ms': float(np.percentile(timings_ms, 50)),
+        'p99_ms': float(np.percentile(timings_ms, 99)),
+        'accuracy': correct / len(timings),
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='模板匹配基准')
+    parser.add_argument('--resolutions', default='1080p,1440p,4k', help=f"逗号分隔，可选 {','.join(RESOLUTIONS)}")
+    parser.add_argument('--configs', default=','.join(CONFIGS), help=f"逗号分隔，可选 {','.join(CONFIGS)}")
+    parser.add_argument('--repeat', type=int, default=10, help='每个组合匹配全部模板的轮数')
+    parser.add_argument('--seed', type=int, default=0, help='合成截图的随机种子')
+    parser.add_argument('--screen-scale', type=float, default=1.0, help='模拟显示缩放，例如 1.25 表示 125%%')
+    parser.add_argument('--min-accuracy', type=float, default=1.0, help='低于该准确率时以退出码 1 结束')
+    parser.add_argument('--json', help='把结果写入 JSON 文件')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+    resolutions = [r.strip() for r in args.resolutions.split(',') if r.strip()]
+    configs = [c.strip() for c in args.configs.split(',') if c.strip()]
+    for name in resolutions:
+        if name not in RESOLUTIONS:
+            sys.exit(f"未知的分辨率: {name}")
+    for name in configs:
+        if name not in CONFIGS:
+            sys.exit(f"未知的配置: {name}")
+
+    results = []
+    print(f"{'分辨率':<8}{'配置':<12}{'吞吐(次/秒)':>12}{'p50(ms)':>10}{'p99(ms)':>10}{'准确率':>8}")
+    for resolution in resolutions:
+        for config_name in configs:
+            result = run_case(resolution, CONFIGS[config_name], args.repeat, args.seed, args.screen_scale)
+            result.update(resolution=resolution, config=config_name)
+            results.append(result)
+            print(f"{resolution:<8}{config_name:<12}{result['throughput']:>12.1f}"
+                  f"{result['p50_ms']:>10.2f}{result['p99_ms']:>10.2f}{result['accuracy'] * 100:>7.0f}%")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+    failed = [r for r in results if r['accuracy'] < args.min_accuracy]
+    for r in failed:
+        print(f"准确率不足: {r['resolution']} {r['config']} {r['accuracy'] * 100:.0f}%")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
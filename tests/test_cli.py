@@ -0,0 +1,73 @@
+import os
+import sys
+import json
+import signal
+
+import cv2
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from bench_matching import make_screen, make_template
+from src import cli
+from src.utils.logger import shutdown_logging
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    """临时的模板目录、截图文件和配置文件；结束时恢复信号处理并停止日志线程"""
+    rng = np.random.default_rng(16)
+    os.makedirs(tmp_path / 'png')
+    cv2.imwrite(str(tmp_path / 'png' / 'a.png'), make_template((60, 40), 'A', rng))
+    cv2.imwrite(str(tmp_path / 'screen.png'), make_screen(320, 240, rng))
+    config = {'png_dir': str(tmp_path / 'png'), 'screen_source': 'file',
+              'screen_source_path': str(tmp_path / 'screen.png'), 'template_cache_dir': '',
+              'log_file': str(tmp_path / 'app.log'), 'wait_time': 0.1, 'loop_times': 1,
+              'immediate_click': True}
+    handlers = {sig: signal.getsignal(sig) for sig in (signal.SIGINT, signal.SIGTERM)}
+    yield tmp_path, config
+    for sig, handler in handlers.items():
+        signal.signal(sig, handler)
+    shutdown_logging()
+
+
+def write_config(tmp_path, config):
+    path = tmp_path / 'config.json'
+    path.write_text(json.dumps(config), encoding='utf-8')
+    return str(path)
+
+
+def test_parse_run_images_overrides():
+    args = cli.build_parser().parse_args(['--config', 'missing.json', 'run-images', '--png-dir', 'pics',
+                                          '--loops', '3', '--threshold', '0.9'])
+    assert args.command == 'run-images' and args.loops == 3
+    config = cli.load_config(args)
+    assert config.get('loop_times') == 3 and config.get('threshold') == 0.9
+    assert config.get('png_dir') == os.path.join(cli.PROJECT_ROOT, 'pics')
+    with pytest.raises(SystemExit) as exc:
+        cli.build_parser().parse_args([])
+    assert exc.value.code == 2
+
+
+def test_run_images_with_file_screen_source(workspace):
+    tmp_path, config = workspace
+    metrics = tmp_path / 'metrics.json'
+    assert cli.main(['--config', write_config(tmp_path, config), 'run-images',
+                     '--metrics-out', str(metrics)]) == cli.EXIT_OK
+    # 截图来自文件后端，每个模板都做过匹配
+    assert 'clicker_match_seconds' in metrics.read_text(encoding='utf-8')
+
+
+def test_run_images_exit_codes(workspace):
+    tmp_path, config = workspace
+    empty = tmp_path / 'empty'
+    os.makedirs(empty)
+    assert cli.main(['--config', write_config(tmp_path, config), 'run-images',
+                     '--png-dir', str(empty)]) == cli.EXIT_FAILED
+
+    missing_screen = dict(config, screen_source_path=str(tmp_path / 'missing.png'))
+    assert cli.main(['--config', write_config(tmp_path, missing_screen), 'run-images']) == cli.EXIT_FAILED
+
+    broken = tmp_path / 'broken.json'
+    broken.write_text('{"png_dir": ', encoding='utf-8')
+    assert cli.main(['--config', str(broken), 'run-images']) == cli.EXIT_FAILED
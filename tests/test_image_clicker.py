@@ -0,0 +1,193 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from bench_matching import make_screen, make_template
+from src.core.image_clicker import ImageClicker
+from src.core.input_dispatcher import InputDispatcher
+from src.core.scheduler import FakeClock
+from src.core.screen_source import ScreenSource
+
+
+class FakeButton:
+    left = 'left'
+
+
+class FakeController:
+    def __init__(self):
+        self.position = (0, 0)
+        self.clicks = []
+
+    def click(self, button, count):
+        self.clicks.append(self.position)
+
+
+class TimedScreenSource(ScreenSource):
+    """按假时钟切换画面：frames 为 [(开始时间, 帧)]"""
+    name = 'timed'
+
+    def __init__(self, clock, frames):
+        super().__init__()
+        self.clock = clock
+        self.frames = frames
+
+    def _capture(self):
+        return [frame for start, frame in self.frames if start <= self.clock.now()][-1]
+
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_parallel_pass_gives_each_template_its_own_wait_time(tmp_path, workers):
+    rng = np.random.default_rng(11)
+    blank = make_screen(640, 360, rng)
+    missing, button = make_template((60, 40), 'A', rng), make_template((60, 40), 'B', rng)
+    cv2.imwrite(str(tmp_path / 'a.png'), missing)
+    cv2.imwrite(str(tmp_path / 'b.png'), button)
+    shown = blank.copy()
+    shown[100:140, 300:360] = button
+
+    clock = FakeClock()
+    controller = FakeController()
+    config = {'png_dir': str(tmp_path), 'template_cache_dir': '', 'wait_time': 5, 'loop_times': 1,
+              'match_workers': workers, 'immediate_click': True, 'frame_max_age': 0}
+    clicker = ImageClicker(config, screen_source=TimedScreenSource(clock, [(0, blank), (6, shown)]),
+                           clock=clock, dispatcher=InputDispatcher(controller, FakeButton))
+    assert clicker.start()
+    # a.png 在 t=5 超时后，b.png 重新获得完整的 wait_time，在 t=6 出现时被点击
+    assert controller.clicks == [(330, 120)]
+    assert 6 <= clock.now() < 10
+
+
+def test_change_detection_skips_unchanged_frames(tmp_path):
+    from src.core.screen_source import ArrayScreenSource
+
+    rng = np.random.default_rng(12)
+    screen = make_screen(640, 360, rng)
+    button = make_template((60, 40), 'B', rng)
+    cv2.imwrite(str(tmp_path / 'b.png'), button)
+    changed = screen.copy()
+    changed[200:240, 400:460] = button
+    source = ArrayScreenSource([screen, screen.copy(), changed], loop=False)
+    config = {'png_dir': str(tmp_path), 'template_cache_dir': '', 'frame_max_age': 0}
+    clicker = ImageClicker(config, screen_source=source)
+    name, image = clicker.templates[0]
+
+    first = clicker._match_template_on_screen(image, name)
+    assert first[0] < 0.8
+    # 内容相同的新帧直接返回上次的结果
+    assert clicker._match_template_on_screen(image, name) == first
+    assert clicker.get_change_stats() == {'skipped': 1, 'performed': 1}
+    # 一个分块变化后重新匹配
+    score, location = clicker._match_template_on_screen(image, name)
+    assert score > 0.99 and location == (400, 200)
+    assert clicker.get_change_stats() == {'skipped': 1, 'performed': 2}
+    # 跳过的匹配不计入匹配耗时
+    assert clicker.get_match_time_stats()[name]['count'] == 2
+
+
+def make_roi_folder(tmp_path, rng):
+    screen = make_screen(640, 360, rng)
+    button = make_template((60, 40), 'R', rng)
+    screen[250:290, 500:560] = button
+    cv2.imwrite(str(tmp_path / 'b.png'), button)
+    return screen
+
+
+def test_manifest_region_limits_search(tmp_path):
+    import json
+    from src.core.screen_source import ArrayScreenSource
+
+    screen = make_roi_folder(tmp_path, np.random.default_rng(13))
+    config = {'png_dir': str(tmp_path), 'template_cache_dir': '', 'change_detection': False}
+    # 声明的区域不包含按钮：只在区域内搜索，不回退全屏
+    (tmp_path / 'regions.json').write_text(json.dumps({'b.png': [0, 0, 300, 200]}))
+    clicker = ImageClicker(config, screen_source=ArrayScreenSource(screen))
+    name, image = clicker.templates[0]
+    assert clicker._match_template_on_screen(image, name)[0] < 0.8
+
+    (tmp_path / 'regions.json').write_text(json.dumps({'b.png': [450, 200, 150, 120]}))
+    clicker.load_templates()
+    score, location = clicker._match_template_on_screen(image, name)
+    assert score > 0.99 and location == (500, 250)
+
+
+def test_learned_region_falls_back_and_persists(tmp_path):
+    from src.core.screen_source import ArrayScreenSource
+
+    screen = make_roi_folder(tmp_path, np.random.default_rng(14))
+    config = {'png_dir': str(tmp_path), 'template_cache_dir': '', 'change_detection': False,
+              'roi_auto_learn': True, 'roi_margin': 10, 'loop_times': 1, 'wait_time': 1,
+              'immediate_click': True}
+    controller = FakeController()
+    clicker = ImageClicker(config, screen_source=ArrayScreenSource(screen),
+                           dispatcher=InputDispatcher(controller, FakeButton))
+    name, image = clicker.templates[0]
+    # 学习到的区域未命中时回退到全屏搜索，命中后区域扩展到新的位置
+    clicker.regions.learned[name] = (0, 0, 100, 100)
+    score, location = clicker._match_template_on_screen(image, name)
+    assert score > 0.99 and location == (500, 250)
+    assert clicker.regions.learned[name] == (0, 0, 570, 300)
+
+    clicker.regions.forget()
+    assert clicker.start() and controller.clicks == [(530, 270)]
+    assert (tmp_path / 'regions.learned.json').exists()
+    restored = ImageClicker(config, screen_source=ArrayScreenSource(screen))
+    assert restored.regions.get_region(name) == (490, 240, 80, 60)
+    assert restored.regions.is_learned(name)
+
+
+def test_frame_is_shared_within_max_age(tmp_path):
+    from src.core.screen_source import ArrayScreenSource
+
+    clock = FakeClock()
+    source = ArrayScreenSource(make_screen(320, 240, np.random.default_rng(17)))
+    clicker = ImageClicker({'png_dir': str(tmp_path), 'template_cache_dir': '', 'frame_max_age': 0.1},
+                           screen_source=source, clock=clock)
+    frame = clicker.get_frame()
+    clock.advance(0.05)
+    assert clicker.get_frame() is frame and source.capture_count == 1
+    clock.advance(0.1)
+    clicker.get_frame()
+    assert source.capture_count == 2
+    # 点击后丢弃共享帧，下次立即重新截图
+    clicker.invalidate_frame()
+    clicker.get_frame()
+    assert source.capture_count == 3
+
+
+def test_clicker_records_match_capture_and_hit_metrics(tmp_path):
+    from src.core.screen_source import ArrayScreenSource
+
+    rng = np.random.default_rng(13)
+    screen = make_screen(640, 360, rng)
+    present, absent = make_template((60, 40), 'P', rng), make_template((60, 40), 'Q', rng)
+    screen[100:140, 200:260] = present
+    cv2.imwrite(str(tmp_path / 'a.png'), present)
+    cv2.imwrite(str(tmp_path / 'b.png'), absent)
+
+    clock = FakeClock()
+    config = {'png_dir': str(tmp_path), 'template_cache_dir': '', 'wait_time': 0.5, 'loop_times': 1,
+              'frame_max_age': 0, 'max_fps': 0}
+    clicker = ImageClicker(config, screen_source=ArrayScreenSource(screen), clock=clock,
+                           dispatcher=InputDispatcher(FakeController(), FakeButton))
+    assert clicker.start()
+
+    metrics = clicker.metrics
+    hits = {labels['template']: c.value for labels, c in metrics.find('clicker_template_hits_total')}
+    misses = {labels['template']: c.value for labels, c in metrics.find('clicker_template_misses_total')}
+    assert hits == {'a.png': 1} and misses == {'b.png': 1}
+    assert clicker.get_metrics_summary()['hit_rate'] == pytest.approx(0.5)
+
+    # 画面不变时跳过的匹配只计入 skipped，不计入匹配耗时
+    stats = clicker.get_match_time_stats()
+    skipped = sum(c.value for _, c in metrics.find('clicker_match_skipped_total'))
+    assert stats['a.png']['count'] == 1 and stats['b.png']['count'] == 1
+    assert skipped >= 1
+    polls = {labels['template']: h for labels, h in metrics.find('clicker_polls_per_template')}
+    assert polls['b.png'].sum == skipped + 1
+
+    capture = {labels['backend']: h for labels, h in metrics.find('clicker_capture_seconds')}
+    assert capture[clicker.screen_source.name].count >= 2
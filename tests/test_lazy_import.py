@@ -0,0 +1,40 @@
+import os
+import sys
+import json
+import subprocess
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from bench_import_time import PROJECT_ROOT
+
+HEAVY = ('cv2', 'numpy', 'pyautogui', 'pynput', 'tkinter')
+
+
+def loaded_heavy_modules(code):
+    """在新的解释器中执行 code，返回其中已加载的重量级依赖"""
+    probe = f"import sys, json\n{code}\nprint(json.dumps([m for m in {HEAVY!r} if m in sys.modules]))"
+    result = subprocess.run([sys.executable, '-c', probe], cwd=PROJECT_ROOT,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+@pytest.mark.parametrize('code', ['import src', 'import src.core', 'import src; src.ConfigManager'])
+def test_import_does_not_load_heavy_dependencies(code):
+    assert loaded_heavy_modules(code) == []
+
+
+def test_attributes_resolve_on_first_access():
+    # 访问 ImageClicker 才导入图像识别模块
+    assert 'cv2' in loaded_heavy_modules('import src.core; src.core.ImageClicker')
+
+
+def test_unknown_attribute_raises():
+    import src
+    import src.core
+
+    with pytest.raises(AttributeError):
+        src.NoSuchThing
+    with pytest.raises(AttributeError):
+        src.core.NoSuchThing
+    assert 'ImageClicker' in dir(src)
@@ -0,0 +1,92 @@
+import cv2
+import numpy as np
+import pytest
+
+from bench_matching import CONFIGS, run_case, make_screen, make_template
+from src.core.matchers import DirectMatcher, PyramidMatcher, FFTMatcher, order_matches
+
+
+@pytest.mark.parametrize('config_name', sorted(CONFIGS))
+def test_engines_find_planted_templates(config_name):
+    result = run_case('720p', CONFIGS[config_name], repeat=2)
+    assert result['accuracy'] == 1.0
+
+
+def test_multiscale_matches_scaled_display():
+    result = run_case('720p', CONFIGS['multiscale'], repeat=2, screen_scale=1.25)
+    assert result['accuracy'] == 1.0
+
+
+@pytest.mark.parametrize('matcher', [DirectMatcher(), PyramidMatcher(), FFTMatcher(min_template_area=0)],
+                         ids=['direct', 'pyramid', 'fft'])
+def test_match_all_returns_every_occurrence_in_reading_order(matcher):
+    rng = np.random.default_rng(1)
+    screen = make_screen(1280, 720, rng)
+    template = make_template((64, 40), 'OK', rng)
+    positions = [(x, y) for y in (100, 300, 500) for x in (200, 700)]
+    for x, y in positions:
+        screen[y:y + 40, x:x + 64] = template
+    matches = matcher.match_all(screen, template, threshold=0.8)
+    ordered = order_matches(matches, 'reading', (64, 40))
+    assert [loc for _, loc in ordered] == positions
+
+
+def test_fft_scores_match_opencv():
+    rng = np.random.default_rng(2)
+    screen = make_screen(1280, 720, rng)
+    matcher = FFTMatcher(min_template_area=0)
+    for size in ((24, 24), (120, 80)):
+        template = make_template(size, 'OK', rng)
+        expected = cv2.matchTemplate(screen, template, cv2.TM_CCOEFF_NORMED)
+        assert np.abs(matcher._result(screen, template) - expected).max() < 1e-3
+    # 常量模板交给直接匹配
+    flat = np.full((20, 20), 128, np.uint8)
+    expected = cv2.matchTemplate(screen, flat, cv2.TM_CCOEFF_NORMED)
+    assert np.array_equal(matcher._result(screen, flat), expected)
+
+
+def test_fft_calibrates_once_per_screen_size_across_threads(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    rng = np.random.default_rng(3)
+    screen = make_screen(1280, 720, rng)
+    templates = [make_template((40 + 8 * i, 30), 'OK', rng) for i in range(8)]
+    calibration_file = str(tmp_path / 'fft_calibration.json')
+    matcher = FFTMatcher(calibration_file=calibration_file)
+    calls = []
+    calibrate = matcher.calibrate
+    matcher.calibrate = lambda shape: calls.append(shape) or calibrate(shape)
+
+    def run(template):
+        matcher.prepare(screen.shape)
+        return matcher.match(screen, template)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(run, templates * 4))
+    assert calls == [(720, 1280)]
+    for template, (max_val, _) in zip(templates * 4, results):
+        expected = cv2.minMaxLoc(cv2.matchTemplate(screen, template, cv2.TM_CCOEFF_NORMED))[1]
+        assert abs(max_val - expected) < 1e-3
+
+    # 之后的匹配引擎（例如匹配进程）直接读取校准文件
+    restored = FFTMatcher(calibration_file=calibration_file)
+    restored.calibrate = lambda shape: pytest.fail('不应重新校准')
+    restored.prepare(screen.shape)
+    assert restored._crossovers == matcher._crossovers
+
+
+def test_pyramid_skips_exhaustive_fallback_for_absent_template():
+    rng = np.random.default_rng(4)
+    screen = make_screen(1280, 720, rng)
+    absent = make_template((64, 40), 'NO', rng)
+    matcher = PyramidMatcher()
+    shapes = []
+    result = matcher._result
+    matcher._result = lambda s, t: shapes.append(s.shape) or result(s, t)
+
+    max_val, _ = matcher.match(screen, absent, threshold=0.8)
+    assert max_val < 0.8
+    assert screen.shape not in shapes
+    # 不给阈值时仍按得分差回退穷举
+    matcher.match(screen, absent)
+    assert screen.shape in shapes
@@ -0,0 +1,26 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.utils.metrics import MetricsRegistry
+
+
+def test_histogram_snapshot_and_prometheus_export():
+    registry = MetricsRegistry()
+    histogram = registry.histogram('op_seconds', '操作耗时', op='a')
+    for value in (0.001, 0.002, 0.02):
+        histogram.observe(value)
+    registry.counter('op_total', op='a').inc(3)
+
+    entry = registry.snapshot()['op_seconds'][0]
+    assert entry['count'] == 3 and entry['max'] == pytest.approx(0.02)
+    assert entry['labels'] == {'op': 'a'}
+    text = registry.to_prometheus()
+    assert '# HELP op_seconds 操作耗时' in text
+    assert 'op_seconds_count{op="a"} 3' in text
+    assert 'op_total{op="a"} 3' in text
+    with pytest.raises(TypeError):
+        registry.gauge('op_total', op='a')
+
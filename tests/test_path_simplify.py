@@ -0,0 +1,39 @@
+import os
+import sys
+import math
+import random
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.core.recording import EventBuffer, EVENT_MOVE, EVENT_PRESS, BUTTON_LEFT
+from src.core.path_simplify import MoveCoalescer, simplify_moves, point_segment_distance
+
+TOLERANCE = 1.0
+
+
+def distance_to_path(x, y, path):
+    if len(path) == 1:
+        return math.hypot(x - path[0][0], y - path[0][1])
+    return min(point_segment_distance(x, y, *path[i], *path[i + 1]) for i in range(len(path) - 1))
+
+
+def test_coalesced_and_simplified_path_stays_within_tolerance():
+    rng = random.Random(0)
+    # 1 kHz 采样的曲线拖动路径
+    raw = [(i * 0.001, round(300 + 200 * math.cos(i / 150) + rng.uniform(-0.3, 0.3)),
+            round(300 + 120 * math.sin(i / 90))) for i in range(2000)]
+
+    coalescer = MoveCoalescer(min_interval=0.01, min_distance=2.0, tolerance=TOLERANCE / 2)
+    events = EventBuffer()
+    for t, x, y in raw:
+        for point in coalescer.feed(t, x, y):
+            events.append(point[0], EVENT_MOVE, point[1], point[2])
+    for point in coalescer.flush():
+        events.append(point[0], EVENT_MOVE, point[1], point[2])
+    events.append(2.0, EVENT_PRESS, raw[-1][1], raw[-1][2], BUTTON_LEFT)
+
+    simplified = simplify_moves(events, TOLERANCE / 2)
+    path = [(e.x, e.y) for e in simplified if e.kind == EVENT_MOVE]
+    assert len(path) < len(raw) // 3
+    assert path[0] == raw[0][1:] and path[-1] == raw[-1][1:]
+    assert max(distance_to_path(x, y, path) for _, x, y in raw) <= TOLERANCE + 1e-9
+    assert simplified.clicks() == [raw[-1][1:]]
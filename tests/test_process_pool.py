@@ -0,0 +1,42 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from bench_matching import make_screen, make_template
+from src.core.image_clicker import ImageClicker
+from src.core.screen_source import ArrayScreenSource
+
+
+def test_process_backend_matches_like_in_process(tmp_path):
+    rng = np.random.default_rng(11)
+    screen = make_screen(800, 450, rng)
+    positions = {'a.png': (50, 60), 'b.png': (400, 300), 'c.png': None, 'd.png': (600, 80)}
+    for i, (name, position) in enumerate(positions.items()):
+        template = make_template((64, 40), str(i), rng)
+        if position is not None:
+            x, y = position
+            screen[y:y + 40, x:x + 64] = template
+        cv2.imwrite(str(tmp_path / name), template)
+
+    config = {'png_dir': str(tmp_path), 'template_cache_dir': '', 'match_backend': 'process',
+              'match_workers': 3, 'match_scales': [1.0, 0.8]}
+    clicker = ImageClicker(config, screen_source=ArrayScreenSource(screen))
+    frame = clicker.get_frame()
+    pool = clicker._create_match_pool()
+    try:
+        results = clicker._match_in_processes(pool, clicker.templates, frame)
+        # 第二次画面未变化，直接复用上次的结果
+        again = clicker._match_in_processes(pool, clicker.templates, frame)
+    finally:
+        pool.shutdown()
+
+    local = ImageClicker(dict(config, match_backend='thread'), screen_source=ArrayScreenSource(screen))
+    expected = [local._match_template_on_screen(template, name, frame) for name, template in local.templates]
+    assert [loc for _, loc in results] == [loc for _, loc in expected]
+    assert np.allclose([val for val, _ in results], [val for val, _ in expected], atol=1e-5)
+    assert again == results
+    assert [loc for (val, loc) in results if val >= 0.8] == [p for p in positions.values() if p]
+    assert clicker.get_change_stats()['skipped'] == len(positions)
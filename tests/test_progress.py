@@ -0,0 +1,51 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.core.progress import ProgressChannel, ProgressReport
+from src.core.scheduler import FakeClock
+
+
+def report(index, done=False):
+    return ProgressReport(0, 1, index, 10, matched=index, elapsed=index * 0.01, done=done)
+
+
+def test_updates_within_window_are_coalesced():
+    clock = FakeClock()
+    channel = ProgressChannel(max_rate=10.0, clock=clock)
+    received = []
+    channel.set_callback(received.append)
+
+    assert channel.publish(report(0))
+    for i in range(1, 5):
+        clock.advance(0.02)
+        assert not channel.publish(report(i))
+    # 窗口内只回调了第一份，但最新进度一直可查
+    assert [r.template_index for r in received] == [0]
+    assert channel.latest().template_index == 4
+
+    clock.advance(0.03)
+    assert channel.publish(report(5))
+    assert [r.template_index for r in received] == [0, 5]
+
+
+def test_force_emits_inside_window():
+    clock = FakeClock()
+    channel = ProgressChannel(max_rate=10.0, clock=clock)
+    received = []
+    channel.set_callback(received.append)
+
+    channel.publish(report(0))
+    clock.advance(0.01)
+    assert channel.publish(report(9, done=True), force=True)
+    assert received[-1].done and received[-1].percent == pytest.approx(100.0)
+
+
+def test_reset_clears_window():
+    clock = FakeClock()
+    channel = ProgressChannel(max_rate=10.0, clock=clock)
+    channel.publish(report(0))
+    channel.reset()
+    assert channel.latest() is None
+    assert channel.publish(report(1))
@@ -0,0 +1,44 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.core.recording import EventBuffer, EVENT_MOVE, EVENT_PRESS, EVENT_RELEASE, BUTTON_LEFT
+
+
+def test_save_and_mmap_load_round_trip(tmp_path):
+    buffer = EventBuffer()
+    buffer.append(0.0, EVENT_MOVE, 10, 20)
+    buffer.append(0.5, EVENT_PRESS, 10, 20, BUTTON_LEFT)
+    buffer.append(0.6, EVENT_RELEASE, 10, 20, BUTTON_LEFT)
+    path = str(tmp_path / 'macro.rec')
+    buffer.save(path)
+
+    for use_mmap in (True, False):
+        loaded = EventBuffer.load(path, use_mmap=use_mmap)
+        assert list(loaded) == list(buffer)
+        assert loaded.clicks() == [(10, 20)]
+
+    # 内存映射加载的缓冲区在追加时复制到内存，仍可保存回原文件
+    loaded = EventBuffer.load(path)
+    loaded.append(1.0, EVENT_PRESS, 30, 40, BUTTON_LEFT)
+    loaded.save(path)
+    assert EventBuffer.load(path).clicks() == [(10, 20), (30, 40)]
+
+
+def test_truncated_and_empty_files_raise_value_error(tmp_path):
+    import pytest
+
+    buffer = EventBuffer()
+    buffer.append(0.0, EVENT_PRESS, 10, 20, BUTTON_LEFT)
+    buffer.append(0.1, EVENT_RELEASE, 10, 20, BUTTON_LEFT)
+    path = tmp_path / 'macro.rec'
+    buffer.save(str(path))
+    data = path.read_bytes()
+
+    for name, content in (('empty.rec', b''), ('header.rec', data[:10]),
+                          ('truncated.rec', data[:-3]), ('trailing.rec', data + b'\0' * 8)):
+        broken = tmp_path / name
+        broken.write_bytes(content)
+        for use_mmap in (True, False):
+            with pytest.raises(ValueError):
+                EventBuffer.load(str(broken), use_mmap=use_mmap)
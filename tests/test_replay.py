@@ -0,0 +1,71 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.core.recording import EventBuffer, EVENT_MOVE, EVENT_PRESS, EVENT_RELEASE, BUTTON_LEFT
+from src.core.replay import ReplayEngine
+from src.core.scheduler import FakeClock
+
+
+class RecordingDispatcher:
+    def __init__(self, clock):
+        self.clock = clock
+        self.sent = []
+
+    def click(self, event):
+        self.sent.append((self.clock.now(), 'click', event.x, event.y))
+
+    def dispatch(self, event):
+        self.sent.append((self.clock.now(), event.kind, event.x, event.y))
+
+
+def make_events():
+    events = EventBuffer()
+    events.append(1.0, EVENT_MOVE, 0, 0)
+    events.append(1.2, EVENT_PRESS, 5, 5, BUTTON_LEFT)
+    events.append(1.3, EVENT_RELEASE, 5, 5, BUTTON_LEFT)
+    events.append(2.0, EVENT_PRESS, 9, 9, BUTTON_LEFT)
+    return events
+
+
+def test_recorded_mode_follows_recorded_delays_at_speed():
+    clock = FakeClock()
+    dispatcher = RecordingDispatcher(clock)
+    engine = ReplayEngine(dispatcher, clock, mode='recorded', interval=0.1, speed=2.0, spin=0)
+    assert engine.run(make_events(), loops=2)
+    times = [t for t, *_ in dispatcher.sent]
+    # 每轮时长 (2.0 - 1.0) / 2 + 0.1 / 2，最后仍按下的按键在结束时释放
+    assert times == pytest.approx([0.0, 0.1, 0.15, 0.5, 0.55, 0.65, 0.7, 1.05, 1.05])
+    assert dispatcher.sent[-1][1:] == (EVENT_RELEASE, 9, 9)
+    assert engine.stats.summary()['max_ms'] == pytest.approx(0.0)
+
+
+def test_fixed_mode_clicks_presses_at_fixed_interval():
+    clock = FakeClock()
+    dispatcher = RecordingDispatcher(clock)
+    engine = ReplayEngine(dispatcher, clock, mode='fixed', interval=0.25, spin=0)
+    assert engine.run(make_events(), loops=1)
+    assert dispatcher.sent == [(0.0, 'click', 5, 5), (pytest.approx(0.25), 'click', 9, 9)]
+
+
+def test_stop_interrupts_waiting():
+    clock = FakeClock()
+    dispatcher = RecordingDispatcher(clock)
+    engine = ReplayEngine(dispatcher, clock, mode='fixed', interval=10.0, spin=0)
+    assert not engine.run(make_events(), loops=1, should_stop=lambda: len(dispatcher.sent) >= 1)
+    assert len(dispatcher.sent) == 1
+
+
+def test_stop_releases_held_buttons():
+    clock = FakeClock()
+    dispatcher = RecordingDispatcher(clock)
+    events = EventBuffer()
+    events.append(0.0, EVENT_PRESS, 5, 5, BUTTON_LEFT)
+    events.append(0.5, EVENT_MOVE, 50, 50)
+    events.append(1.0, EVENT_RELEASE, 50, 50, BUTTON_LEFT)
+    engine = ReplayEngine(dispatcher, clock, mode='recorded', spin=0)
+    # 拖动途中停止
+    assert not engine.run(events, should_stop=lambda: len(dispatcher.sent) >= 2)
+    assert [sent[1:] for sent in dispatcher.sent] == [(EVENT_PRESS, 5, 5), (EVENT_MOVE, 50, 50),
+                                                      (EVENT_RELEASE, 50, 50)]
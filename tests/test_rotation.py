@@ -1,99 +1,58 @@
 import os
 import sys
-import time
-import json
 import logging
-# Ensure project root is in sys.path so `src` package is importable
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from src.utils.logger import setup_global_logging
-
-# Load config
-cfg_path = os.path.join('src', 'config', 'config.json')
-with open(cfg_path, 'r', encoding='utf-8') as f:
-    cfg = json.load(f)
-
-log_file = cfg.get('log_file')
-log_dir = os.path.dirname(log_file)
-
-# Ensure log directory exists
-os.makedirs(log_dir, exist_ok=True)
-
-# Clean up existing log files for a clean test
-for fname in os.listdir(log_dir):
-    if fname.startswith(os.path.basename(log_file)):
-        try:
-            os.remove(os.path.join(log_dir, fname))
-        except Exception as e:
-            print('Warning: could not remove', fname, e)
-
-# Setup logging according to config
-setup_global_logging(cfg)
-logger = logging.getLogger('rotation_test')
-
-# Print handler details
-rot_handler = None
-for h in logging.root.handlers:
-    if isinstance(h, logging.handlers.RotatingFileHandler):
-        rot_handler = h
-        break
+from logging.handlers import RotatingFileHandler
 
-print('Rotating Handler:', bool(rot_handler))
-if rot_handler:
-    print('baseFilename:', getattr(rot_handler, 'baseFilename', None))
-    print('maxBytes:', getattr(rot_handler, 'maxBytes', None))
-    print('backupCount:', getattr(rot_handler, 'backupCount', None))
+import pytest
 
-# Generate logs until rotation detected (or until target backup index appears)
-msg = 'X' * 2000  # ~2KB per message
-i = 0
-# target backup index to detect (e.g., 3 means we expect app.log.3 to appear)
-target_backup = 3
-rotation_reached = False
-while i < 500000:
-    logger.info(f"{i} {msg}")
-    i += 1
-    if i % 50 == 0:
-        files = sorted(os.listdir(log_dir))
-        # determine highest numeric backup index present
-        backups = [f for f in files if f.startswith(os.path.basename(log_file) + '.')]
-        max_index = 0
-        for b in backups:
-            try:
-                idx = int(b.split('.')[-1])
-                if idx > max_index:
-                    max_index = idx
-            except Exception:
-                continue
-        sizes = {f: os.path.getsize(os.path.join(log_dir, f)) for f in files}
-        print('iter', i, 'files', files, 'max_backup_index', max_index, 'sizes', sizes)
-        if max_index >= target_backup:
-            rotation_reached = True
-            print(f'Rotation reached target (>= {target_backup}) at iter', i)
-            break
-
-if not rotation_reached:
-    print('Rotation target not reached after', i, 'messages')
-
-# Final listing
-files = sorted(os.listdir(log_dir))
-sizes = {f: os.path.getsize(os.path.join(log_dir, f)) for f in files}
-print('Final files:', files)
-print('Final sizes:', sizes)
-
-# Verify backup count
-expected_backup = cfg.get('backup_count')
-actual_backups = len([f for f in files if f != os.path.basename(log_file)])
-print('expected_backup:', expected_backup, 'actual_backup_files:', actual_backups)
-
-# Show sample of log lines from base and backup if present
-print('\n--- tail of base log ---')
-with open(os.path.join(log_dir, os.path.basename(log_file)), 'rb') as f:
-    f.seek(max(0, os.path.getsize(os.path.join(log_dir, os.path.basename(log_file))) - 1000))
-    print(f.read().decode('utf-8', errors='ignore'))
-
-for f in files:
-    if f.endswith('.1'):
-        print('\n--- head of backup', f, '---')
-        with open(os.path.join(log_dir, f), 'rb') as bf:
-            print(bf.read(500).decode('utf-8', errors='ignore'))
-        break
+# Ensure project root is in sys.path so `src` package is importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.utils.logger import setup_global_logging, get_log_listener, shutdown_logging, DroppingQueueHandler
+
+
+@pytest.fixture
+def log_config(tmp_path):
+    """日志写到临时目录，测试结束时停止后台日志线程"""
+    config = {'log_file': str(tmp_path / 'logs' / 'app.log'), 'log_level': 'INFO',
+              'max_log_size': 20 * 1024, 'backup_count': 3}
+    yield config
+    shutdown_logging()
+
+
+def test_rotation_keeps_backup_count(log_config):
+    setup_global_logging(log_config)
+    listener = get_log_listener()
+    handlers = [h for h in listener.handlers if isinstance(h, RotatingFileHandler)]
+    assert len(handlers) == 1 and handlers[0].maxBytes == 20 * 1024
+
+    logger = logging.getLogger('rotation_test')
+    msg = 'X' * 2000
+    for i in range(200):
+        logger.info(f"{i} {msg}")
+    # 日志由后台线程写出，先停止监听器把队列写完再检查文件
+    shutdown_logging()
+
+    log_dir = os.path.dirname(log_config['log_file'])
+    files = sorted(os.listdir(log_dir))
+    assert files == ['app.log', 'app.log.1', 'app.log.2', 'app.log.3']
+    for name in files:
+        assert os.path.getsize(os.path.join(log_dir, name)) <= 20 * 1024
+    with open(log_config['log_file'], encoding='utf-8') as f:
+        assert f.read().rstrip().endswith(f"199 {msg}")
+
+
+def test_full_queue_drops_records_and_reports_count():
+    import queue
+
+    log_queue = queue.Queue(2)
+    handler = DroppingQueueHandler(log_queue)
+    logger = logging.getLogger('drop_test')
+    for i in range(5):
+        handler.handle(logger.makeRecord('drop_test', logging.INFO, __file__, 0, f"m{i}", None, None))
+    assert handler.dropped == 3
+    log_queue.get_nowait()
+    log_queue.get_nowait()
+    handler.handle(logger.makeRecord('drop_test', logging.INFO, __file__, 0, 'm5', None, None))
+    assert log_queue.get_nowait().getMessage() == '日志队列已满，丢弃了 3 条日志'
+    assert log_queue.get_nowait().getMessage() == 'm5'
+    assert handler.dropped == 0
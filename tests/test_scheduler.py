@@ -0,0 +1,61 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.core.scheduler import FakeClock, PollScheduler
+
+
+def test_backoff_grows_until_max_interval():
+    clock = FakeClock()
+    scheduler = PollScheduler(clock, min_interval=0.02, max_interval=0.1, backoff=2.0)
+    delays = []
+    for _ in range(5):
+        scheduler.record('a.png', found=False, changed=False)
+        delays.append(scheduler.wait('a.png'))
+    assert delays == pytest.approx([0.04, 0.08, 0.1, 0.1, 0.1])
+    assert clock.now() == pytest.approx(sum(delays))
+
+
+def test_screen_change_restores_fast_polling():
+    scheduler = PollScheduler(FakeClock(), min_interval=0.02, max_interval=0.5, backoff=2.0)
+    for _ in range(4):
+        scheduler.record('a.png', found=False, changed=False)
+    assert scheduler.interval('a.png') == pytest.approx(0.32)
+    scheduler.record('a.png', found=False, changed=True)
+    assert scheduler.interval('a.png') == 0.02
+
+
+def test_fps_budget_is_shared_across_templates():
+    clock = FakeClock()
+    scheduler = PollScheduler(clock, min_interval=0.01, max_interval=0.5, max_fps=10)
+    scheduler.note_capture()
+    assert scheduler.next_delay('a.png') == pytest.approx(0.1)
+    clock.advance(0.05)
+    assert scheduler.next_delay('b.png') == pytest.approx(0.05)
+
+
+def test_wait_never_passes_deadline():
+    clock = FakeClock(start=10.0)
+    scheduler = PollScheduler(clock, min_interval=0.2, max_interval=0.5)
+    assert scheduler.wait('a.png', deadline=10.05) == pytest.approx(0.05)
+    assert clock.now() == pytest.approx(10.05)
+
+
+def test_clicker_backs_off_while_template_is_absent(tmp_path):
+    import cv2
+    import numpy as np
+    from bench_matching import make_screen, make_template
+    from src.core.image_clicker import ImageClicker
+    from src.core.screen_source import ArrayScreenSource
+
+    rng = np.random.default_rng(18)
+    cv2.imwrite(str(tmp_path / 'a.png'), make_template((40, 30), 'A', rng))
+    clock = FakeClock()
+    config = {'png_dir': str(tmp_path), 'template_cache_dir': '', 'wait_time': 1.0, 'loop_times': 1,
+              'poll_min_interval': 0.05, 'poll_max_interval': 0.2, 'poll_backoff': 2.0, 'max_fps': 0}
+    clicker = ImageClicker(config, screen_source=ArrayScreenSource(make_screen(320, 240, rng)), clock=clock)
+    assert clicker.start()
+    # 第一次匹配后画面视为变化，之后画面不变，间隔翻倍到上限，最后一次等待截止到 wait_time
+    assert clock.sleeps == pytest.approx([0.05, 0.1, 0.2, 0.2, 0.2, 0.2, 0.05])
+    assert clock.now() == pytest.approx(1.0)
@@ -0,0 +1,44 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.core.screen_source import ArrayScreenSource, FileScreenSource, create_screen_source
+
+
+def test_file_source_replays_directory_in_name_order(tmp_path):
+    frames = [np.full((20, 30, 3), value, np.uint8) for value in (10, 20, 30)]
+    for i, frame in enumerate(frames):
+        cv2.imwrite(str(tmp_path / f"{i}.png"), frame)
+    (tmp_path / 'notes.txt').write_text('ignored')
+
+    source = create_screen_source({'screen_source': 'file', 'screen_source_path': str(tmp_path)})
+    assert isinstance(source, FileScreenSource) and source.name == 'file'
+    grabbed = [source.grab() for _ in range(4)]
+    # 灰度帧按文件名顺序循环
+    assert [int(frame[0, 0]) for frame in grabbed] == [10, 20, 30, 10]
+    assert all(frame.ndim == 2 for frame in grabbed)
+    assert source.capture_count == 4 and source.average_latency >= 0
+
+    once = FileScreenSource(str(tmp_path), loop=False)
+    assert [int(once.grab()[0, 0]) for _ in range(4)] == [10, 20, 30, 30]
+
+
+def test_file_source_errors(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        FileScreenSource(str(tmp_path / 'missing'))
+    with pytest.raises(FileNotFoundError):
+        FileScreenSource(str(tmp_path))
+
+
+def test_array_source_converts_color_frames():
+    color = np.zeros((10, 10, 3), np.uint8)
+    color[..., 2] = 255
+    source = ArrayScreenSource([color, np.full((10, 10), 7, np.uint8)], loop=False)
+    assert int(source.grab()[0, 0]) == int(cv2.cvtColor(color, cv2.COLOR_BGR2GRAY)[0, 0])
+    assert [int(source.grab()[0, 0]) for _ in range(2)] == [7, 7]
+    with pytest.raises(ValueError):
+        ArrayScreenSource([])
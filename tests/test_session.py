@@ -0,0 +1,89 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from bench_matching import make_screen, make_template
+from src.core.input_dispatcher import InputDispatcher
+from src.core.screen_source import ArrayScreenSource
+from src.core.session import SessionManager
+
+
+class FakeButton:
+    left = 'left'
+
+
+class FakeController:
+    def __init__(self):
+        self.position = (0, 0)
+        self.clicks = []
+
+    def click(self, button, count):
+        self.clicks.append(self.position)
+
+
+def test_sessions_share_capture_and_stop_independently(tmp_path):
+    rng = np.random.default_rng(5)
+    screen = make_screen(640, 360, rng)
+    button = make_template((60, 40), 'B', rng)
+    screen[100:140, 200:260] = button
+    for folder, image in (('found', button), ('missing', make_template((60, 40), 'M', rng))):
+        os.makedirs(tmp_path / folder)
+        cv2.imwrite(str(tmp_path / folder / 'target.png'), image)
+
+    source = ArrayScreenSource(screen)
+    controller = FakeController()
+    config = {'template_cache_dir': '', 'change_detection': False, 'click_interval': 0.01,
+              'loop_interval': 0.01, 'poll_min_interval': 0.001, 'max_fps': 0, 'frame_max_age': 0.05}
+    manager = SessionManager(config, screen_source=source,
+                             dispatcher=InputDispatcher(controller, FakeButton))
+    shared = manager.screen_source(config)
+    try:
+        found = manager.start_images('found', {'png_dir': str(tmp_path / 'found'), 'loop_times': 3})
+        missing = manager.start_images('missing', {'png_dir': str(tmp_path / 'missing'), 'wait_time': 30})
+        assert found.join(timeout=10)
+        assert missing.running
+        missing.stop()
+        assert missing.join(timeout=5)
+    finally:
+        manager.close()
+
+    assert found.status == 'done' and found.current_loop == 3
+    assert found.progress.latest().done
+    assert missing.status == 'stopped'
+    assert controller.clicks == [(230, 120)] * 3
+    # 两个任务的截图请求合并后，实际截图次数少于请求次数
+    assert shared.shared_hits > 0 and source.capture_count < shared.capture_count
+
+
+def test_replay_holds_input_from_press_to_release():
+    import threading
+    from src.core.recording import MouseEvent, EVENT_MOVE, EVENT_PRESS, EVENT_RELEASE, BUTTON_LEFT
+    from src.core.replay import MouseDispatcher
+
+    class DragController(FakeController):
+        def press(self, button):
+            self.clicks.append(('press', self.position))
+
+        def release(self, button):
+            self.clicks.append(('release', self.position))
+
+    class Buttons(FakeButton):
+        right = 'right'
+        middle = 'middle'
+
+    controller = DragController()
+    dispatcher = InputDispatcher(controller, Buttons)
+    replay = MouseDispatcher(controller, Buttons, lock=dispatcher.lock)
+    replay.dispatch(MouseEvent(0.0, EVENT_PRESS, BUTTON_LEFT, 10, 10, 0, 0))
+    # 另一个任务的点击要等到拖动结束
+    other = threading.Thread(target=dispatcher.click, args=((99, 99),))
+    other.start()
+    other.join(timeout=0.2)
+    assert other.is_alive()
+    replay.dispatch(MouseEvent(0.1, EVENT_MOVE, BUTTON_LEFT, 50, 50, 0, 0))
+    replay.dispatch(MouseEvent(0.2, EVENT_RELEASE, BUTTON_LEFT, 50, 50, 0, 0))
+    other.join(timeout=2)
+    assert controller.clicks == [('press', (10, 10)), ('release', (50, 50)), (99, 99)]
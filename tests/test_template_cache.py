@@ -0,0 +1,36 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from bench_matching import make_template
+from src.core.template_cache import TemplateCache
+
+
+def test_second_instance_loads_from_disk_and_prunes_deleted(tmp_path):
+    rng = np.random.default_rng(15)
+    folder, cache_dir = tmp_path / 'png', str(tmp_path / 'cache')
+    os.makedirs(folder)
+    images = {name: make_template((60, 40), name, rng) for name in ('a', 'b')}
+    for name, image in images.items():
+        cv2.imwrite(str(folder / f"{name}.png"), image)
+
+    first = TemplateCache(cache_dir, pyramid_levels=2)
+    assert [name for name, _ in first.load_folder(str(folder))] == ['a.png', 'b.png']
+
+    # 新实例直接从磁盘缓存加载（内存映射），不重新解码
+    second = TemplateCache(cache_dir, pyramid_levels=2)
+    second._decode = lambda path, signature: (_ for _ in ()).throw(AssertionError(f"重新解码: {path}"))
+    entries = dict(second.load_folder(str(folder)))
+    assert isinstance(entries['a.png'].image, np.memmap)
+    assert np.array_equal(entries['b.png'].image, images['b'])
+    assert len(entries['a.png'].pyramid) == 3
+
+    os.remove(folder / 'b.png')
+    assert [name for name, _ in second.load_folder(str(folder))] == ['a.png']
+    index = TemplateCache(cache_dir)._index
+    assert list(index) == [str(folder / 'a.png')]
+    assert sorted(f for f in os.listdir(cache_dir) if f != TemplateCache.INDEX_NAME) == \
+        sorted(f"{index[str(folder / 'a.png')]['key']}{ext}" for ext in ('.npy', '.npz'))
@@ -0,0 +1,71 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from bench_matching import make_screen, make_template
+from src.core.image_clicker import ImageClicker
+from src.core.screen_source import ArrayScreenSource
+from src.core.template_store import TemplateStore, ALIGNMENT
+
+
+def test_store_packs_templates_and_variants_contiguously():
+    rng = np.random.default_rng(4)
+    templates = [(f"t{i}.png", make_template((40 + i, 30), str(i), rng)) for i in range(3)]
+    store = TemplateStore(templates, pyramid_levels=2, edges=True)
+
+    assert [name for name, _ in store] == ['t0.png', 't1.png', 't2.png']
+    assert store[1][0] == 't1.png' and [name for name, _ in store[1:]] == ['t1.png', 't2.png']
+    for name, image in templates:
+        stored = store.get(name)
+        assert np.array_equal(stored, image) and not stored.flags.writeable
+        assert stored.ctypes.data % ALIGNMENT == 0
+        half = cv2.pyrDown(image)
+        levels = store.pyramid(name)
+        assert len(levels) == 3 and np.array_equal(levels[1], half) and np.array_equal(levels[2], cv2.pyrDown(half))
+        assert np.array_equal(store.variant(name, 'edges'), cv2.Canny(image, 50, 150))
+
+    stats = store.stats()
+    assert stats['templates'] == 3 and stats['variants'] == 9
+    assert stats['arena_bytes'] >= sum(image.size for _, image in templates)
+    assert stats['resident_bytes'] > stats['arena_bytes']
+
+
+def test_clicker_matches_from_store(tmp_path):
+    rng = np.random.default_rng(8)
+    screen = make_screen(640, 360, rng)
+    template = make_template((60, 40), 'S', rng)
+    screen[200:240, 300:360] = template
+    cv2.imwrite(str(tmp_path / 'button.png'), template)
+
+    config = {'png_dir': str(tmp_path), 'template_cache_dir': '', 'match_engine': 'pyramid'}
+    clicker = ImageClicker(config, screen_source=ArrayScreenSource(screen))
+    assert isinstance(clicker.templates, TemplateStore) and len(clicker.templates.pyramid('button.png')) == 3
+    name, image = clicker.templates[0]
+    assert clicker.template_cache.load(str(tmp_path / name)).image is image
+    score, location = clicker._match_template_on_screen(image, name)
+    assert score > 0.99 and location == (300, 200)
+
+
+def test_clickers_sharing_a_cache_share_one_store(tmp_path):
+    from src.core.template_cache import TemplateCache
+
+    rng = np.random.default_rng(9)
+    cv2.imwrite(str(tmp_path / 'a.png'), make_template((60, 40), 'A', rng))
+    cv2.imwrite(str(tmp_path / 'b.png'), make_template((50, 30), 'B', rng))
+    cache = TemplateCache()
+    config = {'png_dir': str(tmp_path), 'template_cache_dir': ''}
+    source = ArrayScreenSource(make_screen(320, 240, rng))
+    first = ImageClicker(config, screen_source=source, template_cache=cache)
+    second = ImageClicker(config, screen_source=source, template_cache=cache)
+    assert first.templates is second.templates
+    # 没有变化的重新加载不复制模板
+    assert first.load_templates() is first.templates
+
+    changed = make_template((60, 40), 'C', rng)
+    cv2.imwrite(str(tmp_path / 'b.png'), changed)
+    os.utime(tmp_path / 'b.png', ns=(1, 1))
+    reloaded = first.load_templates()
+    assert reloaded is not first.templates and np.array_equal(reloaded.get('b.png'), changed)
@@ -0,0 +1,68 @@
+import os
+import sys
+import asyncio
+import threading
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from bench_matching import make_screen, make_template
+from src.core.image_clicker import ImageClicker
+from src.core.screen_source import ArrayScreenSource
+
+
+def make_clicker(tmp_path):
+    rng = np.random.default_rng(2)
+    blank = make_screen(640, 360, rng)
+    dialog = make_template((80, 40), 'OK', rng)
+    shown = blank.copy()
+    shown[200:240, 300:380] = dialog
+    # 前几帧没有对话框，之后一直显示
+    source = ArrayScreenSource([blank] * 3 + [shown], loop=False)
+    config = {'png_dir': str(tmp_path), 'template_cache_dir': '', 'frame_max_age': 0,
+              'poll_min_interval': 0.001, 'max_fps': 0}
+    clicker = ImageClicker(config, screen_source=source)
+    return clicker, ('dialog', dialog)
+
+
+def test_wait_for_returns_match_from_shared_loop(tmp_path):
+    clicker, dialog = make_clicker(tmp_path)
+    seen = []
+    clicker.watch([dialog], seen.append)
+    match = clicker.wait_for(dialog, timeout=5)
+    assert match is not None and match.location == (300, 200) and match.center == (340, 220)
+    clicker.stop()
+    # 持续可见的模板只回调一次
+    assert len(seen) == 1
+
+
+def test_wait_for_async_and_timeout(tmp_path):
+    clicker, dialog = make_clicker(tmp_path)
+    missing = ('missing', make_template((30, 30), 'X', np.random.default_rng(9)))
+
+    async def wait_both():
+        return await asyncio.gather(
+            clicker.wait_for_async(dialog, timeout=5),
+            clicker.wait_for_async(missing, timeout=0.2),
+        )
+
+    match, none = asyncio.run(wait_both())
+    assert match.name == 'dialog'
+    assert none is None
+    stop = threading.Event()
+    stop.set()
+    assert clicker.wait_for(missing, timeout=5, stop_event=stop) is None
+    clicker.stop()
+
+
+def test_stop_resolves_pending_wait_for_async(tmp_path):
+    clicker, _ = make_clicker(tmp_path)
+    missing = ('missing', make_template((30, 30), 'X', np.random.default_rng(9)))
+
+    async def wait_then_stop():
+        waiting = asyncio.ensure_future(clicker.wait_for_async(missing))
+        await asyncio.sleep(0.1)
+        clicker.stop()
+        return await asyncio.wait_for(waiting, 2)
+
+    assert asyncio.run(wait_then_stop()) is None
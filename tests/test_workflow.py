@@ -0,0 +1,58 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from bench_matching import make_screen, make_template
+from src.core.image_clicker import ImageClicker
+from src.core.screen_source import ArrayScreenSource
+from src.core.workflow import Workflow, WorkflowRunner, WorkflowError
+
+
+class FakeRunnerClicks(WorkflowRunner):
+    """记录点击而不移动鼠标"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.clicked = []
+
+    def click(self, match):
+        self.clicked.append(match.name)
+
+
+def test_compile_rejects_unknown_step():
+    with pytest.raises(WorkflowError):
+        Workflow({'steps': [{'tap': 'a.png'}]})
+
+
+def test_branch_and_loop_until_run_on_shared_capture_loop(tmp_path):
+    rng = np.random.default_rng(3)
+    screen = make_screen(640, 360, rng)
+    for name, (x, y) in {'next.png': (40, 40), 'done.png': (400, 200)}.items():
+        template = make_template((60, 40), name[0], rng)
+        screen[y:y + 40, x:x + 60] = template
+        cv2.imwrite(str(tmp_path / name), template)
+    cv2.imwrite(str(tmp_path / 'error.png'), make_template((60, 40), 'E', rng))
+
+    workflow = Workflow({
+        'timeout': 2,
+        'steps': [
+            {'branch': [{'if': 'error.png', 'steps': []},
+                        {'if': 'next.png', 'steps': [{'click': 'next.png'}]}]},
+            {'loop_until': 'done.png', 'steps': [{'click': 'next.png'}], 'max_loops': 3},
+            {'wait': 'error.png', 'timeout': 0.1, 'optional': True},
+        ],
+    })
+    assert workflow.templates() == ['error.png', 'next.png', 'done.png']
+
+    config = {'png_dir': str(tmp_path), 'template_cache_dir': '', 'poll_min_interval': 0.001, 'max_fps': 0}
+    clicker = ImageClicker(config, screen_source=ArrayScreenSource(screen))
+    runner = FakeRunnerClicks(workflow, clicker, config)
+    try:
+        assert runner.run()
+    finally:
+        clicker.stop()
+    assert runner.clicked == ['next.png', 'next.png']